@@ -0,0 +1,210 @@
+"""
+Offline extraction benchmark suite over the recorded fixture pages.
+
+Runs the scrapers' parsing paths against benchmarks/fixtures through the
+replay Scraper (no browser, no network) and reports pages per second and
+kilobytes allocated per page. Cases suffixed /dom read the same page with
+the CSS selectors only, next to the default embedded-JSON extraction.
+The *_SPEC cases time the Alibaba scraper's extraction specs evaluated in
+Python, the path replay and the page-source fallback take.
+Every run is appended to a history file.
+A run is compared against the median of the previous runs on the same
+parser backend and Python version. A case fails when it is more than
+``--threshold`` slower or allocates more than ``--alloc-threshold`` more
+per page.
+
+Run from the repository root:
+    python -m benchmarks.bench_extraction                   # run, compare, record
+    python -m benchmarks.bench_extraction --check --no-save  # CI: exit 1 on regression
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from benchmarks.fixture_pages import (
+    ALIEXPRESS_PRODUCT_URL,
+    AMAZON_PRODUCT_URL,
+    fixture_store,
+    read_fixture,
+)
+from browser_extract import evaluate
+from get_product_data_ABb import (
+    PRODUCT_SPEC,
+    REVIEWS_SPEC,
+    product_from_fields,
+    review_from_fields,
+)
+from get_product_data_AEx import ReviewCollector, get_product_page_data_AE, get_product_urls_AE
+from get_product_data_az import get_product_data_az, get_product_urls_az
+from html_parser import default_backend, parse_html
+from information_types import Scraper
+
+HISTORY_PATH: str = os.path.join(os.path.dirname(__file__), "history.jsonl")
+
+
+@dataclass
+class Case:
+    name: str
+    fixture: str
+    # builds the argument once, outside the timed loop
+    setup: Callable[[Scraper, str], Any]
+    run: Callable[[Scraper, Any], Any]
+
+
+def _soup(scraper: Scraper, html: str):
+    return parse_html(html, scraper.parser)
+
+
+def _product_page_ae(scraper: Scraper, use_json: bool = True):
+    # replay has no buttons to click: silence the scraper's "failed to click" prints
+    with contextlib.redirect_stdout(io.StringIO()):
+        return get_product_page_data_AE(scraper, ALIEXPRESS_PRODUCT_URL, use_json=use_json)
+
+
+CASES: list[Case] = [
+    Case("get_product_urls_az", "amazon_search", lambda s, h: None,
+         lambda s, _: get_product_urls_az(s, "laptop", max_page_number=1)),
+    Case("get_product_data_az", "amazon_product", lambda s, h: None,
+         lambda s, _: get_product_data_az(s, AMAZON_PRODUCT_URL)),
+    Case("get_product_data_az/dom", "amazon_product", lambda s, h: None,
+         lambda s, _: get_product_data_az(s, AMAZON_PRODUCT_URL, use_json=False)),
+    Case("get_product_urls_AE", "aliexpress_search", lambda s, h: None,
+         lambda s, _: get_product_urls_AE(s, "wireless earbuds", 1)),
+    Case("get_product_page_data_AE", "aliexpress_product", lambda s, h: None, lambda s, _: _product_page_ae(s)),
+    Case("get_product_page_data_AE/dom", "aliexpress_product", lambda s, h: None,
+         lambda s, _: _product_page_ae(s, use_json=False)),
+    Case("ReviewCollector.add_html", "aliexpress_reviews", lambda s, h: h,
+         lambda s, html: ReviewCollector(1000).add_html(html, s.parser)),
+    # Alibaba extracts only through its specs: in the browser live, over the page source in replay
+    Case("PRODUCT_SPEC", "alibaba_product", _soup, lambda s, soup: product_from_fields(evaluate(soup, PRODUCT_SPEC))),
+    Case("REVIEWS_SPEC", "alibaba_reviews", _soup,
+         lambda s, soup: [review_from_fields(item) for item in evaluate(soup, REVIEWS_SPEC)["reviews"]]),
+    Case("parse alibaba_product", "alibaba_product", lambda s, h: h, lambda s, html: parse_html(html, s.parser)),
+]
+
+
+def measure(case: Case, scraper: Scraper, min_time: float = 0.5, rounds: int = 5) -> dict[str, float]:
+    arg = case.setup(scraper, read_fixture(case.fixture))
+    case.run(scraper, arg)  # warm up caches and lazy imports
+
+    # enough iterations per round to run for about min_time
+    iterations, elapsed = 1, 0.0
+    while elapsed < min_time / rounds:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            case.run(scraper, arg)
+        elapsed = time.perf_counter() - start
+        if elapsed < min_time / rounds:
+            iterations *= 2
+    best = elapsed
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            case.run(scraper, arg)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    case.run(scraper, arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"pages_per_s": iterations / best, "alloc_kb": peak / 1024}
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path: str = HISTORY_PATH) -> list[dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def baseline(history: list[dict[str, Any]], parser: str, python: str, window: int = 5) -> dict[str, dict[str, float]]:
+    """Per case median of the last `window` comparable runs"""
+    runs = [run for run in history if run["parser"] == parser and run["python"] == python][-window:]
+    cases = {name for run in runs for name in run["results"]}
+    return {
+        name: {
+            metric: statistics.median(run["results"][name][metric] for run in runs if name in run["results"])
+            for metric in ("pages_per_s", "alloc_kb")
+        }
+        for name in cases
+    }
+
+
+def run(
+    parser: str | None = None,
+    threshold: float = 0.15,
+    alloc_threshold: float = 0.25,
+    history_path: str = HISTORY_PATH,
+    save: bool = True,
+    min_time: float = 0.5,
+) -> list[str]:
+    """Run every case, print the comparison and return the names of regressed cases"""
+    parser = parser or default_backend()
+    python = platform.python_version()
+    with fixture_store() as store:
+        scraper = Scraper(page_store=store, replay=True, parser=parser)
+        results = {case.name: measure(case, scraper, min_time) for case in CASES}
+    reference = baseline(load_history(history_path), parser, python)
+
+    regressions = []
+    print(f"parser={parser} python={python}, compared with {'history' if reference else 'nothing yet'}")
+    print(f"{'case':<30} {'pages/s':>10} {'change':>8} {'alloc KB':>10} {'change':>8}")
+    for name, result in results.items():
+        ref = reference.get(name)
+        speed_change = result["pages_per_s"] / ref["pages_per_s"] - 1 if ref else 0.0
+        alloc_change = result["alloc_kb"] / ref["alloc_kb"] - 1 if ref and ref["alloc_kb"] else 0.0
+        regressed = speed_change < -threshold or alloc_change > alloc_threshold
+        if regressed:
+            regressions.append(name)
+        print(
+            f"{name:<30} {result['pages_per_s']:>10.1f} {speed_change:>+8.0%} "
+            f"{result['alloc_kb']:>10.1f} {alloc_change:>+8.0%}{'  REGRESSION' if regressed else ''}"
+        )
+
+    if save:
+        with open(history_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "timestamp": time.time(),
+                "commit": _git_commit(),
+                "parser": parser,
+                "python": python,
+                "results": results,
+            }) + "\n")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--parser", default=None, help="html_parser backend, defaults to the default backend")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown, 0.15 = 15%%")
+    parser.add_argument("--alloc-threshold", type=float, default=0.25, help="allowed allocation growth")
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to spend timing each case")
+    parser.add_argument("--no-save", action="store_true", help="do not append this run to the history")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 on any regression")
+    args = parser.parse_args()
+    # the scraper modules log every page at DEBUG
+    logging.getLogger().setLevel(logging.WARNING)
+    regressed = run(args.parser, args.threshold, args.alloc_threshold, args.history, not args.no_save, args.min_time)
+    if args.check and regressed:
+        raise SystemExit(f"Regressions: {', '.join(regressed)}")
@@ -0,0 +1,119 @@
+"""
+Memory benchmark for holding a crawl in memory.
+
+Builds the same synthetic crawl three ways and measures the bytes allocated
+with tracemalloc:
+
+    dict-based    the previous Product layout: a dataclass with a __dict__
+                  and one dict per review
+    slots         the current slotted Product, reviews still dicts
+    review store  slotted Product with its reviews in a shared ReviewStore
+
+It also times one pass over every review for each layout, so the cost of
+decoding reviews on access is visible next to the memory saved.
+
+Run from the repository root:
+    python -m benchmarks.bench_memory --products 20000 --reviews 20
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+from information_types import Product
+from review_store import ProductBatch
+
+WORDS = (
+    "battery sound great bad quality fast delivery cheap broke after week "
+    "recommend excellent comfortable noise cancelling bluetooth connection"
+).split()
+CANNED_TITLES = ("Title not found", "Great product", "Not worth it", "As described")
+
+
+@dataclass
+class DictProduct:
+    """Product as it was before slots"""
+    title: str
+    price: float | str
+    about_product: str | list[str]
+    rating: float | str
+    reviews: list[dict[str, str | float]]
+
+
+def make_crawl(products: int, reviews: int, cls=Product, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [
+        cls(
+            title=f"Product {i} " + " ".join(rng.choices(WORDS, k=8)),
+            price=f"€{rng.randint(5, 2000)},{rng.randint(0, 99):02d}",
+            about_product=[" ".join(rng.choices(WORDS, k=12)) for _ in range(5)],
+            rating=round(rng.uniform(1, 5), 1),
+            reviews=[
+                {
+                    "title": rng.choice(CANNED_TITLES),
+                    "text": " ".join(rng.choices(WORDS, k=rng.randint(10, 60))),
+                    "rating": float(rng.randint(1, 5)),
+                }
+                for _ in range(reviews)
+            ],
+        )
+        for i in range(products)
+    ]
+
+
+def measure(build) -> tuple[int, object]:
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, result
+
+
+def scan(products) -> float:
+    start = time.perf_counter()
+    total = 0.0
+    for product in products:
+        for review in product.reviews:
+            total += review["rating"]
+    return time.perf_counter() - start
+
+
+def compact(products: int, reviews: int) -> ProductBatch:
+    batch = ProductBatch()
+    # compact as products arrive, so the dict reviews are freed one product at a time
+    for product in make_crawl(products, reviews):
+        batch.add(product)
+    return batch
+
+
+def run(products: int = 20_000, reviews: int = 20) -> dict[str, int]:
+    layouts = {
+        "dict-based": lambda: make_crawl(products, reviews, DictProduct),
+        "slots": lambda: make_crawl(products, reviews),
+        "review store": lambda: compact(products, reviews),
+    }
+    results = {}
+    print(f"{products:,} products x {reviews} reviews")
+    print(f"{'layout':<14} {'MB':>9} {'bytes/review':>13} {'scan s':>8}")
+    for name, build in layouts.items():
+        size, crawl = measure(build)
+        results[name] = size
+        print(f"{name:<14} {size / 1e6:>9.1f} {size / (products * reviews):>13.0f} {scan(crawl):>8.2f}")
+        if isinstance(crawl, ProductBatch):
+            print(f"{'':<14} of which reviews: {crawl.reviews.nbytes() / len(crawl.reviews):.0f} bytes/review")
+        del crawl
+    print(f"review store uses {results['review store'] / results['dict-based']:.0%} of the dict-based layout")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--reviews", type=int, default=20)
+    args = parser.parse_args()
+    run(products=args.products, reviews=args.reviews)
@@ -0,0 +1,99 @@
+"""
+Price normalisation benchmark on synthetic price columns.
+
+Builds a column of scraped-looking prices in mixed locales ("€1.234,56",
+"$1,234.56", "US $1.20-3.50", ...) and parses it with the vectorised
+``normalize.parse_prices``. It compares against the per-row
+``apply(parse_price)`` a notebook would otherwise write, and against the old
+``str.replace`` chain (which cannot parse every row). The per-row baselines
+are timed on a sample and scaled up, so a 10M row run finishes in
+reasonable time. Real columns repeat values, which parse_prices exploits,
+so ``--distinct`` controls how many different strings the column holds.
+
+Run from the repository root:
+    python -m benchmarks.bench_normalize --rows 10000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from normalize import parse_price, parse_prices
+
+TEMPLATES = (
+    "€{whole_dot},{cents}",
+    "${whole_comma}.{cents}",
+    "{whole_space},{cents} EUR",
+    "€{whole},{cents} - €{whole_high},{cents}",
+    "US ${whole}.{cents}-{whole_high}.{cents}",
+    "£{whole}",
+    "{whole}.{cents}",
+)
+
+
+def make_prices(rows: int, distinct: int = 200_000, seed: int = 0) -> pd.Series:
+    """`rows` price strings, drawn from `distinct` randomly generated ones"""
+    rng = np.random.default_rng(seed)
+    wholes = rng.integers(0, 20_000, distinct)
+    cents = rng.integers(0, 100, distinct)
+    templates = rng.integers(0, len(TEMPLATES), distinct)
+    pool = [
+        TEMPLATES[template].format(
+            whole=whole,
+            whole_high=whole + 5,
+            whole_dot=f"{whole:,}".replace(",", "."),
+            whole_comma=f"{whole:,}",
+            whole_space=f"{whole:,}".replace(",", " "),
+            cents=f"{cent:02d}",
+        )
+        for whole, cent, template in zip(wholes, cents, templates)
+    ]
+    return pd.Series(np.resize(np.array(pool, dtype=object), rows), dtype="object")
+
+
+def legacy_clean(prices: pd.Series) -> pd.Series:
+    """The notebook's old cleaning: fails outright on most real-world values"""
+    cleaned = prices.str.replace("€", "").str.replace(",", ".")
+    return pd.to_numeric(cleaned, errors="coerce")
+
+
+def timed(fn, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def run(rows: int = 10_000_000, sample: int = 200_000, distinct: int = 200_000) -> dict[str, float]:
+    prices = make_prices(rows, distinct)
+    print(f"{rows:,} rows ({distinct:,} distinct), per-row baselines timed on {min(sample, rows):,} rows and scaled")
+    head = prices.iloc[:sample]
+    scale = rows / len(head)
+
+    vector_seconds, parsed = timed(parse_prices, prices)
+    apply_seconds, applied = timed(lambda s: s.map(parse_price), head)
+    legacy_seconds, legacy = timed(legacy_clean, head)
+    timings = {
+        "parse_prices": vector_seconds,
+        "apply(parse_price)": apply_seconds * scale,
+        "str.replace chain": legacy_seconds * scale,
+    }
+
+    agree = np.allclose(parsed["price"].iloc[:sample].to_numpy(), applied.to_numpy(dtype=float), equal_nan=True)
+    print(f"vectorised and per-row results agree: {agree}")
+    print(f"str.replace chain parses {legacy.notna().mean():.0%} of rows, "
+          f"correctly {np.isclose(legacy, parsed['price'].iloc[:sample]).mean():.0%}")
+    print(f"{'method':<22} {'seconds':>10} {'rows/s':>14}")
+    for method, seconds in timings.items():
+        print(f"{method:<22} {seconds:>10.2f} {rows / seconds:>14,.0f}")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--sample", type=int, default=200_000)
+    parser.add_argument("--distinct", type=int, default=200_000)
+    args = parser.parse_args()
+    run(rows=args.rows, sample=args.sample, distinct=args.distinct)
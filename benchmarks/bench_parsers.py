@@ -0,0 +1,103 @@
+"""
+Parser backend benchmark over archived pages.
+
+Parses every snapshot in a PageStore with each available backend, runs the
+matching site extractor on the result and reports milliseconds per page,
+the speedup over html.parser and any page where a backend disagrees with it.
+
+Run from the repository root:
+    python -m benchmarks.bench_parsers snapshots --repeat 3
+"""
+
+import argparse
+import time
+from urllib.parse import urlsplit
+
+from browser_extract import evaluate
+from get_product_data_ABb import PRODUCT_SPEC, REVIEWS_SPEC, product_from_fields, review_from_fields
+from html_parser import available_backends, parse_html
+from page_store import PageStore
+
+
+def extract_alibaba(soup) -> dict:
+    # the scraper's own specs, as replay evaluates them over the page source
+    reviews = [review_from_fields(item) for item in evaluate(soup, REVIEWS_SPEC)["reviews"]]
+    return {
+        **product_from_fields(evaluate(soup, PRODUCT_SPEC)),
+        "reviews": [review for review in reviews if review["text"]],
+    }
+
+
+def extract_amazon(soup) -> dict:
+    title = soup.find("span", {"id": "productTitle"})
+    reviews = soup.find_all("div", {"data-hook": "review"})
+    results = soup.find_all("div", {"data-component-type": "s-search-result"})
+    return {
+        "title": title.get_text(strip=True) if title else None,
+        "reviews": [review.get_text(strip=True) for review in reviews],
+        "results": [
+            link.get("href")
+            for result in results
+            if (link := result.find("a", {"class": "a-link-normal s-no-outline"}))
+        ],
+    }
+
+
+def extract_aliexpress(soup) -> dict:
+    title = soup.select_one("h1[data-pl='product-title']")
+    return {
+        "title": title.get_text(strip=True) if title else None,
+        "specs": [spec.get_text(strip=True) for spec in soup.select("div.specification--prop--Jh28bKu")],
+        "reviews": [review.get_text(strip=True) for review in soup.select("div.list--itemWrap--ARYTMbR")],
+    }
+
+
+def extractor_for(url: str):
+    host = urlsplit(url).netloc
+    if "alibaba" in host:
+        return extract_alibaba
+    if "aliexpress" in host:
+        return extract_aliexpress
+    return extract_amazon
+
+
+def run(store: PageStore, repeat: int = 3, limit: int | None = None) -> dict[str, float]:
+    pages = []
+    for url in store.urls()[:limit]:
+        pages.append((url, store.get(url)))
+    if not pages:
+        print("No snapshots found")
+        return {}
+
+    backends = available_backends()
+    timings: dict[str, float] = {}
+    baseline_results: list[dict] = []
+    for backend in reversed(backends):  # html.parser first, it is the reference
+        results = []
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = [extractor_for(url)(parse_html(html, backend)) for url, html in pages]
+            best = min(best, time.perf_counter() - start)
+        timings[backend] = best / len(pages) * 1000
+        if backend == "html.parser":
+            baseline_results = results
+            continue
+        mismatches = [url for (url, _), ours, ref in zip(pages, results, baseline_results) if ours != ref]
+        if mismatches:
+            print(f"{backend}: {len(mismatches)} page(s) differ from html.parser, e.g. {mismatches[0]}")
+
+    print(f"{len(pages)} pages, best of {repeat}")
+    print(f"{'backend':<12} {'ms/page':>10} {'speedup':>8}")
+    for backend, ms_per_page in timings.items():
+        print(f"{backend:<12} {ms_per_page:>10.2f} {timings['html.parser'] / ms_per_page:>7.1f}x")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("store", nargs="?", default="snapshots")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+    run(PageStore(args.store), repeat=args.repeat, limit=args.limit)
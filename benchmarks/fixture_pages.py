@@ -0,0 +1,277 @@
+"""
+Fixture pages for the offline benchmarks.
+
+Each fixture is an HTML file in benchmarks/fixtures/ plus the URL the
+scrapers request it under, so the files can be loaded into a PageStore and
+served by the replay Scraper exactly like an archived crawl.
+
+The committed files are generated from the templates below: same markup and
+selectors as the live sites, at realistic sizes (48 search results, product
+pages with their spec lists, 20-review pages). Replace one with a real page
+from a recorded crawl whenever a selector changes:
+
+    python -m benchmarks.fixture_pages                              # regenerate all
+    python -m benchmarks.fixture_pages --record snapshots amazon_product
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import tempfile
+from typing import Iterator
+from urllib.parse import quote
+
+from page_store import PageStore
+
+FIXTURE_DIR: str = os.path.join(os.path.dirname(__file__), "fixtures")
+
+AMAZON_SEARCH_URL: str = f"https://www.amazon.nl/s?k={quote('laptop')}&language=en_GB"
+AMAZON_PRODUCT_URL: str = "https://www.amazon.nl/dp/B0CX23V2ZK"
+ALIEXPRESS_SEARCH_URL: str = "https://www.aliexpress.com/w/wholesale-wireless-earbuds.html"
+ALIEXPRESS_PRODUCT_URL: str = "https://www.aliexpress.com/item/1005006123456789.html"
+ALIBABA_PRODUCT_URL: str = "https://www.alibaba.com/product-detail/Portable-Air-Conditioner_1600912345678.html"
+
+# fixture name -> URL it is served under
+FIXTURES: dict[str, str] = {
+    "amazon_search": AMAZON_SEARCH_URL,
+    "amazon_product": AMAZON_PRODUCT_URL,
+    "aliexpress_search": ALIEXPRESS_SEARCH_URL,
+    "aliexpress_product": ALIEXPRESS_PRODUCT_URL,
+    "aliexpress_reviews": ALIEXPRESS_PRODUCT_URL + "?bench=reviews",
+    "alibaba_product": ALIBABA_PRODUCT_URL,
+    "alibaba_reviews": ALIBABA_PRODUCT_URL + "?bench=reviews",
+}
+
+WORDS = (
+    "portable wireless bluetooth noise cancelling battery charging case waterproof "
+    "lightweight compact fast delivery great sound quality comfortable fit bass "
+    "seller responded quickly would recommend works perfectly after two weeks"
+).split()
+
+
+def _words(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def _page(title: str, body: str) -> str:
+    head = "".join(f'<link rel="stylesheet" href="/static/{i}.css">' for i in range(12))
+    scripts = "".join(f"<script>window.__bench{i} = {{}};</script>" for i in range(30))
+    return f"<!DOCTYPE html><html><head><title>{title}</title>{head}</head><body>{body}{scripts}</body></html>"
+
+
+def amazon_search(rng: random.Random) -> str:
+    results = []
+    for i in range(48):
+        asin = f"B0{rng.randrange(16**8):08X}"
+        sponsored = i % 6 == 0
+        href = (
+            f"/sspa/click?ie=UTF8&amp;spc=MTo&amp;url=%2FLaptop-{i}%2Fdp%2F{asin}%2Fref%3Dsr_1_{i}_sspa"
+            if sponsored else f"/Laptop-{i}/dp/{asin}/ref=sr_1_{i}?crid=ABC&amp;qid=1700000000"
+        )
+        label = '<span class="puis-label-popover-hover">Gesponsord</span>' if sponsored else ""
+        results.append(
+            f'<div data-component-type="s-search-result" data-asin="{asin}"><div class="s-card">'
+            f'{label}<a class="a-link-normal s-no-outline" href="{href}"><img src="/i/{asin}.jpg"></a>'
+            f'<h2><span class="a-text-normal">{_words(rng, 8, 20)}</span></h2>'
+            f'<span class="a-price"><span class="a-price-whole">{rng.randint(200, 2500)},</span>'
+            f'<span class="a-price-fraction">{rng.randint(0, 99):02d}</span></span></div></div>'
+        )
+    return _page("Amazon.nl: laptop", f'<div class="s-main-slot">{"".join(results)}</div>')
+
+
+def amazon_product(rng: random.Random) -> str:
+    bullets = "".join(
+        f'<li class="a-spacing-mini"><span class="a-list-item">{_words(rng, 10, 30)}</span></li>'
+        for _ in range(6)
+    )
+    reviews = "".join(
+        f'<div data-hook="review" id="R{i}"><a data-hook="review-title" href="#">'
+        f'<i data-hook="review-star-rating"><span>{rng.randint(1, 5)},0 van 5 sterren</span></i>\n'
+        f'<span>{_words(rng, 2, 6)}</span></a>'
+        f'<span data-hook="review-body"><span>{_words(rng, 20, 80)}</span></span></div>'
+        for i in range(10)
+    )
+    # the JSON state the page's own scripts read, next to the rendered markup; the price data is
+    # keyed by buying-option group as described for live pages, not copied from a captured one
+    price_data = {"desktop_buybox_group_1": [
+        {"displayPrice": "€1.149,00", "priceAmount": 1149.0, "currencySymbol": "€",
+         "buyingOptionType": "USED", "offerListingId": "y" * 120},
+        {"displayPrice": "€1.299,99", "priceAmount": 1299.99, "currencySymbol": "€",
+         "buyingOptionType": "NEW", "offerListingId": "x" * 120},
+    ]}
+    states = "".join(
+        f'<script type="a-state" data-a-state="{{&quot;key&quot;:&quot;{key}&quot;}}">'
+        f'{json.dumps({"key": key, "items": [_words(rng, 3, 8) for _ in range(20)]})}</script>'
+        for key in ("turbo-checkout-page-state", "desktop-dp-ims", "acrDetailsInfo")
+    )
+    body = (
+        f'<span id="productTitle"> {_words(rng, 12, 24)} </span>'
+        f'<div id="corePrice"><span class="a-price-whole">1.299,</span><span class="a-price-fraction">99</span></div>'
+        f'<div class="a-section aok-hidden twister-plus-buying-options-price-data">{json.dumps(price_data)}</div>'
+        f'<ul class="a-unordered-list a-vertical a-spacing-mini">{bullets}</ul>'
+        f'<span id="acrPopover" title="4,5 van 5 sterren"><span class="a-icon-alt">4,5 van 5 sterren</span></span>'
+        f'<div id="cm-cr-dp-review-list">{reviews}</div>{states}'
+    )
+    return _page("Amazon.nl: laptop", body)
+
+
+def aliexpress_search(rng: random.Random) -> str:
+    cards = "".join(
+        f'<div class="list--gallery--C2f2tvm search-item-card-wrapper-gallery">'
+        f'<a class="multi--container--1UZxxHY cards--card--3PJxwBm search-card-item" '
+        f'href="//nl.aliexpress.com/item/10050061{rng.randrange(10**8):08d}.html?algo_pvid=x&amp;spm=a2g0o">'
+        f'<h3>{_words(rng, 8, 18)}</h3><div class="price">€{rng.randint(1, 90)},{rng.randint(0, 99):02d}</div></a></div>'
+        for _ in range(48)
+    )
+    return _page("AliExpress", f'<div id="card-list">{cards}</div>')
+
+
+def _aliexpress_reviews(rng: random.Random, count: int) -> str:
+    return "".join(
+        f'<div class="list--itemWrap--ARYTMbR"><div class="list--itemInfo">{_words(rng, 2, 3)} | 12 okt. 2026</div>'
+        + '<span class="comet-icon-starreviewfilled"></span>' * rng.randint(1, 5)
+        + f'<div class="list--itemReview--xQUhO78">{_words(rng, 5, 40)}</div></div>'
+        for _ in range(count)
+    )
+
+
+def aliexpress_product(rng: random.Random) -> str:
+    props = [{"attrName": _words(rng, 1, 3), "attrValue": _words(rng, 1, 4)} for _ in range(16)]
+    specs = "".join(
+        f'<div class="specification--prop--Jh28bKu"><div class="specification--title--SfH3sA8">{prop["attrName"]}</div>'
+        f'<div class="specification--desc--Dxx6W0W">{prop["attrValue"]}</div></div>'
+        for prop in props
+    )
+    title = _words(rng, 12, 24)
+    # runParams as the classic product page serves it, SKU matrix included for a realistic size
+    run_params = {
+        "titleModule": {"subject": title, "feedbackRating": {"averageStar": "4.7", "totalValidNum": 1234}},
+        "priceModule": {"formatedActivityPrice": "€12,34", "formatedPrice": "€15,99", "discount": 23},
+        "specsModule": {"props": props},
+        "skuModule": {"skuPriceList": [
+            {"skuId": 12000030000000000 + i, "skuAttr": f"14:{i}#{_words(rng, 1, 2)}",
+             "skuVal": {"skuAmount": {"value": rng.randint(500, 2000) / 100, "currency": "EUR"}, "availQuantity": i}}
+            for i in range(120)
+        ]},
+    }
+    body = (
+        f"<h1 data-pl=\"product-title\">{title}</h1>"
+        f'<span class="price--currentPriceText--V8_y_b5 pdp-comp-price-current product-price-value">€12,34</span>'
+        f'<div class="header--num--GaAGwoZ">4.7</div>'
+        f'<div class="specification--list">{specs}</div>'
+        f'<div class="feedback">{_aliexpress_reviews(rng, 4)}</div>'
+        f"<script>window.runParams = {{\n    data: {json.dumps(run_params)},\n    csrfToken: 'x'\n}};</script>"
+    )
+    return _page("AliExpress", body)
+
+
+def aliexpress_reviews(rng: random.Random) -> str:
+    return _page("AliExpress", f'<div class="comet-v2-modal-body">{_aliexpress_reviews(rng, 20)}</div>')
+
+
+def _alibaba_reviews(rng: random.Random, count: int) -> str:
+    items = []
+    for i in range(count):
+        translated = '<div class="review-translate">Translated</div>' if i % 3 == 0 else ""
+        reply = (
+            f'<div class="review-reply"><div class="review-info">{_words(rng, 5, 15)}</div></div>'
+            if i % 4 == 0 else ""
+        )
+        items.append(
+            '<div><div class="company-review"><div class="review-item"><div class="review-intro">'
+            + '<svg class="fa-star"></svg>' * rng.randint(1, 5)
+            + f'<div class="review-info">{_words(rng, 10, 50)}</div>{translated}</div></div></div>{reply}</div>'
+        )
+    return f'<div id="review-layout"><div class="review-list">{"".join(items)}</div></div>'
+
+
+def alibaba_product(rng: random.Random) -> str:
+    attributes = "".join(
+        f'<div class="attribute-item"><div class="left">{_words(rng, 1, 3)}</div><div class="right">{_words(rng, 1, 5)}</div></div>'
+        for _ in range(20)
+    )
+    tiers = (("2 - 99 pieces", "$125.50"), ("100 - 499 pieces", "$119.00"), (">= 500 pieces", "$1,099.00"))
+    prices = "".join(
+        f'<div class="price-item"><div class="quality">{quantity}</div><div class="price">{price}</div></div>'
+        for quantity, price in tiers
+    )
+    lead = (
+        "<tr><td>Quantity (pieces)</td><td>1 - 100</td><td>101 - 1000</td><td>&gt; 1000</td></tr>"
+        "<tr><td>Lead time (days)</td><td>7</td><td>15</td><td>To be negotiated</td></tr>"
+    )
+    body = (
+        f"<h1>{_words(rng, 10, 20)}</h1>"
+        f'<div class="module_price">{prices}</div>'
+        f'<div class="module_attribute">{attributes}</div>'
+        f'<div class="lead-layout"><table>{lead}</table></div>'
+        f"{_alibaba_reviews(rng, 5)}"
+    )
+    return _page("Alibaba", body)
+
+
+def alibaba_reviews(rng: random.Random) -> str:
+    return _page("Alibaba", _alibaba_reviews(rng, 20))
+
+
+GENERATORS = {
+    "amazon_search": amazon_search,
+    "amazon_product": amazon_product,
+    "aliexpress_search": aliexpress_search,
+    "aliexpress_product": aliexpress_product,
+    "aliexpress_reviews": aliexpress_reviews,
+    "alibaba_product": alibaba_product,
+    "alibaba_reviews": alibaba_reviews,
+}
+
+
+def fixture_path(name: str) -> str:
+    return os.path.join(FIXTURE_DIR, f"{name}.html")
+
+
+def read_fixture(name: str) -> str:
+    with open(fixture_path(name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@contextlib.contextmanager
+def fixture_store(directory: str | None = None) -> Iterator[PageStore]:
+    """A PageStore holding every fixture under its URL, for the replay Scraper.
+
+    Without a directory the store lives in a temporary one, removed on exit.
+    """
+    with contextlib.ExitStack() as stack:
+        root = directory or stack.enter_context(tempfile.TemporaryDirectory(prefix="bench-fixtures-"))
+        store = PageStore(root)
+        for name, url in FIXTURES.items():
+            if url not in store:
+                store.put(url, read_fixture(name), fetched_at=0.0)
+        yield store
+
+
+def generate(seed: int = 2024):
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for name, generator in GENERATORS.items():
+        with open(fixture_path(name), "w", encoding="utf-8") as f:
+            f.write(generator(random.Random(f"{seed}-{name}")))
+
+
+def record(store: PageStore, name: str, url: str | None = None):
+    """Replace a fixture with the latest archived snapshot of its (or the given) URL"""
+    html = store.get(url or FIXTURES[name])
+    if html is None:
+        raise SystemExit(f"No snapshot of {url or FIXTURES[name]} in {store.root}")
+    with open(fixture_path(name), "w", encoding="utf-8") as f:
+        f.write(html)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--record", nargs=2, metavar=("STORE", "FIXTURE"))
+    parser.add_argument("--url", default=None, help="snapshot URL to record, defaults to the fixture's URL")
+    args = parser.parse_args()
+    if args.record:
+        record(PageStore(args.record[0]), args.record[1], args.url)
+    else:
+        generate()
@@ -0,0 +1,164 @@
+"""
+In-browser Extraction
+---------------------
+
+Runs an extraction spec inside the page with one ``execute_script`` call
+and gets back only the extracted fields, instead of pulling the whole
+``page_source`` (often several MB) over the WebDriver wire and parsing it in
+Python.
+
+A spec maps field names to ``Field``s: a CSS selector, what to take from
+the match (text, an attribute, the number of matches, whether it exists)
+and, for nested records, a spec of its own evaluated inside each match.
+``compile_spec`` turns it into the compact dict the in-page interpreter
+reads.
+
+The same spec can be evaluated in Python over a parsed page (``evaluate``),
+with the same results. ``extract`` falls back to that when the driver
+cannot run scripts (replay), when the script fails, or when the page source
+is needed anyway (archiving), so callers never care which side did the
+work.
+
+Example usage:
+    SPEC = {
+        "title": Field("h1"),
+        "prices": Field("div.price-item", many=True, fields={
+            "quantity": Field("div.quality"),
+            "price": Field("div.price"),
+        }),
+    }
+    values = extract(scraper.driver, SPEC)   # {"title": "...", "prices": [{...}, ...]}
+"""
+
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from html_parser import Node, parse_html
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Field:
+    selector: str | None = None  # None: the node itself
+    kind: str = "text"  # text | attr | count | exists
+    attr: str | None = None
+    many: bool = False  # every match (a list) instead of the first one
+    fields: "dict[str, Field] | None" = None  # a record per match instead of a value
+    mark: str | None = None  # in the browser: set this attribute on every match, e.g. "already harvested"
+
+
+Spec = dict[str, Field]
+
+KINDS: tuple[str, ...] = ("text", "attr", "count", "exists")
+
+
+def compile_spec(spec: Spec) -> dict[str, dict[str, Any]]:
+    """The spec as the short-keyed dict EXTRACT_JS reads"""
+    compiled = {}
+    for name, field in spec.items():
+        if field.kind not in KINDS:
+            raise ValueError(f"Unknown field kind {field.kind!r} for {name!r}, choose from {KINDS}")
+        if field.kind == "attr" and not field.attr:
+            raise ValueError(f"Field {name!r} takes an attribute but names none")
+        entry: dict[str, Any] = {"s": field.selector, "k": field.kind}
+        if field.attr:
+            entry["a"] = field.attr
+        if field.many:
+            entry["m"] = True
+        if field.fields:
+            entry["f"] = compile_spec(field.fields)
+        if field.mark:
+            entry["x"] = field.mark
+        compiled[name] = entry
+    return compiled
+
+
+EXTRACT_JS: str = """
+const [spec, rootSelector, scroll] = arguments;
+const root = rootSelector ? document.querySelector(rootSelector) : document;
+if (!root) return null;
+const extract = (node, spec) => {
+    const out = {};
+    for (const [name, f] of Object.entries(spec)) {
+        const matches = f.s === null ? [node] : Array.from(f.m ? node.querySelectorAll(f.s) : [node.querySelector(f.s)]).filter(Boolean);
+        if (f.x) matches.forEach((m) => m.setAttribute(f.x, '1'));
+        if (f.k === 'count') { out[name] = f.s === null ? 1 : node.querySelectorAll(f.s).length; continue; }
+        if (f.k === 'exists') { out[name] = matches.length > 0; continue; }
+        const value = (m) => f.f ? extract(m, f.f) : f.k === 'attr' ? m.getAttribute(f.a) : m.textContent.trim();
+        out[name] = f.m ? matches.map(value) : (matches.length ? value(matches[0]) : null);
+    }
+    return out;
+};
+const result = extract(root, spec);
+// lets a scroll-to-load loop extract and request the next batch in the same call
+if (scroll && root.scrollHeight !== undefined) root.scrollTop = root.scrollHeight;
+return result;
+"""
+
+
+def evaluate(node: Node, spec: Spec) -> dict[str, Any]:
+    """The spec over a parsed page, same results as the in-browser run"""
+    out: dict[str, Any] = {}
+    for name, field in spec.items():
+        if field.selector is None:
+            matches = [node]
+        elif field.many or field.kind == "count":
+            matches = node.select(field.selector)
+        else:
+            match = node.select_one(field.selector)
+            matches = [match] if match is not None else []
+        if field.kind == "count":
+            out[name] = len(matches)
+            continue
+        if field.kind == "exists":
+            out[name] = bool(matches)
+            continue
+
+        def value(match):
+            if field.fields:
+                return evaluate(match, field.fields)
+            if field.kind == "attr":
+                return match.get(field.attr)
+            return match.get_text().strip()
+
+        out[name] = [value(m) for m in matches] if field.many else (value(matches[0]) if matches else None)
+    return out
+
+
+def run_in_browser(
+    driver, spec: Spec, root: str | None = None, scroll: bool = False, **labels: str
+) -> dict[str, Any] | None:
+    """One execute_script call; None when the driver cannot run it (or `root` is not on the page)"""
+    try:
+        with METRICS.timer("browser_extract", **labels):
+            result = driver.execute_script(EXTRACT_JS, compile_spec(spec), root, scroll)
+    except Exception as e:
+        logger.warning(f"In-browser extraction failed, falling back to page_source: {e}")
+        return None
+    if not isinstance(result, dict):
+        return None
+    # what came over the wire instead of the page source
+    METRICS.inc("extract_bytes", len(json.dumps(result)), **labels)
+    return result
+
+
+def extract(
+    driver,
+    spec: Spec,
+    parser: str | None = None,
+    read_page: Callable[[], str] | None = None,
+    in_browser: bool = True,
+    **labels: str,
+) -> dict[str, Any]:
+    """Extract `spec` in the browser, or from the page source when that is not possible"""
+    if in_browser:
+        values = run_in_browser(driver, spec, **labels)
+        if values is not None:
+            return values
+    METRICS.inc("extract_page_source_fallbacks", **labels)
+    html = read_page() if read_page is not None else driver.page_source
+    return evaluate(parse_html(html, parser), spec)
@@ -0,0 +1,195 @@
+"""
+Browser Pool
+------------
+
+A pool of pre-started, reusable browser workers (``Scraper`` or
+``AliBabaScraper``) that product pages can be fetched on in parallel.
+
+Every worker is health checked before it is handed out; a worker whose
+browser has died is closed and replaced by a fresh one, so one crashed
+Chrome does not take the rest of the run down with it.
+
+Example usage:
+    with BrowserPool(scraper_factory(), size=8) as pool:
+        products = pool.map(get_product_data_az, product_urls)
+
+    with BrowserPool(alibaba_factory(headless=True), size=4) as pool:
+        for product in pool.imap(get_alibaba_product, urls):
+            ...
+"""
+
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Generic, Iterable, Iterator, TypeVar
+
+from selenium.webdriver.chrome.options import Options
+from information_types import Scraper
+
+if TYPE_CHECKING:
+    # get_product_data_ABb imports this module, so only type checkers see the name here
+    from get_product_data_ABb import AliBabaScraper
+
+logger = logging.getLogger(__name__)
+
+W = TypeVar("W")
+R = TypeVar("R")
+
+DEFAULT_POOL_SIZE: int = min(8, os.cpu_count() or 1)
+
+
+def scraper_factory(**kwargs) -> Callable[[], Scraper]:
+    """Build Scrapers with their own Options object (the default one is shared)"""
+    def create() -> Scraper:
+        return Scraper(options=Options(), **kwargs)
+    return create
+
+
+def alibaba_factory(**kwargs) -> Callable[[], "AliBabaScraper"]:
+    """Build AliBabaScrapers with their driver already started"""
+    from get_product_data_ABb import AliBabaScraper
+
+    def create() -> AliBabaScraper:
+        return AliBabaScraper(**kwargs).__enter__()
+    return create
+
+
+def driver_alive(worker) -> bool:
+    """Cheap health check: a dead browser fails to report its current url"""
+    try:
+        worker.driver.current_url
+        return True
+    except Exception:
+        return False
+
+
+def close_worker(worker):
+    try:
+        if hasattr(worker, "__exit__"):
+            worker.__exit__(None, None, None)
+        else:
+            worker.driver.quit()
+    except Exception as e:
+        logger.warning(f"Error closing browser worker: {e}")
+
+
+class BrowserPool(Generic[W]):
+    def __init__(
+        self,
+        factory: Callable[[], W],
+        size: int = DEFAULT_POOL_SIZE,
+        health_check: Callable[[W], bool] = driver_alive,
+        close: Callable[[W], None] = close_worker,
+    ):
+        if size < 1:
+            raise ValueError("pool size must be at least 1")
+        self.factory = factory
+        self.size = size
+        self.health_check = health_check
+        self._close = close
+        # None is an empty slot: its worker died and could not be replaced yet
+        self._idle: queue.Queue[W | None] = queue.Queue()
+        self._workers: list[W] = []
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self) -> "BrowserPool[W]":
+        """Start all browsers up front, in parallel, so the first fetches don't wait"""
+        if self._started:
+            return self
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            futures = [executor.submit(self.factory) for _ in range(self.size)]
+            for future in futures:
+                try:
+                    self._add(future.result())
+                except Exception as e:
+                    logger.error(f"Failed to start browser worker: {e}")
+        if not self._workers:
+            raise RuntimeError("Could not start any browser worker")
+        logger.debug(f"Browser pool started with {len(self._workers)} workers")
+        self._started = True
+        return self
+
+    def _add(self, worker: W):
+        with self._lock:
+            self._workers.append(worker)
+        self._idle.put(worker)
+
+    def _replace(self, worker: W) -> W:
+        logger.warning("Browser worker failed its health check, replacing it")
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        self._close(worker)
+        return self._fill()
+
+    def _fill(self) -> W:
+        fresh = self.factory()
+        with self._lock:
+            self._workers.append(fresh)
+        return fresh
+
+    def _owns(self, worker: W | None) -> bool:
+        with self._lock:
+            return worker is not None and any(w is worker for w in self._workers)
+
+    @contextmanager
+    def acquire(self) -> Iterator[W]:
+        """Borrow a healthy worker for the duration of the with block"""
+        if not self._started:
+            self.start()
+        worker = self._idle.get()
+        try:
+            if worker is None:
+                # an earlier replacement failed: try to start the slot's worker again
+                worker = self._fill()
+            elif not self.health_check(worker):
+                worker = self._replace(worker)
+            yield worker
+        finally:
+            # a dead worker whose replacement raised is never handed out again
+            self._idle.put(worker if self._owns(worker) else None)
+
+    def run(self, fn: Callable[[W, str], R], url: str) -> R | None:
+        """Run fn(worker, url) on one pooled worker, None if it (or starting the worker) raises"""
+        try:
+            with self.acquire() as worker:
+                return fn(worker, url)
+        except Exception as e:
+            logger.error(f"Failed to scrape {url}: {e}")
+            return None
+
+    def imap(self, fn: Callable[[W, str], R], urls: Iterable[str]) -> Iterator[R | None]:
+        """Run fn(worker, url) for every url in parallel, yielding results in url order.
+
+        A url whose scrape raises yields None instead of stopping the run.
+        """
+        if not self._started:
+            self.start()
+        with ThreadPoolExecutor(max_workers=len(self._workers)) as executor:
+            futures = [executor.submit(self.run, fn, url) for url in urls]
+            for future in futures:
+                yield future.result()
+
+    def map(self, fn: Callable[[W, str], R], urls: Iterable[str]) -> list[R | None]:
+        return list(self.imap(fn, urls))
+
+    def close(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            self._close(worker)
+        self._idle = queue.Queue()
+        self._started = False
+
+    def __enter__(self) -> "BrowserPool[W]":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._workers)
@@ -0,0 +1,185 @@
+"""
+Columnar Export
+---------------
+
+Writes products to Parquet with real types instead of stringified Python:
+prices and ratings are numbers, ``about_product`` is a list of strings, and
+reviews are a ``list<struct<...>>`` column (one row per product, however
+many reviews it has). Rows are written in row groups as they arrive, so an
+export never holds a whole run in memory, and ``load_reviews`` reads a
+million reviews back as flat columns without any ``ast.literal_eval``.
+
+Requires pyarrow (``pip install pyarrow``).
+
+Example usage:
+    with ParquetProductWriter("amazon_products.parquet", PRODUCT_SCHEMA) as writer:
+        for url, product in results:
+            writer.write(product, url=url, source="amazon")
+
+    reviews = load_reviews("amazon_products.parquet").to_pandas()
+"""
+
+from typing import Any, Iterable
+
+from normalize import parse_price, parse_rating, quantity_bounds
+from output_sink import StreamingSink, product_to_dict
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+def _require_pyarrow():
+    if not HAS_PYARROW:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow")
+
+
+if HAS_PYARROW:
+    REVIEW_TYPE = pa.struct([
+        ("title", pa.string()),
+        ("text", pa.string()),
+        ("rating", pa.float64()),
+        ("translated_text", pa.bool_()),
+        ("response_text", pa.string()),
+    ])
+    PRODUCT_SCHEMA = pa.schema([
+        ("url", pa.string()),
+        ("source", pa.string()),
+        ("title", pa.string()),
+        ("price", pa.float64()),
+        ("price_text", pa.string()),
+        ("rating", pa.float64()),
+        ("about_product", pa.list_(pa.string())),
+        ("reviews", pa.list_(REVIEW_TYPE)),
+    ])
+    ALIBABA_SCHEMA = pa.schema([
+        ("url", pa.string()),
+        ("source", pa.string()),
+        ("title", pa.string()),
+        ("key_attributes", pa.map_(pa.string(), pa.string())),
+        ("price_tiers", pa.list_(pa.struct([
+            ("quantity", pa.string()),
+            ("min_quantity", pa.int64()),
+            ("max_quantity", pa.int64()),
+            ("price", pa.float64()),
+            ("price_text", pa.string()),
+        ]))),
+        ("lead_time", pa.list_(pa.struct([
+            ("quantity", pa.string()),
+            ("lead_time", pa.string()),
+        ]))),
+        ("reviews", pa.list_(REVIEW_TYPE)),
+    ])
+
+
+def _review_row(review: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "title": review.get("title"),
+        # AliExpress reviews call their text "content"
+        "text": review.get("text", review.get("content")),
+        "rating": parse_rating(review.get("rating")),
+        "translated_text": review.get("translated_text"),
+        "response_text": review.get("response_text"),
+    }
+
+
+def product_row(product: Any, url: str | None = None, source: str | None = None) -> dict[str, Any]:
+    """Typed row for PRODUCT_SCHEMA (Product) or ALIBABA_SCHEMA (AlibabaProduct)"""
+    data = product_to_dict(product)
+    reviews = [_review_row(review) for review in data.get("reviews") or []]
+    if "key_attributes" in data:
+        tiers = []
+        for quantity, price_text in (data.get("price") or {}).items():
+            low, high = quantity_bounds(quantity)
+            tiers.append({
+                "quantity": quantity, "min_quantity": low, "max_quantity": high,
+                "price": parse_price(price_text), "price_text": price_text,
+            })
+        return {
+            "url": url, "source": source or "alibaba", "title": data.get("title"),
+            "key_attributes": list((data.get("key_attributes") or {}).items()),
+            "price_tiers": tiers,
+            "lead_time": [
+                {"quantity": quantity, "lead_time": lead_time}
+                for quantity, lead_time in (data.get("lead_time") or {}).items()
+            ],
+            "reviews": reviews,
+        }
+    about = data.get("about_product") or []
+    if isinstance(about, str):
+        about = [line for line in about.split("\n") if line]
+    price = data.get("price")
+    return {
+        "url": url, "source": source, "title": data.get("title"),
+        "price": parse_price(price), "price_text": None if price is None else str(price),
+        "rating": parse_rating(data.get("rating")),
+        "about_product": about,
+        "reviews": reviews,
+    }
+
+
+class ParquetProductWriter:
+    def __init__(self, path: str, schema=None, row_group_size: int = 10_000):
+        _require_pyarrow()
+        self.path = path
+        self.schema = schema if schema is not None else PRODUCT_SCHEMA
+        self.row_group_size = row_group_size
+        self._rows: list[dict[str, Any]] = []
+        self._writer = None
+
+    def write(self, product: Any, url: str | None = None, source: str | None = None):
+        self._rows.append(product_row(product, url=url, source=source))
+        if len(self._rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows out as one row group"""
+        if not self._rows:
+            return
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, self.schema, compression="zstd")
+        self._writer.write_table(pa.Table.from_pylist(self._rows, schema=self.schema))
+        self._rows = []
+
+    def close(self):
+        self.flush()
+        if self._writer is None:
+            # nothing written: still leave a valid, empty file behind
+            self._writer = pq.ParquetWriter(self.path, self.schema, compression="zstd")
+        self._writer.close()
+
+    def __enter__(self) -> "ParquetProductWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def export_products(products: Iterable[Any], path: str, schema=None, source: str | None = None):
+    with ParquetProductWriter(path, schema) as writer:
+        for product in products:
+            writer.write(product, source=source)
+
+
+def export_sink(sink: StreamingSink, path: str, schema=None, source: str | None = None):
+    """Export every record of a StreamingSink job, keeping each product's url"""
+    with ParquetProductWriter(path, schema) as writer:
+        for record in sink.records():
+            writer.write(record["product"], url=record["url"], source=source)
+
+
+def load_reviews(path: str, columns: tuple[str, ...] = ("url", "title")):
+    """One row per review with its product's columns, read without any eval"""
+    _require_pyarrow()
+    table = pq.read_table(path, columns=[*columns, "reviews"])
+    reviews = table.column("reviews").combine_chunks()
+    parents = pc.list_parent_indices(reviews)
+    flat = pc.list_flatten(reviews)
+    result = table.select(list(columns)).take(parents)
+    for field, column in zip(REVIEW_TYPE, flat.flatten()):
+        result = result.append_column(f"review_{field.name}", column)
+    return result
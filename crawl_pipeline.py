@@ -0,0 +1,176 @@
+"""
+Streaming Crawl Pipeline
+------------------------
+
+Connects search-result pages to product extraction through a bounded
+asyncio queue, so product workers start on the first URL as soon as the
+first search page is parsed instead of waiting for the whole URL list.
+
+Stages:
+    search:  each search generator (e.g. ``iter_product_urls_az``) runs on its
+             own pooled browser and puts URLs on the queue; a full queue
+             blocks the search until products catch up (backpressure)
+    product: ``product_concurrency`` workers take URLs off the queue and scrape
+             them on the pool
+    sink:    every result is handed to the sink as soon as it is ready
+
+Cancelling ``run`` (Ctrl+C, task.cancel()) stops all stages, closes the
+search generators and returns their browsers to the pool.
+
+Example usage:
+    products = []
+    with BrowserPool(scraper_factory(), size=8) as pool:
+        pipeline = CrawlPipeline(pool, get_product_data_az, sink=products.append)
+        stats = asyncio.run(pipeline.run([
+            partial(iter_product_urls_az, search_query="laptop", max_page_number=3),
+        ]))
+"""
+
+import asyncio
+import inspect
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Iterable, Iterator, TypeVar
+
+from browser_pool import BrowserPool
+
+logger = logging.getLogger(__name__)
+
+W = TypeVar("W")
+R = TypeVar("R")
+
+_DONE = object()
+
+
+@dataclass
+class PipelineStats:
+    urls_found: int = 0
+    scraped: int = 0
+    failed: int = 0
+
+
+class CrawlPipeline(Generic[W, R]):
+    def __init__(
+        self,
+        pool: BrowserPool[W],
+        scrape: Callable[[W, str], R],
+        sink: Callable[[R], Any],
+        queue_size: int = 32,
+        search_concurrency: int = 1,
+        product_concurrency: int | None = None,
+    ):
+        self.pool = pool
+        self.scrape = scrape
+        self.sink = sink
+        self.queue_size = queue_size
+        self.search_concurrency = search_concurrency
+        # leave the search stage its browsers by default
+        self.product_concurrency = product_concurrency or pool.size - search_concurrency
+        # a search holds its browser while blocked on a full queue: with more workers than
+        # browsers, product workers could wait on acquire() forever
+        if search_concurrency < 1 or self.product_concurrency < 1 \
+                or search_concurrency + self.product_concurrency > pool.size:
+            raise ValueError(
+                f"A pool of {pool.size} browsers cannot run {search_concurrency} search and "
+                f"{self.product_concurrency} product workers: each needs a browser of its own"
+            )
+        self.stats = PipelineStats()
+
+    async def _search(
+        self,
+        search: Callable[[W], Iterator[str]],
+        queue: asyncio.Queue,
+        limit: asyncio.Semaphore,
+    ):
+        async with limit:
+            # one thread per search so next() and close() never overlap,
+            # even when the task is cancelled while a page is loading
+            executor = ThreadPoolExecutor(max_workers=1)
+            loop = asyncio.get_running_loop()
+            lease = self.pool.acquire()
+            urls: Iterator[str] | None = None
+            try:
+                worker = await loop.run_in_executor(executor, lease.__enter__)
+                urls = await loop.run_in_executor(executor, lambda: iter(search(worker)))
+                while True:
+                    url = await loop.run_in_executor(executor, next, urls, _DONE)
+                    if url is _DONE:
+                        break
+                    self.stats.urls_found += 1
+                    await queue.put(url)
+            finally:
+                def release():
+                    if urls is not None and hasattr(urls, "close"):
+                        urls.close()
+                    lease.__exit__(None, None, None)
+                executor.submit(release)
+                executor.shutdown(wait=False)
+
+    async def _emit(self, result: R, sink_lock: asyncio.Lock):
+        async with sink_lock:
+            if inspect.iscoroutinefunction(self.sink):
+                await self.sink(result)
+            else:
+                await asyncio.to_thread(self.sink, result)
+
+    async def _product_worker(self, queue: asyncio.Queue, sink_lock: asyncio.Lock):
+        while True:
+            url = await queue.get()
+            try:
+                if url is _DONE:
+                    return
+                result = await asyncio.to_thread(self.pool.run, self.scrape, url)
+                if result is None:
+                    self.stats.failed += 1
+                    continue
+                self.stats.scraped += 1
+                await self._emit(result, sink_lock)
+            finally:
+                queue.task_done()
+
+    async def run(self, searches: Iterable[Callable[[W], Iterator[str]]]) -> PipelineStats:
+        """Run all searches and stream their products to the sink"""
+        await asyncio.to_thread(self.pool.start)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        sink_lock = asyncio.Lock()
+        search_limit = asyncio.Semaphore(self.search_concurrency)
+
+        search_tasks = [
+            asyncio.create_task(self._search(search, queue, search_limit))
+            for search in searches
+        ]
+        product_tasks = [
+            asyncio.create_task(self._product_worker(queue, sink_lock))
+            for _ in range(self.product_concurrency)
+        ]
+        try:
+            for result in await asyncio.gather(*search_tasks, return_exceptions=True):
+                if isinstance(result, Exception):
+                    logger.error(f"Search stage failed: {result}")
+            for _ in product_tasks:
+                await queue.put(_DONE)
+            await asyncio.gather(*product_tasks)
+        finally:
+            for task in search_tasks + product_tasks:
+                task.cancel()
+            await asyncio.gather(*search_tasks, *product_tasks, return_exceptions=True)
+        logger.debug(f"Pipeline finished: {self.stats}")
+        return self.stats
+
+
+if __name__ == "__main__":
+    from functools import partial
+    from browser_pool import DEFAULT_POOL_SIZE, scraper_factory
+    from get_product_data_az import get_product_data_az, iter_product_urls_az
+    from information_types import Product
+
+    products: list[Product] = []
+    # one browser for the search, at least one for the products
+    with BrowserPool(scraper_factory(), size=max(2, DEFAULT_POOL_SIZE)) as pool:
+        pipeline = CrawlPipeline(pool, get_product_data_az, sink=products.append)
+        stats = asyncio.run(pipeline.run([
+            partial(iter_product_urls_az, search_query="laptop", max_page_number=2),
+        ]))
+    print(stats)
+    Product.save_product_data(products)
@@ -1,18 +1,36 @@
 import logging
 import random
 import time
-import csv
-from typing import TypedDict
-from bs4 import BeautifulSoup, Tag
+from datetime import date
+from typing import Any, TypedDict
 from attr import dataclass
 from seleniumbase import DriverContext
 from selenium.webdriver.common.by import By
 import pandas as pd
 from itertools import zip_longest
+from functools import partial
+from page_store import PageStore, ReplayDriver
+from browser_extract import Field, Spec, extract
+from browser_pool import BrowserPool, alibaba_factory
+from readiness import install_network_tracker, navigate, wait_for_selector, wait_until_ready
+from rate_limiter import RateLimiter
+from review_endpoints import fetch_reviews, replay_reviews
+from resource_blocking import BlockingProfile, ResourceBlocker
+from proxy_scheduler import ProxyScheduler
+from rotating_proxy import RotatingProxy
+from output_sink import StreamingSink
+from recrawl_cache import RecrawlCache, page_fingerprint
+import columnar_export
+from sqlite_store import ProductStore
+from url_frontier import URLFrontier, unique_product_urls
+from metrics import METRICS, domain_of, timed
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.DEBUG)
 
+# same test as `"captcha" in page_source.lower()`, without pulling the source over the wire
+CAPTCHA_JS: str = "return document.documentElement.outerHTML.toLowerCase().includes('captcha');"
+
 
 class Review(TypedDict):
     rating: float
@@ -21,7 +39,7 @@ class Review(TypedDict):
     response_text: str | None
 
 
-@dataclass
+@dataclass(slots=True)
 class AlibabaProduct:
     title: str
     key_attributes: dict[str, str]
@@ -38,39 +56,52 @@ class AliBabaScraper:
         window_size: tuple[int, int] = (700, 900),
         max_retries: int = 3,
         ud: bool = False,
+        page_store: PageStore | None = None,
+        replay: bool = False,
+        parser: str | None = None,
+        proxy_scheduler: ProxyScheduler | None = None,
+        rotate_in_place: bool = False,
+        rate_limiter: RateLimiter | None = None,
+        block_profile: str | BlockingProfile | None = "alibaba",
+        page_load_strategy: str = "eager",
+        page_load_timeout: float = 30,
+        ready_timeout: float = 10,
     ):
         """Initialize scraper with proxy rotation"""
+        if replay and page_store is None:
+            raise ValueError("replay mode needs a page_store")
         self.headless = headless
         self.block_images = not load_images
+        self.blocker = ResourceBlocker(block_profile, load_images) if block_profile and not replay else None
         self.window_size = f"{window_size[0]},{window_size[1]}"
         self.max_retries = max_retries
         self.ud = ud
-        self.proxies = self._load_proxies()
-        self.current_proxy_index = 0
-        logger.debug(f"Loaded {len(self.proxies)} proxies")
+        self.page_store = page_store
+        self.replay = replay
+        self.parser = parser
+        # get() returns once the caller's ready selectors match, not at the load event;
+        # the timeout stops a hung page from holding a worker for minutes
+        self.page_load_strategy = page_load_strategy
+        self.page_load_timeout = page_load_timeout
+        self.ready_timeout = ready_timeout
+        # shared by default so every scraper in the process learns from the others
+        self.proxy_scheduler = proxy_scheduler or ProxyScheduler.shared()
+        logger.debug(f"Loaded {len(self.proxy_scheduler)} proxies")
+        # shared as well: parallel workers draw from the same per-domain budget
+        self.rate_limiter = rate_limiter or RateLimiter.shared()
+        # with rotate_in_place chrome always talks to a local forwarder and
+        # rotating proxies only switches the forwarder's upstream
+        self.forwarder = RotatingProxy().start() if rotate_in_place and not replay else None
+        # proxy the current browser was started with (without a forwarder), None for direct
+        self.proxy: str | None = None
+        # whether this browser has been through the cookie banner, see accept_cookies_ex
+        self.cookies_handled = False
 
         logger.debug(f"Initializing Scraper - Headless: {headless}")
 
-    def _load_proxies(self) -> list[str]:
-        """Load proxies from CSV file"""
-        try:
-            proxies = []
-            with open('working_proxies.csv', 'r') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    proxies.append(row['Proxy'])
-            return proxies
-        except Exception as e:
-            logger.error(f"Failed to load proxies: {e}")
-            return []
-
-    def _get_next_proxy(self) -> str | None:
-        """Get next proxy from the list"""
-        if not self.proxies:
-            return None
-        proxy = self.proxies[self.current_proxy_index]
-        self.current_proxy_index = (self.current_proxy_index + 1) % len(self.proxies)
-        return proxy
+    def _get_next_proxy(self, exclude: set[str] = frozenset()) -> str | None:
+        """Get the next proxy from the scheduler, skipping quarantined ones"""
+        return self.proxy_scheduler.choose(exclude=exclude)
 
     def __enter__(self):
         logger.debug("Creating new driver instance")
@@ -79,26 +110,58 @@ class AliBabaScraper:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         logger.debug("Cleaning up driver")
+        if self.replay and hasattr(self, "driver"):
+            delattr(self, "driver")
         if hasattr(self, "driver_context"):
             self.driver_context.__exit__(exc_type, exc_val, exc_tb)
             delattr(self, "driver_context")
             delattr(self, "driver")
+        try:
+            self.proxy_scheduler.save()
+        except OSError as e:
+            logger.warning(f"Failed to save proxy state: {e}")
+        try:
+            self.rate_limiter.save()
+        except OSError as e:
+            logger.warning(f"Failed to save rate limiter state: {e}")
+        if self.forwarder is not None:
+            self.forwarder.stop()
+            self.forwarder = None
 
     def _create_driver(self, proxy: str | None = None):
         """Create a new driver instance with optional proxy"""
+        if self.replay:
+            logger.debug("Replaying pages from snapshot store")
+            self.driver = ReplayDriver(self.page_store)
+            return self
+
+        self.proxy = proxy
+        # a new browser has no consent cookie yet
+        self.cookies_handled = False
+        if self.forwarder is not None:
+            proxy = self.forwarder.address
         if proxy:
             logger.debug(f"Creating driver with proxy: {proxy}")
         
-        self.driver_context = DriverContext(
-            browser="chrome",  # Explicitly set browser
-            headless=self.headless,  # Pass headless flag
-            block_images=self.block_images,
-            window_size=self.window_size,
-            uc=self.ud,
-            proxy=proxy
-        )
+        with METRICS.timer("driver_startup", browser="seleniumbase"):
+            self.driver_context = DriverContext(
+                browser="chrome",  # Explicitly set browser
+                headless=self.headless,  # Pass headless flag
+                block_images=self.block_images,
+                window_size=self.window_size,
+                uc=self.ud,
+                proxy=proxy,
+                # the blocker reads requests loaded and blocked from the performance log
+                log_cdp_events=self.blocker is not None,
+                page_load_strategy=self.page_load_strategy,
+            )
 
-        self.driver = self.driver_context.__enter__()
+            self.driver = self.driver_context.__enter__()
+        self.driver.set_page_load_timeout(self.page_load_timeout)
+        # before the first navigation, so network idle sees the initial load's requests
+        install_network_tracker(self.driver)
+        if self.blocker is not None:
+            self.blocker.apply(self.driver)
 
         # Verify browser visibility
         if not self.headless:
@@ -106,49 +169,165 @@ class AliBabaScraper:
             logger.debug("Browser window maximized")
         return self
 
-    def get(self, url: str) -> bool:
+    def _load(self, url: str, domain: str, ready: str | tuple[str, ...] | None) -> tuple[bool, bool]:
+        """Wait for the domain's rate limit and navigate.
 
-        logger.debug(f"Navigating to: {url}")
-        
-        # First try without proxy
-        try:
-            self.driver.get(url)
-            if "captcha" not in self.driver.page_source.lower():
-                logger.debug("Page loaded successfully without proxy")
-                return True
-        except Exception as e:
-            logger.error(f"Error loading page without proxy: {str(e)}")
+        Returns whether the page shows a captcha and whether the ready
+        selectors matched. The captcha check runs in the browser, the page
+        source is never pulled just to look for one word.
+        """
+        self.rate_limiter.wait(domain)
+        with METRICS.timer("navigate", domain=domain):
+            is_ready = navigate(self.driver, url, ready, self.ready_timeout)
+        with METRICS.timer("captcha_check", domain=domain):
+            return bool(self.driver.execute_script(CAPTCHA_JS)), is_ready
 
-        # If failed, try with proxies
-        for attempt in range(self.max_retries):
-            proxy = self._get_next_proxy()
-            if not proxy:
-                logger.error("No proxies available")
-                return False
+    def get(self, url: str, ready: str | tuple[str, ...] | None = None) -> bool:
+        """Load a page until `ready` selectors match, rotating proxies on captchas and load errors.
 
+        A page that loads but never shows its selectors returns False right away.
+        """
+
+        logger.debug(f"Navigating to: {url}")
+        domain = domain_of(url)
+
+        if self.replay:
             try:
-                logger.debug(f"Attempt {attempt + 1} with proxy {proxy}")
-                # Clean up existing driver
-                if hasattr(self, "driver_context"):
-                    self.driver_context.__exit__(None, None, None)
-                
-                # Create new driver with proxy
-                self._create_driver(proxy=proxy)
-                self.driver.get(url)
-                
-                if "captcha" not in self.driver.page_source.lower():
-                    logger.debug(f"Page loaded successfully with proxy {proxy}")
-                    return True
-                    
+                with METRICS.timer("navigate", domain=domain):
+                    navigate(self.driver, url)
+                return True
             except Exception as e:
-                logger.error(f"Error with proxy {proxy}: {str(e)}")
+                logger.error(f"Error replaying page: {str(e)}")
+                return False
+
+        # First try the current route
+        if self.forwarder is not None and self.forwarder.default_upstream is not None:
+            # going direct again is free with the forwarder
+            self.forwarder.set_upstream(None, drop_connections=True)
+        # without one, going direct means restarting chrome: use the proxy the browser is on and report it
+        route = self.proxy
+        try:
+            start = time.perf_counter()
+            captcha, is_ready = self._load(url, domain, ready)
+            if is_ready and not captcha:
+                logger.debug(f"Page loaded successfully {f'with proxy {route}' if route else 'without proxy'}")
+                self._record_network(url)
+                if route:
+                    self.proxy_scheduler.report_success(route, time.perf_counter() - start)
+                self.rate_limiter.report_success(domain)
+                self._archive(url)
+                return True
+            if not captcha:
+                # the page loaded but never showed its selectors (slow render or selector drift):
+                # another route would not fix that, and the proxy did nothing wrong
+                logger.warning(f"Page {url} never showed {ready}")
+                METRICS.inc("not_ready", domain=domain)
+                return False
+            METRICS.inc("captchas", domain=domain, path="proxy" if route else "direct")
+            self.rate_limiter.report_blocked(domain)
+            if route:
+                METRICS.inc("proxy_failures", domain=domain)
+                self.proxy_scheduler.report_failure(route)
+        except Exception as e:
+            logger.error(f"Error loading page via {route or 'direct connection'}: {str(e)}")
+            METRICS.inc("page_errors", domain=domain)
+            if route:
+                METRICS.inc("proxy_failures", domain=domain)
+                self.proxy_scheduler.report_failure(route)
+
+        # If failed, try with (other) proxies
+        tried: set[str] = {route} if route else set()
+        # includes the driver restarts, so slow proxy rotation shows up on its own
+        with METRICS.timer("proxy_retries", domain=domain):
+            for attempt in range(self.max_retries):
+                proxy = self._get_next_proxy(exclude=tried)
+                if not proxy:
+                    logger.error("No proxies available")
+                    METRICS.inc("proxies_exhausted", domain=domain)
+                    return False
+                tried.add(proxy)
+                METRICS.inc("retries", domain=domain)
+
+                try:
+                    logger.debug(f"Attempt {attempt + 1} with proxy {proxy}")
+                    if self.forwarder is not None:
+                        # same browser, new route: milliseconds instead of a restart
+                        self.forwarder.set_upstream(proxy, drop_connections=True)
+                    else:
+                        # Clean up existing driver
+                        if hasattr(self, "driver_context"):
+                            self.driver_context.__exit__(None, None, None)
+
+                        # Create new driver with proxy
+                        self._create_driver(proxy=proxy)
+                    start = time.perf_counter()
+                    captcha, is_ready = self._load(url, domain, ready)
+
+                    if is_ready and not captcha:
+                        logger.debug(f"Page loaded successfully with proxy {proxy}")
+                        self._record_network(url)
+                        self.proxy_scheduler.report_success(proxy, time.perf_counter() - start)
+                        self.rate_limiter.report_success(domain)
+                        self._archive(url)
+                        return True
+                    if not captcha:
+                        logger.warning(f"Page {url} never showed {ready} with proxy {proxy}")
+                        METRICS.inc("not_ready", domain=domain)
+                        return False
+                    logger.debug(f"Captcha with proxy {proxy}")
+                    METRICS.inc("captchas", domain=domain, path="proxy")
+                    self.rate_limiter.report_blocked(domain)
+                    METRICS.inc("proxy_failures", domain=domain)
+                    self.proxy_scheduler.report_failure(proxy)
+
+                except Exception as e:
+                    logger.error(f"Error with proxy {proxy}: {str(e)}")
+                    METRICS.inc("proxy_failures", domain=domain)
+                    self.proxy_scheduler.report_failure(proxy)
 
         logger.error("Failed to load page with all available proxies")
+        METRICS.inc("failed_pages", domain=domain)
         return False
 
-    def accept_cookies_ex(self):
+    def _record_network(self, url: str):
+        """Report requests loaded and blocked while loading the page"""
+        if self.blocker is not None:
+            self.blocker.record(self.driver, url)
+
+    def _archive(self, url: str):
+        """Write a successfully loaded page to the snapshot store"""
+        if self.page_store is not None:
+            try:
+                with METRICS.timer("page_source", domain=domain_of(url)):
+                    page_source = self.driver.page_source
+                self.page_store.put(url, page_source)
+            except OSError as e:
+                logger.warning(f"Failed to archive {url}: {e}")
+
+    def extract(self, spec: Spec) -> dict[str, Any]:
+        """Extract `spec` from the current page inside the browser, see browser_extract.py.
+
+        get() has already archived the page when recording, so only replay
+        reads the page source.
+        """
+        return extract(
+            self.driver, spec, self.parser, in_browser=not self.replay, domain=domain_of(self.driver.current_url)
+        )
+
+    def accept_cookies_ex(self) -> bool:
+        """Accept the cookie banner, once per browser.
+
+        Only the first page of a browser waits for the banner; once it was
+        accepted (or never showed up) later pages return straight away.
+        """
+        if self.cookies_handled:
+            return True
+        # Wait for the cookie popup instead of a fixed pause
+        if not wait_for_selector(self.driver, "div.gdpr-footer div.gdpr-agree-btn", timeout=5):
+            logger.debug("No cookie banner shown")
+            self.cookies_handled = True
+            return False
         try:
-            time.sleep(2)  # Initial wait for the cookie popup
             # Using the improved Driver methods
             cookie_agree = self.driver.find_element(
                 "div.gdpr-footer div.gdpr-agree-btn"
@@ -156,80 +335,118 @@ class AliBabaScraper:
             if cookie_agree:
                 cookie_agree.click()
                 logger.debug("Cookies accepted successfully")
+                self.cookies_handled = True
                 return True
         except Exception as e:
             logger.error(f"Failed to accept cookies: {e}")
-            return False
-
-
-def extract_title(soup: BeautifulSoup) -> str:
-    title_element = soup.find("h1")
-    return title_element.text.strip() if title_element else "Title not found"
-
-
-def extract_key_attributes(soup: BeautifulSoup) -> dict[str, str]:
-    key_attributes = {}
-    try:
-        attribute_items = soup.select("div.attribute-item")
-        for item in attribute_items:
-            key = item.select_one("div.left")
-            value = item.select_one("div.right")
-            if key and value:
-                key_attributes[key.text.strip()] = value.text.strip()
-    except Exception as e:
-        logger.warning(f"Failed to extract key attributes: {e}")
-    return key_attributes
+        return False
 
 
-def extract_lead_time(soup: BeautifulSoup) -> dict[str, str]:
-    lead_time = {}
-    try:
-        lead_table = soup.select_one("div.lead-layout table")
-        if lead_table:
-            rows = lead_table.select("tr")
-            if len(rows) >= 2:
-                quantities = rows[0].select("td")[1:]
-                times = rows[1].select("td")[1:]
-                for qty, time_to_deliver in zip(quantities, times):
-                    lead_time[qty.text.strip()] = time_to_deliver.text.strip()
-    except Exception as e:
-        logger.warning(f"Failed to extract lead time: {e}")
-    return lead_time
+_REVIEW_INTRO_FIELDS: Spec = {
+    "stars": Field("svg.fa-star", kind="count"),
+    "info": Field("div.review-info"),
+    "translated": Field("div.review-translate", kind="exists"),
+}
+# run in the browser by AliBabaScraper.extract, or over the page source in replay (browser_extract.evaluate)
+PRODUCT_SPEC: Spec = {
+    "title": Field("h1"),
+    "key_attributes": Field("div.attribute-item", many=True, fields={
+        "key": Field("div.left"),
+        "value": Field("div.right"),
+    }),
+    "lead_time": Field("div.lead-layout table", fields={
+        "rows": Field("tr", many=True, fields={"cells": Field("td", many=True)}),
+    }),
+    "price": Field("div.module_price div.price-item", many=True, fields={
+        "quantity": Field("div.quality"),
+        "price": Field("div.price"),
+    }),
+}
+REVIEWS_SPEC: Spec = {
+    "reviews": Field("div.review-list > div", many=True, fields={
+        "company_review": Field("div.company-review", kind="exists"),
+        "company_intro": Field("div.company-review div.review-item div.review-intro", fields=_REVIEW_INTRO_FIELDS),
+        "intro": Field("div.review-intro", fields=_REVIEW_INTRO_FIELDS),
+        "reply": Field("div.review-reply", fields={"info": Field("div.review-info")}),
+    }),
+}
+SEARCH_SPEC: Spec = {
+    "links": Field("a[href*='alibaba.com/product-detail/']", kind="attr", attr="href", many=True),
+}
+
+
+@timed("extract")
+def product_from_fields(values: dict[str, Any]) -> dict[str, Any]:
+    """PRODUCT_SPEC values as the product fields: title, key_attributes, lead_time, price"""
+    rows = (values["lead_time"] or {}).get("rows", [])
+    lead_time = dict(zip(rows[0]["cells"][1:], rows[1]["cells"][1:])) if len(rows) >= 2 else {}
+    return {
+        "title": values["title"] if values["title"] is not None else "Title not found",
+        "key_attributes": {
+            item["key"]: item["value"]
+            for item in values["key_attributes"]
+            if item["key"] is not None and item["value"] is not None
+        },
+        "lead_time": lead_time,
+        "price": {
+            item["quantity"]: item["price"]
+            for item in values["price"]
+            if item["quantity"] is not None and item["price"] is not None
+        },
+    }
 
 
-def extract_price(soup: BeautifulSoup) -> dict[str, str]:
-    price_dict = {}
-    try:
-        price_items = soup.select("div.module_price div.price-item")
-        for item in price_items:
-            quantity = item.select_one("div.quality")
-            price = item.select_one("div.price")
-            if quantity and price:
-                price_dict[quantity.text.strip()] = price.text.strip()
-    except Exception as e:
-        logger.warning(f"Failed to extract price: {e}")
-    return price_dict
+def review_from_fields(values: dict[str, Any]) -> Review:
+    """One REVIEWS_SPEC item as a Review"""
+    review_intro = values["company_intro"] if values["company_review"] else values["intro"]
+    if review_intro is None:
+        return Review(rating=0.0, text="", translated_text=False, response_text=None)
+    review_text = (review_intro["info"] or "").encode("ascii", "ignore").decode("ascii").replace("\n", " ")
+    reply = values["reply"]
+    review_reply_text = (reply["info"] or "") if reply is not None else None
+    return Review(
+        rating=float(review_intro["stars"]),
+        text=review_text,
+        translated_text=review_intro["translated"],
+        response_text=review_reply_text if review_reply_text else None,
+    )
 
 
-def get_paginated_reviews(scraper: AliBabaScraper, max_pages: int = 3) -> list[Review]:
-    """Get reviews from multiple pages"""
+@timed("reviews")
+def get_paginated_reviews(scraper: AliBabaScraper, max_pages: int = 3, url: str | None = None) -> list[Review]:
+    """Get reviews from multiple pages of the product at `url` (the current page by default)"""
+    url = url or scraper.driver.current_url
     all_reviews = []
+    if scraper.replay:
+        # recorded through the review endpoint, or else only the reviews archived with the product page
+        if (reviews := replay_reviews(scraper.page_store, url)) is not None:
+            return reviews
+        return [
+            review
+            for review in map(review_from_fields, scraper.extract(REVIEWS_SPEC)["reviews"])
+            if review["text"]
+        ]
     try:
         # Wait for review section and get pagination
         scraper.driver.wait_for_element("#review-layout", timeout=10)
+        # Rendering the section made the page request its first reviews: fetch every page at once
+        reviews = fetch_reviews(
+            scraper.driver, "alibaba", max_pages, rate_limiter=scraper.rate_limiter,
+            page_store=scraper.page_store, product_url=url,
+        )
+        if reviews is not None:
+            return reviews
         pagination = scraper.driver.find_elements(
             "div.detail-pagination-list button:not(.less)"
         )
 
         if not pagination:
             # Extract reviews from single page
-            review_items = BeautifulSoup(
-                scraper.driver.page_source, "html.parser"
-            ).select("div.review-list > div")
+            review_items = scraper.extract(REVIEWS_SPEC)["reviews"]
             return [
-                extract_review_data(item)
+                review_from_fields(item)
                 for item in review_items
-                if item.select_one("div.review-intro")
+                if item["intro"] is not None
             ]
 
         # Select random number of pages to scrape
@@ -238,13 +455,11 @@ def get_paginated_reviews(scraper: AliBabaScraper, max_pages: int = 3) -> list[R
 
         # Process each page
         for page in range(1, pages_to_scrape + 1):
-            # Get current page reviews
-            review_items = BeautifulSoup(
-                scraper.driver.page_source, "html.parser"
-            ).select("div.review-list > div")
+            # Get current page reviews: only their fields cross the wire, not the page
+            review_items = scraper.extract(REVIEWS_SPEC)["reviews"]
             if review_items:
                 for item in review_items:
-                    review = extract_review_data(item)
+                    review = review_from_fields(item)
                     if review["text"]:
                         all_reviews.append(review)
                     else:
@@ -253,8 +468,8 @@ def get_paginated_reviews(scraper: AliBabaScraper, max_pages: int = 3) -> list[R
                 logger.warning("No reviews found on page")
 
             if page < pages_to_scrape:
-                # Click next page with random delay
-                time.sleep(random.uniform(0.5, 2))
+                # every page click is a request: wait for the domain's budget
+                scraper.rate_limiter.wait("alibaba.com")
 
                 # Find the next page button using the pagination structure
                 pagination = scraper.driver.find_element(
@@ -269,7 +484,8 @@ def get_paginated_reviews(scraper: AliBabaScraper, max_pages: int = 3) -> list[R
                 for i, button in enumerate(next_buttons):
                     if button == active_button and i + 1 < len(next_buttons):
                         next_buttons[i + 1].click()
-                        time.sleep(random.uniform(0.5, 1.5))
+                        # the next page of reviews has rendered and settled
+                        wait_until_ready(scraper.driver, selector="div.review-list > div", quiet_ms=300, timeout=10)
                         break
                 else:
                     raise Exception("Could not find next page button")
@@ -280,64 +496,10 @@ def get_paginated_reviews(scraper: AliBabaScraper, max_pages: int = 3) -> list[R
     return all_reviews
 
 
-def extract_reviews(soup: BeautifulSoup) -> list[Review]:
-    reviews = []
-    try:
-        review_items = soup.select("div.review-list")
-        for review_item in review_items:
-            review = extract_review_data(review_item)
-            if review["text"]:
-                reviews.append(review)
-    except Exception as e:
-        logger.warning(f"Failed to extract reviews: {e}")
-    return reviews
-
-
-def extract_review_data(review_item: Tag) -> Review:
-    # Find review container using select instead of find
-    company_review = review_item.select_one("div.company-review")
-    review_intro = (
-        company_review.select_one("div.review-item div.review-intro")
-        if company_review
-        else review_item.select_one("div.review-intro")
-    )
-
-    review_reply_text = None
-
-    if not review_intro:
-        return Review(rating=0.0, text="", translated_text=False, response_text=None)
-
-    # Extract star rating using select
-    star_rating = len(review_intro.select("svg.fa-star"))
-
-    # Extract review text
-    review_info = review_intro.select_one("div.review-info")
-    review_text = review_info.text.strip() if review_info else ""
-
-    # Check if review is translated
-    translated_text = False
-    review_text = (
-        review_text.encode("ascii", "ignore").decode("ascii").replace("\n", " ")
-    )
-
-    review_translate = review_intro.select_one("div.review-translate")
-    if review_translate:
-        translated_text = True
+# what each extractor needs on the page before it reads it
+SEARCH_READY_SELECTORS: tuple[str, ...] = ("a[href*='alibaba.com/product-detail/']",)
+PRODUCT_READY_SELECTORS: tuple[str, ...] = ("h1",)
 
-    review_reply = review_item.select_one("div.review-reply")
-    if review_reply:
-        review_reply_text = review_reply.select_one("div.review-info")
-        if review_reply_text:
-            review_reply_text = review_reply_text.text.strip()
-        else:
-            review_reply_text = ""
-
-    return Review(
-        rating=float(star_rating),
-        text=review_text,
-        translated_text=translated_text,
-        response_text=review_reply_text if review_reply_text else None,
-    )
 
 def get_search_url(query: str) -> str:
     base_url = "https://www.alibaba.com/trade/search"
@@ -350,73 +512,111 @@ def get_search_url(query: str) -> str:
     return f"{base_url}?{query_string}"
 
 def get_product_links(search_query: str, scraper) -> list[str]:
-    if scraper.get(get_search_url(search_query)):
+    if scraper.get(get_search_url(search_query), ready=SEARCH_READY_SELECTORS):
 
-        data = scraper.driver.page_source
-        soup = BeautifulSoup(data, 'html.parser')
-        links = soup.find_all('a', href=True)
-        return [link['href'] for link in links if 'alibaba.com/product-detail/' in link['href']]
+        links = scraper.extract(SEARCH_SPEC)["links"]
+        # every card links its product several times (image, title, price)
+        return list(unique_product_urls(links))
     else:
         logger.error("Failed to load search results")
         return []
 
-def get_product_information(url: str,scraper,first:bool) -> AlibabaProduct:
-
-    if scraper.get(url):
-        if first:
+@timed("product")
+def get_product_information(url: str,scraper,first:bool, cache: RecrawlCache | None = None) -> AlibabaProduct:
+    # Nothing can have gone stale yet: skip the page load altogether
+    if cache is not None and (cached := cache.fresh(url)) is not None:
+        return AlibabaProduct(**cached)
+    if scraper.get(url, ready=PRODUCT_READY_SELECTORS):
+        if first and not scraper.replay:
             scraper.accept_cookies_ex()
             first = False
-        data = scraper.driver.page_source
-        time.sleep(random.randint(1, 5))
-        soup = BeautifulSoup(data, "html.parser")
-        title = extract_title(soup)
-        key_attributes = extract_key_attributes(soup)
-        lead_time = extract_lead_time(soup)
-        price = extract_price(soup)
-        reviews = get_paginated_reviews(scraper=scraper, max_pages=20)
-        return AlibabaProduct(
+        fields = product_from_fields(scraper.extract(PRODUCT_SPEC))
+        title = fields["title"]
+        key_attributes = fields["key_attributes"]
+        lead_time = fields["lead_time"]
+        price = fields["price"]
+        fingerprint = page_fingerprint(title, key_attributes)
+        # Unchanged page and reviews still fresh: skip paging through the reviews
+        reviews = cache.reuse(url, fingerprint, "reviews") if cache is not None else None
+        reused = ("reviews",) if reviews is not None else ()
+        if reviews is None:
+            reviews = get_paginated_reviews(scraper=scraper, max_pages=20, url=url)
+        product = AlibabaProduct(
             title=title,
             key_attributes=key_attributes,
             price=price,
             reviews=reviews,
             lead_time=lead_time,
         )
+        if cache is not None:
+            cache.put(url, product, fingerprint, reused=reused)
+        return product
     else:
         logger.error("Failed to load page")
         return AlibabaProduct(title="Error", key_attributes={}, price={}, reviews=[], lead_time={})
 
+def get_alibaba_product(scraper: AliBabaScraper, url: str, cache: RecrawlCache | None = None) -> AlibabaProduct:
+    """Pool-friendly wrapper: scrape one product link from get_product_links"""
+    if url.startswith("//"):
+        url = "https:" + url
+    # pacing between products is up to the scraper's rate limiter
+    return get_product_information(url, scraper, first=True, cache=cache)
+
+
+def write_products_csv(products: list[AlibabaProduct], filename: str):
+    """Flatten products (one column group per review) into a single CSV"""
+    data = []
+    for product in products:
+        # Flatten the nested structure
+        row = {
+            'title': product.title,
+            'key_attributes': str(product.key_attributes),
+            'price': str(product.price),
+            'lead_time': str(product.lead_time)
+        }
+
+        # Add reviews as separate columns
+        for i, review in enumerate(product.reviews):
+            row[f'review_{i+1}_rating'] = review['rating']
+            row[f'review_{i+1}_text'] = review['text']
+            row[f'review_{i+1}_translated'] = review['translated_text']
+            row[f'review_{i+1}_response'] = review['response_text']
+
+        data.append(row)
+
+    df = pd.DataFrame(data)
+    df.to_csv(filename, index=False, encoding='utf-8')
+
+
 if __name__ == "__main__":
-    with AliBabaScraper(headless=False) as scraper:
-        product_list = []
-        search_term = "portable air conditioner"
-        urls =get_product_links(search_term, scraper)
-        for url in urls:
-            url = "https:" + url 
-            product = get_product_information(url,scraper,first=True)
-            time.sleep(random.randint(1, 3))
-            product_list.append(product)
-            # Convert product list to DataFrame
-            data = []
-            for product in product_list:
-                # Flatten the nested structure
-                row = {
-                    'title': product.title,
-                    'key_attributes': str(product.key_attributes),
-                    'price': str(product.price),
-                    'lead_time': str(product.lead_time)
-                }
-                
-                # Add reviews as separate columns
-                for i, review in enumerate(product.reviews):
-                    row[f'review_{i+1}_rating'] = review['rating']
-                    row[f'review_{i+1}_text'] = review['text']
-                    row[f'review_{i+1}_translated'] = review['translated_text']
-                    row[f'review_{i+1}_response'] = review['response_text']
-
-                data.append(row)
-
-            df = pd.DataFrame(data)
-
-            # Save to CSV
-            df.to_csv(f'{search_term}_products.csv', index=False, encoding='utf-8')
-            print(f"Data saved to {search_term}_products.csv")
\ No newline at end of file
+    search_term = "portable air conditioner"
+    # re-running on the same day resumes that day's job where it stopped;
+    # products scraped by earlier runs are skipped until their re-crawl TTL expires
+    job_id = f"alibaba-{search_term}-{date.today().isoformat()}"
+    with StreamingSink(job_id) as sink, URLFrontier("alibaba") as frontier, \
+            RecrawlCache() as cache, BrowserPool(alibaba_factory(headless=False)) as pool:
+        urls = sink.load_frontier()
+        if urls is None:
+            with pool.acquire() as scraper:
+                urls = sink.save_frontier(frontier.filter(get_product_links(search_term, scraper), recrawl=cache.due))
+        pending = sink.pending(urls)
+        for url, product in zip(pending, pool.imap(partial(get_alibaba_product, cache=cache), pending)):
+            if product is None or product.title == "Error":
+                continue
+            # durable as soon as it is written, no full rewrite per product
+            sink.write(url, product)
+            frontier.mark_done(url)
+
+        # Save to CSV once, at the end of the run
+        write_products_csv(sink.load_products(AlibabaProduct), f'{search_term}_products.csv')
+        print(f"Data saved to {search_term}_products.csv")
+        if columnar_export.HAS_PYARROW:
+            columnar_export.export_sink(
+                sink, f"{search_term}_products.parquet", columnar_export.ALIBABA_SCHEMA, source="alibaba"
+            )
+            print(f"Data saved to {search_term}_products.parquet")
+        with ProductStore() as store:
+            store.import_sink(sink, source="alibaba")
+    print(METRICS.summary())
+    METRICS.write_prometheus("alibaba_metrics.prom")
+    METRICS.write_jsonl("metrics.jsonl", run_id=job_id)
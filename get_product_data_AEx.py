@@ -1,23 +1,161 @@
-from bs4 import BeautifulSoup
+from datetime import date
+from functools import partial
+from browser_pool import BrowserPool, scraper_factory
+from html_parser import parse_html
+from browser_extract import Field, Spec, run_in_browser
+from readiness import scroll_until_stable, wait_for_dom_quiet, wait_for_selector, wait_until_ready
+from embedded_json import aliexpress_fields
+from review_endpoints import fetch_reviews, replay_reviews
 from information_types import Product, Scraper
+from metrics import METRICS, timed
+from output_sink import StreamingSink
+from rate_limiter import RateLimiter
+from recrawl_cache import RecrawlCache, page_fingerprint
+import columnar_export
+from sqlite_store import ProductStore
+from url_frontier import URLFrontier, canonical_product_url, product_key
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time
+import logging
+from typing import Callable, Iterator
+
+logger = logging.getLogger(__name__)
 
 BASE_URL: str = "https://www.aliexpress.com/w/wholesale-"
 URL_SUFFIX: str = ".html"
+REVIEW_ITEM_SELECTOR: str = "div.list--itemWrap--ARYTMbR"
+PRODUCT_TITLE_SELECTOR: str = "h1[data-pl='product-title']"
+SEARCH_RESULT_SELECTOR: str = ".list--gallery--C2f2tvm.search-item-card-wrapper-gallery"
+PRODUCT_PRICE_SELECTOR: str = "span.price--currentPriceText--V8_y_b5.pdp-comp-price-current.product-price-value"
+# what each extractor needs on the page before it reads it
+SEARCH_READY_SELECTORS: tuple[str, ...] = (SEARCH_RESULT_SELECTOR,)
+PRODUCT_READY_SELECTORS: tuple[str, ...] = (PRODUCT_TITLE_SELECTOR, PRODUCT_PRICE_SELECTOR)
+
+SEARCH_SPEC_AE: Spec = {
+    "results": Field(SEARCH_RESULT_SELECTOR, many=True, fields={
+        "href": Field("a.multi--container--1UZxxHY.cards--card--3PJxwBm.search-card-item", kind="attr", attr="href"),
+    }),
+}
+# Run against the review modal with scroll=True: returns only the reviews not
+# returned by an earlier call, marking them so they are never sent twice, and
+# scrolls the modal so the next batch loads.
+NEW_REVIEWS_SPEC_AE: Spec = {
+    "reviews": Field(f"{REVIEW_ITEM_SELECTOR}:not([data-harvested])", many=True, mark="data-harvested", fields={
+        "text": Field(),  # whole node text, the dedup key
+        "content": Field("div.list--itemReview--xQUhO78"),
+        "rating": Field("span.comet-icon-starreviewfilled", kind="count"),
+    }),
+}
+
+
+def clean_review_text(text: str) -> str:
+    # clean text from emojis and \n
+    return text.encode('ascii', 'ignore').decode('ascii').replace("\n", " ")
+
+
+@timed("extract")
+def extract_review_AE(element) -> dict[str, str | int]:
+    rating = len(element.select("span.comet-icon-starreviewfilled"))
+    review_text_elem = element.select_one("div.list--itemReview--xQUhO78")
+    review_text = review_text_elem.get_text(strip=True) if review_text_elem else ""
+    return {"content": clean_review_text(review_text), "rating": rating}
+
+
+class ReviewCollector:
+    """Keeps the reviews seen so far, deduplicated by a stable key"""
+
+    def __init__(self, max_reviews: int):
+        self.max_reviews = max_reviews
+        self.reviews: list[dict[str, str | int]] = []
+        self._seen: set[int] = set()
+
+    @property
+    def full(self) -> bool:
+        return len(self.reviews) >= self.max_reviews
+
+    def add(self, element) -> bool:
+        """Add a review node, returns False if it was already collected"""
+        review = extract_review_AE(element)
+        # the whole node text includes reviewer name and date, so two
+        # different people writing "Good" do not collapse into one review
+        return self._add(review, hash((element.get_text(" ", strip=True), review["rating"])))
+
+    def add_fields(self, values: dict) -> bool:
+        """Add a review extracted in the browser with NEW_REVIEWS_SPEC_AE"""
+        review = {"content": clean_review_text(values["content"] or ""), "rating": values["rating"]}
+        return self._add(review, hash((values["text"], review["rating"])))
+
+    def _add(self, review: dict[str, str | int], key: int) -> bool:
+        if key in self._seen or self.full:
+            return False
+        self._seen.add(key)
+        self.reviews.append(review)
+        return True
+
+    def add_html(self, html: str, parser: str | None = None) -> int:
+        """Parse a batch of review nodes, returns how many were new"""
+        soup = parse_html(html, parser)
+        return sum(self.add(element) for element in soup.select(REVIEW_ITEM_SELECTOR))
+
+
+def collect_reviews_AE(
+    scraper: Scraper,
+    max_reviews: int = 50,
+    max_idle_scrolls: int = 3,
+    scroll_timeout: float = 2.0,
+    max_pages: int = 10,
+    url: str | None = None,
+) -> list[dict[str, str | int]]:
+    collector = ReviewCollector(max_reviews)
+    # the product page the reviews belong to, the key their archived endpoint pages are stored under
+    url = url or scraper.driver.current_url
+    if scraper.replay:
+        # recorded through the review endpoint, or else the archived page holds every review that was loaded
+        if (reviews := replay_reviews(scraper.page_store, url, max_reviews)) is not None:
+            return reviews
+        collector.add_html(scraper.read_page(), scraper.parser)
+        return collector.reviews
+
+    # opening the modal made the page call its review endpoint: fetch the other pages concurrently
+    reviews = fetch_reviews(
+        scraper.driver, "aliexpress", max_pages, max_reviews, rate_limiter=scraper.rate_limiter,
+        page_store=scraper.page_store, product_url=url,
+    )
+    if reviews is not None:
+        return reviews
 
-def get_product_page_data_AE(scraper: Scraper, url: str, max_reviews: int = 50) -> Product:
-    # Wait for the page to load
-    scraper.driver.get(url)
-    time.sleep(3)  
-    soup = BeautifulSoup(scraper.driver.page_source, "html.parser")
-    # Extract specifications
+    try:
+        reviews_container = scraper.driver.find_element(By.CLASS_NAME, "comet-v2-modal-body")
+        scraper.driver.execute_script("arguments[0].scrollIntoView(true);", reviews_container)
+        idle_scrolls = 0
+        with METRICS.timer("scroll", domain="aliexpress.com"):
+            while not collector.full and idle_scrolls < max_idle_scrolls:
+                # only the fields of the new reviews cross the wire, never the page
+                new_items = run_in_browser(
+                    scraper.driver, NEW_REVIEWS_SPEC_AE, ".comet-v2-modal-body", scroll=True, domain="aliexpress.com"
+                )
+                added = sum(collector.add_fields(item) for item in (new_items or {}).get("reviews", []))
+                idle_scrolls = 0 if added else idle_scrolls + 1
+                if not collector.full:
+                    # returns as soon as the modal appends a review we have not harvested
+                    wait_for_selector(
+                        scraper.driver,
+                        f".comet-v2-modal-body {REVIEW_ITEM_SELECTOR}:not([data-harvested])",
+                        timeout=scroll_timeout,
+                    )
+    except Exception as e:
+        print(f"Failed to load reviews: {e}")
+
+    if scraper.page_store is not None:
+        # archive the page with its review modal opened for replay
+        scraper.read_page()
+    return collector.reviews
+
+
+@timed("extract")
+def extract_specs_AE(soup) -> list[str]:
     spec_list = []
-    reviews = []
-    
-    
     specifications = soup.select("div.specification--prop--Jh28bKu")
     for spec in specifications:
         title_element = spec.select_one("div.specification--title--SfH3sA8")
@@ -26,85 +164,116 @@ def get_product_page_data_AE(scraper: Scraper, url: str, max_reviews: int = 50)
             title = title_element.get_text(strip=True)
             description = desc_element.get_text(strip=True)
             spec_list.append(f"{title}: {description}")
+    return spec_list
 
-    # Extract title and price
-    title_elem = soup.select_one("h1[data-pl='product-title']")
-    title = title_elem.get_text(strip=True) if title_elem else "N/A"
-    price_elem = soup.select_one("span.price--currentPriceText--V8_y_b5.pdp-comp-price-current.product-price-value")
-    price = price_elem.get_text(strip=True) if price_elem else "N/A"
-    # Extract star rating from the rating element 
+
+@timed("extract")
+def extract_title_AE(soup) -> str:
+    title_elem = soup.select_one(PRODUCT_TITLE_SELECTOR)
+    return title_elem.get_text(strip=True) if title_elem else "N/A"
+
+
+@timed("extract")
+def extract_price_AE(soup) -> str:
+    price_elem = soup.select_one(PRODUCT_PRICE_SELECTOR)
+    return price_elem.get_text(strip=True) if price_elem else "N/A"
+
+
+@timed("extract")
+def extract_rating_AE(soup) -> float:
+    # Extract star rating from the rating element
     stars_element = soup.select_one("div.header--num--GaAGwoZ")
-    stars = float(stars_element.get_text(strip=True)) if stars_element else 0
-    # Click "View More" to load reviews
-    try:
-        # Try CSS selector first
-        show_more_button = WebDriverWait(scraper.driver, 10).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, 
-                "button.comet-v2-btn.comet-v2-btn-slim.comet-v2-btn-large.comet-v2-btn-important"))
+    return float(stars_element.get_text(strip=True)) if stars_element else 0
+
+
+# selector fallbacks, used only for the fields the page's runParams did not have
+DOM_EXTRACTORS_AE: dict[str, Callable] = {
+    "title": extract_title_AE,
+    "price": extract_price_AE,
+    "rating": extract_rating_AE,
+    "about_product": extract_specs_AE,
+}
+
+
+@timed("product")
+def get_product_page_data_AE(
+    scraper: Scraper,
+    url: str,
+    max_reviews: int = 50,
+    cache: RecrawlCache | None = None,
+    use_json: bool = True,
+    max_review_pages: int = 10,
+) -> Product:
+    # Nothing can have gone stale yet: skip the page load altogether
+    if cache is not None and (cached := cache.fresh(url)) is not None:
+        return Product(**cached)
+    # runParams is in the served document: no need to wait for rendering to read it
+    scraper.get(url, ready=None if use_json else PRODUCT_READY_SELECTORS)
+    html = scraper.read_page()
+    fields = aliexpress_fields(html) if use_json else {}
+    missing = [name for name in DOM_EXTRACTORS_AE if name not in fields]
+    if missing:
+        if use_json:
+            # the selectors need the rendered page
+            logger.debug(f"Not in runParams, falling back to selectors: {missing}")
+            wait_until_ready(scraper.driver, selector=PRODUCT_READY_SELECTORS, timeout=scraper.ready_timeout)
+            html = scraper.read_page()
+        soup = parse_html(html, scraper.parser)
+        for name in missing:
+            fields[name] = DOM_EXTRACTORS_AE[name](soup)
+    METRICS.inc("fields_from_json", len(DOM_EXTRACTORS_AE) - len(missing), domain="aliexpress.com")
+    METRICS.inc("fields_from_dom", len(missing), domain="aliexpress.com")
+    title, price, stars, spec_list = fields["title"], fields["price"], fields["rating"], fields["about_product"]
+    fingerprint = page_fingerprint(title, stars, spec_list)
+    # Unchanged page and reviews still fresh: no need to open and scroll the review modal
+    if cache is not None and (reviews := cache.reuse(url, fingerprint, "reviews")) is not None:
+        product = Product(title=title, price=price, rating=stars if stars else 0, about_product=spec_list, reviews=reviews)
+        cache.put(url, product, fingerprint, reused=("reviews",))
+        return product
+    # The page may have requested its first reviews already: then no modal is needed
+    if scraper.replay:
+        reviews = replay_reviews(scraper.page_store, url, max_reviews)
+    else:
+        reviews = fetch_reviews(
+            scraper.driver, "aliexpress", max_review_pages, max_reviews, rate_limiter=scraper.rate_limiter,
+            page_store=scraper.page_store, product_url=url,
         )
-        
-        # If CSS fails, try XPath as backup
-        if not show_more_button:
+    if reviews is None:
+        # Click "View More" to load reviews
+        try:
+            # Try CSS selector first
             show_more_button = WebDriverWait(scraper.driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, 
-                    "//button[contains(@class, 'comet-v2-btn-important')]//font[contains(text(), 'Show More')]"))
+                EC.element_to_be_clickable((By.CSS_SELECTOR, 
+                    "button.comet-v2-btn.comet-v2-btn-slim.comet-v2-btn-large.comet-v2-btn-important"))
             )
         
-        # Scroll button into view
-        scraper.driver.execute_script("arguments[0].scrollIntoView(true);", show_more_button)
-        time.sleep(1)
+            # If CSS fails, try XPath as backup
+            if not show_more_button:
+                show_more_button = WebDriverWait(scraper.driver, 10).until(
+                    EC.element_to_be_clickable((By.XPATH, 
+                        "//button[contains(@class, 'comet-v2-btn-important')]//font[contains(text(), 'Show More')]"))
+                )
         
-        # Click using JavaScript
-        scraper.driver.execute_script("arguments[0].click();", show_more_button)
-        time.sleep(2)
-
-    except Exception as e:
-        print(f"Failed to click 'Show More' button: {e}")
-    # Optional: Take screenshot for debugging
-    scraper.driver.save_screenshot("error_screenshot.png")
-    # Load reviews
+            # Scroll button into view
+            scraper.driver.execute_script("arguments[0].scrollIntoView(true);", show_more_button)
 
-    try:
-        reviews_container = scraper.driver.find_element(By.CLASS_NAME, "comet-v2-modal-body")
-        scraper.driver.execute_script("arguments[0].scrollIntoView(true);", reviews_container)
-        while len(reviews) < max_reviews:
-            scraper.driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", reviews_container)
-            time.sleep(1)
-            soup = BeautifulSoup(scraper.driver.page_source, "html.parser")
-            review_elements = soup.select("div.list--itemWrap--ARYTMbR")
-            for element in review_elements:
-                if len(reviews) >= max_reviews:
-                    break
-                rating = len(element.select("span.comet-icon-starreviewfilled"))
-                review_text_elem = element.select_one("div.list--itemReview--xQUhO78")
-                review_text = review_text_elem.get_text(strip=True) if review_text_elem else ""
-                review_text = review_text.encode('ascii', 'ignore').decode('ascii').replace("\n", " ")
-                reviews.append({"content": review_text, "rating": rating})
-            if not review_elements:
-                break
-    except Exception as e:
-        print(f"Failed to load reviews: {e}")
+            # Click using JavaScript and wait for the first reviews in the modal
+            scraper.driver.execute_script("arguments[0].click();", show_more_button)
+            wait_for_selector(scraper.driver, f".comet-v2-modal-body {REVIEW_ITEM_SELECTOR}", timeout=10)
 
-    # Parse reviews
-    soup = BeautifulSoup(scraper.driver.page_source, "html.parser")
-    review_elements = soup.select("div.list--itemWrap--ARYTMbR")[:max_reviews]
-    for element in review_elements:
-        rating = len(element.select("span.comet-icon-starreviewfilled"))
-        review_text_elem = element.select_one("div.list--itemReview--xQUhO78")
-        review_text = review_text_elem.get_text(strip=True) if review_text_elem else ""
-        # clean text from emojis and \n 
-        review_text = review_text.encode('ascii', 'ignore').decode('ascii').replace("\n", " ")
-        reviews.append({"content": review_text, "rating": rating})
+        except Exception as e:
+            print(f"Failed to click 'Show More' button: {e}")
+        # Optional: Take screenshot for debugging
+        scraper.driver.save_screenshot("error_screenshot.png")
+        # Load reviews
+        reviews = collect_reviews_AE(scraper, max_reviews, max_pages=max_review_pages, url=url)
 
-    return Product(title=title, price=price,rating=stars if stars else 0, about_product=spec_list, reviews=reviews)
+    product = Product(title=title, price=price,rating=stars if stars else 0, about_product=spec_list, reviews=reviews)
+    if cache is not None:
+        cache.put(url, product, fingerprint)
+    return product
 
-def get_product_urls_AE(scraper: Scraper, search_query: str, max_page_number: int = 4) -> list[str]:
-    formatted_query = search_query.replace(" ", "-")
-    initial_url = f"{BASE_URL}{formatted_query}{URL_SUFFIX}"
-    scraper.driver.get(initial_url)
-    product_urls = []
-    current_page = 1
-    
+def accept_cookies_AE(scraper: Scraper):
     try:
         # Try to find cookie button
         cookie_button = WebDriverWait(scraper.driver, 10).until(
@@ -113,8 +282,7 @@ def get_product_urls_AE(scraper: Scraper, search_query: str, max_page_number: in
         
         # Scroll button into view
         scraper.driver.execute_script("arguments[0].scrollIntoView(true);", cookie_button)
-        time.sleep(1)
-        
+
         # Try JavaScript click
         scraper.driver.execute_script("arguments[0].click();", cookie_button)
         
@@ -130,60 +298,75 @@ def get_product_urls_AE(scraper: Scraper, search_query: str, max_page_number: in
             scraper.driver.execute_script("""
                 document.querySelector('.btn-accept').click();
             """)
-            time.sleep(2)
+            wait_for_dom_quiet(scraper.driver, quiet_ms=300, timeout=5)
         except Exception as e2:
             print(f"Alternative cookie handling failed: {e2}")
+
+
+def load_lazy_search_results(scraper: Scraper):
+    # Scroll down in the browser until lazy loading stops growing the page
+    scroll_until_stable(scraper.driver, step=500)
+    # Wait for elements to be present
+    wait_for_selector(scraper.driver, SEARCH_RESULT_SELECTOR, timeout=5)
+
+
+def iter_product_urls_AE(scraper: Scraper, search_query: str, max_page_number: int = 4) -> Iterator[str]:
+    """Yield product URLs page by page, as soon as each search page is parsed"""
+    formatted_query = search_query.replace(" ", "-")
+    initial_url = f"{BASE_URL}{formatted_query}{URL_SUFFIX}"
+    scraper.get(initial_url, ready=SEARCH_READY_SELECTORS)
+    current_page = 1
+    seen: set[str] = set()
+
+    if not scraper.replay:
+        accept_cookies_AE(scraper)
     while current_page <= max_page_number:
-        # Scroll down gradually to trigger lazy loading
-        last_height = scraper.driver.execute_script("return document.body.scrollHeight")
-        while True:
-            # Scroll down in smaller increments
-            for i in range(0, last_height, 500):
-                scraper.driver.execute_script(f"window.scrollTo(0, {i});")
-                time.sleep(1)  # Short pause to let content load
-
-            # Calculate new scroll height and check if we've reached the bottom
-            new_height = scraper.driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                break
-            last_height = new_height
-
-        # Wait for elements to be present
-        WebDriverWait(scraper.driver, 5).until(
-            EC.presence_of_all_elements_located(
-                (By.CSS_SELECTOR, ".list--gallery--C2f2tvm.search-item-card-wrapper-gallery")
-            )
-        )
+        if not scraper.replay:
+            load_lazy_search_results(scraper)
 
-        soup = BeautifulSoup(scraper.driver.page_source, "html.parser")
-        search_results = soup.find_all('div', {'class': 'list--gallery--C2f2tvm search-item-card-wrapper-gallery'})
-        
-        for result in search_results:
-            product_link = result.find("a", {"class": "multi--container--1UZxxHY cards--card--3PJxwBm search-card-item"})
-            if product_link and (link := product_link.get("href")):
-                link_url = "http:" + link
-                if link_url.startswith("http://nl."):
-                    link_url = link_url.replace("http://nl.", "http://", 1)
-                product_urls.append(link_url)
+        for result in scraper.extract(SEARCH_SPEC_AE)["results"]:
+            if (link := result["href"]) and (key := product_key(link)) not in seen:
+                seen.add(key)
+                yield canonical_product_url(link)
 
         current_page += 1
         if current_page <= max_page_number:
             next_url = f"{initial_url}?page={current_page}"
-            scraper.driver.get(next_url)
+            scraper.get(next_url, ready=SEARCH_READY_SELECTORS)
         else:
             break
 
-    return product_urls
+
+def get_product_urls_AE(scraper: Scraper, search_query: str, max_page_number: int = 4) -> list[str]:
+    return list(iter_product_urls_AE(scraper, search_query, max_page_number))
+
 
 if __name__ == "__main__":
     search_query = "wireless earbuds"
-    scraper = Scraper(headless=False, load_images=True)
-    product_urls = get_product_urls_AE(scraper, search_query,1)
-    products = []
-    for url in product_urls:
-        product = get_product_page_data_AE(scraper, url)
-        products.append(product)
-        print(product)
-    scraper.driver.quit()
+    limiter = RateLimiter.shared()
+    # re-running on the same day resumes that day's job where it stopped;
+    # products scraped by earlier runs are skipped until their re-crawl TTL expires
+    job_id = f"aliexpress-{search_query}-{date.today().isoformat()}"
+    with StreamingSink(job_id) as sink, URLFrontier("aliexpress") as frontier, \
+            RecrawlCache() as cache, BrowserPool(scraper_factory(headless=False, load_images=True, rate_limiter=limiter, block_profile="aliexpress")) as pool:
+        product_urls = sink.load_frontier()
+        if product_urls is None:
+            with pool.acquire() as scraper:
+                product_urls = sink.save_frontier(frontier.filter(iter_product_urls_AE(scraper, search_query,1), recrawl=cache.due))
+        pending = sink.pending(product_urls)
+        for url, product in zip(pending, pool.imap(partial(get_product_page_data_AE, cache=cache), pending)):
+            if product is not None:
+                sink.write(url, product)
+                frontier.mark_done(url)
+                print(product)
+        products = sink.load_products(Product)
+        if columnar_export.HAS_PYARROW:
+            columnar_export.export_sink(sink, "aliexpress_products.parquet", source="aliexpress")
+        with ProductStore() as store:
+            store.import_sink(sink, source="aliexpress")
     Product.save_product_data(products, "aliexpress_products.csv")
+    limiter.save()
+    print(METRICS.summary())
+    METRICS.write_prometheus("aliexpress_metrics.prom")
+    METRICS.write_jsonl("metrics.jsonl", run_id=job_id)
     
\ No newline at end of file
@@ -3,7 +3,7 @@ Amazon Product Scraper
 ---------------------
 
 A web scraping module for extracting product information from Amazon Netherlands (amazon.nl).
-Uses Selenium WebDriver and BeautifulSoup for automated data collection.
+Uses Selenium WebDriver and a pluggable HTML parser (html_parser.py) for automated data collection.
 
 Constants:
     BASE_URL (str): Base search URL for Amazon Netherlands
@@ -27,6 +27,9 @@ Classes:
             load_images (bool): Load page images (default: False)
             options (Options): Chrome WebDriver options
             window_size (tuple): Browser window size (default: 700x900)
+            page_store (PageStore): Archive every page read (default: None)
+            replay (bool): Serve pages from page_store, no browser (default: False)
+            parser (str): HTML parser backend, lxml/selectolax/html.parser (default: best available)
 
 Functions:
     get_product_urls_az:
@@ -40,81 +43,142 @@ Functions:
         Returns:
             list[str]: List of product URLs
 
+    iter_product_urls_az:
+        Same as get_product_urls_az but yields URLs as each search page is parsed
+
     get_product_data_az:
         Scrapes detailed product information
         Args:
             scraper (Scraper): Scraper instance
-            url (str): Product page URL
+            url (str): Product page URL (path on amazon.nl or absolute URL)
+            fetcher (HybridFetcher): Try plain HTTP before the browser (default: None)
         Returns:
             Product: Product object with scraped data
 
 Main workflow:
-1. Initialize Scraper
+1. Start a pool of Scrapers (browser_pool.BrowserPool)
 2. Get product URLs from search
-3. Scrape details for each product
-4. Save results to CSV
+3. Scrape details for each product in parallel
+4. Stream each product to a resumable job (output_sink.StreamingSink)
+5. Save results to CSV
 
 Example usage:
     scraper = Scraper()
     urls = get_product_urls_az(scraper, "laptop", max_page_number=1)
     products = [get_product_data_az(scraper, url) for url in urls]
     Product.save_product_data(products)
+
+    # re-run extraction over archived pages without a browser
+    scraper = Scraper(page_store=PageStore("snapshots"), replay=True)
 """
 
-from bs4 import BeautifulSoup, Tag
-from urllib.parse import quote
+from datetime import date
+from functools import partial
+from typing import Iterator
+from urllib.parse import quote, urlsplit
+from browser_pool import BrowserPool, scraper_factory
+from html_parser import is_element, parse_html
+from browser_extract import Field, Spec
+from http_fetch import AMAZON_PRODUCT_SELECTORS, HybridFetcher
 from information_types import Product, Scraper
+from metrics import METRICS, timed
+from normalize import price_from_parts
+from embedded_json import amazon_fields
+from output_sink import StreamingSink
+from rate_limiter import RateLimiter
+from recrawl_cache import RecrawlCache, page_fingerprint
+import columnar_export
+from sqlite_store import ProductStore
+from url_frontier import URLFrontier, canonical_product_url, product_key
 BASE_URL: str = "https://www.amazon.nl/s?k="
+PRODUCT_BASE_URL: str = "https://www.amazon.nl"
+# what each extractor needs on the page before it reads it
+SEARCH_READY_SELECTORS: tuple[str, ...] = ("div[data-component-type='s-search-result']",)
+PRODUCT_READY_SELECTORS: tuple[str, ...] = AMAZON_PRODUCT_SELECTORS
+SEARCH_SPEC_AZ: Spec = {
+    "results": Field("div[data-component-type='s-search-result']", many=True, fields={
+        "sponsored": Field("span.puis-label-popover-hover", kind="exists"),
+        "href": Field("a.a-link-normal.s-no-outline", kind="attr", attr="href"),
+    }),
+}
 
 
-def get_product_urls_az(
+def iter_product_urls_az(
     scraper: Scraper,
     search_query: str,
     max_page_number: int = 4,
     skip_ads: bool = True,
     results_in_dutch: bool = False,
-) -> list[str]:
+) -> Iterator[str]:
+    """Yield product URLs page by page, as soon as each search page is parsed"""
     formatted_query = quote(search_query)
     if results_in_dutch:
         initial_url = f"{BASE_URL}{formatted_query}"
     else:
         initial_url = f"{BASE_URL}{formatted_query}&language=en_GB"
-    scraper.driver.get(initial_url)
-    product_urls = []
+    scraper.get(initial_url, ready=SEARCH_READY_SELECTORS)
     current_page = 1
+    seen: set[str] = set()
     # Loop through search result pages
     while current_page <= max_page_number:
-        soup = BeautifulSoup(scraper.driver.page_source, "html.parser")
-        search_results = soup.find_all(
-            "div", {"data-component-type": "s-search-result"}
-        )
+        # the result links are extracted in the browser, the page source never crosses the wire
+        search_results = scraper.extract(SEARCH_SPEC_AZ)["results"]
     # Extract product URLs from search results
         for result in search_results:
-            if skip_ads and result.find("span", {"class": "puis-label-popover-hover"}):
+            if skip_ads and result["sponsored"]:
                 continue
-            product_link = result.find("a", {"class": "a-link-normal s-no-outline"})
-            if product_link:
-                href = product_link.get("href")
-                if href:
-                    product_urls.append(href)
+            href = result["href"]
+            # the same ASIN shows up as ad, /sspa/ link and organic result
+            if href and (key := product_key(href)) not in seen:
+                seen.add(key)
+                yield canonical_product_url(href, urlsplit(PRODUCT_BASE_URL).netloc)
     # Navigate to next page
         current_page += 1
         if current_page <= max_page_number:
             next_url = f"{initial_url}&page={current_page}"
-            scraper.driver.get(next_url)
+            scraper.get(next_url, ready=SEARCH_READY_SELECTORS)
+
 
-    return product_urls
+def get_product_urls_az(
+    scraper: Scraper,
+    search_query: str,
+    max_page_number: int = 4,
+    skip_ads: bool = True,
+    results_in_dutch: bool = False,
+) -> list[str]:
+    return list(iter_product_urls_az(
+        scraper, search_query, max_page_number, skip_ads, results_in_dutch
+    ))
 
-def get_product_data_az(scraper: Scraper, url: str) -> Product:
+@timed("product")
+def get_product_data_az(
+    scraper: Scraper,
+    url: str,
+    fetcher: HybridFetcher | None = None,
+    cache: RecrawlCache | None = None,
+    use_json: bool = True,
+) -> Product:
+    # Nothing can have gone stale yet: skip the page load altogether
+    if cache is not None and (cached := cache.fresh(url)) is not None:
+        return Product(**cached)
     # Initialize default values
     title = "Title not found"
     price = "Price not found"
     rating = 0.0
     about_product = []
     reviews_list = []
-    # Load product page
-    scraper.driver.get(f"https://www.amazon.nl{url}")
-    page_data = BeautifulSoup(scraper.driver.page_source, 'html.parser')
+    # Load product page (absolute urls are used as-is, e.g. a local test server)
+    full_url = url if url.startswith("http") else f"{PRODUCT_BASE_URL}{url}"
+    if fetcher is not None:
+        # plain HTTP first, the browser only when the response is unusable
+        result = fetcher.fetch(full_url, scraper)
+        html, page_data = result.html, result.soup
+    else:
+        scraper.get(full_url, ready=PRODUCT_READY_SELECTORS)
+        html = scraper.read_page()
+        page_data = parse_html(html, scraper.parser)
+    # the buybox price from the page's JSON state: no class names involved
+    fields = amazon_fields(html) if use_json else {}
 
     # Get product title
     product_name_element = page_data.find("span", {"id": "productTitle"})
@@ -122,18 +186,21 @@ def get_product_data_az(scraper: Scraper, url: str) -> Product:
         title = product_name_element.text.strip()
 
     # Get price information
-    try:
+    # amazon.nl renders "1.234," + "56": keep the digits, not the separators
+    if "price" in fields:
+        price = fields["price"]
+    else:
         price_element = page_data.find("span", {"class": "a-price-whole"})
         price_decimal_element = page_data.find("span", {"class": "a-price-fraction"})
-        if price_element and price_decimal_element and price_element.text and price_decimal_element.text:
-            price = float(price_element.text.replace(',', '') + price_decimal_element.text)
-    except (ValueError, AttributeError):
-        pass
+        if price_element and price_decimal_element and price_element.text:
+            parsed_price = price_from_parts(price_element.text, price_decimal_element.text or "")
+            if parsed_price is not None:
+                price = parsed_price
 
     # Get product description
     labels_element = page_data.find("ul", {"class": "a-unordered-list a-vertical a-spacing-mini"})
     if labels_element and hasattr(labels_element, 'find_all'):
-        if isinstance(labels_element,Tag):        
+        if is_element(labels_element):
             list_items = labels_element.find_all("li", {"class": "a-spacing-mini"})
             for item in list_items:
                 label = item.find("span", {"class": "a-list-item"})
@@ -150,16 +217,23 @@ def get_product_data_az(scraper: Scraper, url: str) -> Product:
     # Get rating
 
     rating_element = page_data.select_one("#acrPopover")
-    if rating_element:
+    if "rating" in fields:
+        rating = fields["rating"]
+    elif rating_element:
         text_rating = rating_element.get("title")
         if isinstance(text_rating, str):
             rating = float(text_rating.split()[0].replace(",", "."))
         else:
             rating = float(rating_element.text.split()[0].replace(",", "."))
 
+    fingerprint = page_fingerprint(title, rating, about_product)
+    # Unchanged page and reviews still fresh: skip extracting the reviews
+    cached_reviews = cache.reuse(url, fingerprint, "reviews") if cache is not None else None
+    reused = ("reviews",) if cached_reviews is not None else ()
+
     # Get reviews
-    reviews = page_data.find_all("div", {"data-hook": "review"})
-    reviews_list = []
+    reviews = page_data.find_all("div", {"data-hook": "review"}) if cached_reviews is None else []
+    reviews_list = cached_reviews if cached_reviews is not None else []
     for review in reviews:
         review_title_element = review.find("a", {"data-hook": "review-title"})
         review_title = review_title_element.text.strip().split('\n', 1)[-1] if review_title_element else "Title not found"
@@ -177,20 +251,47 @@ def get_product_data_az(scraper: Scraper, url: str) -> Product:
             "text": review_text,
             "rating": review_rating
         })
-    return Product(
+    product = Product(
         title=title,
         price=price,
         rating=rating,
         about_product="\n".join(about_product),
         reviews=reviews_list
     )
+    if cache is not None:
+        cache.put(url, product, fingerprint, reused=reused)
+    return product
 
 if __name__ == "__main__":
-    scraper = Scraper()
-    product_urls = get_product_urls_az(scraper, "laptop", max_page_number=1)
-    products = []
-    for url in product_urls:
-        product = get_product_data_az(scraper, url)
-        products.append(product)
+    # one budget per domain for the HTTP path and every browser in the pool
+    limiter = RateLimiter.shared()
+    fetcher = HybridFetcher(rate_limiter=limiter)
+    # re-running on the same day resumes that day's job where it stopped;
+    # products scraped by earlier runs are skipped until their re-crawl TTL expires
+    job_id = f"amazon-laptop-{date.today().isoformat()}"
+    with StreamingSink(job_id) as sink, URLFrontier("amazon") as frontier, \
+            RecrawlCache() as cache, BrowserPool(scraper_factory(rate_limiter=limiter, block_profile="amazon")) as pool:
+        product_urls = sink.load_frontier()
+        if product_urls is None:
+            with pool.acquire() as scraper:
+                product_urls = sink.save_frontier(
+                    frontier.filter(iter_product_urls_az(scraper, "laptop", max_page_number=1), recrawl=cache.due)
+                )
+        pending = sink.pending(product_urls)
+        for url, product in zip(pending, pool.imap(partial(get_product_data_az, fetcher=fetcher, cache=cache), pending)):
+            if product is not None:
+                sink.write(url, product)
+                frontier.mark_done(url)
+        products = sink.load_products(Product)
+        if columnar_export.HAS_PYARROW:
+            columnar_export.export_sink(sink, "amazon_products.parquet", source="amazon")
+        with ProductStore() as store:
+            store.import_sink(sink, source="amazon", base_url=PRODUCT_BASE_URL)
+    print(f"Pages served by path: {fetcher.summary()}")
+    print(METRICS.summary())
+    METRICS.write_prometheus("amazon_metrics.prom")
+    METRICS.write_jsonl("metrics.jsonl", run_id=job_id)
+    fetcher.close()
+    limiter.save()
     Product.save_product_data(products)
         
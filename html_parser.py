@@ -0,0 +1,147 @@
+"""
+HTML Parser Backends
+--------------------
+
+One entry point, ``parse_html``, for every extraction path in the scrapers.
+
+Backends:
+    lxml:        BeautifulSoup on top of the lxml C parser (default when installed)
+    selectolax:  selectolax/lexbor wrapped in the small BeautifulSoup subset
+                 the extractors use (find, find_all, select, select_one,
+                 get_text, text, get, [])
+    html.parser: BeautifulSoup with the pure python parser (always available)
+
+The backend can be chosen per call, per scraper (``Scraper(parser=...)``) or
+for the whole process with the ``SCRAPER_HTML_PARSER`` environment variable.
+
+Example usage:
+    soup = parse_html(scraper.read_page(), "selectolax")
+    title = soup.select_one("h1").get_text(strip=True)
+"""
+
+import importlib.util
+import os
+from typing import Any, Union
+from bs4 import BeautifulSoup, Tag
+
+from metrics import METRICS
+
+# BeautifulSoup imports lxml itself, only its presence matters here
+HAS_LXML = importlib.util.find_spec("lxml") is not None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as _SelectolaxParser
+    HAS_SELECTOLAX = True
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as _SelectolaxParser
+        HAS_SELECTOLAX = True
+    except ImportError:
+        HAS_SELECTOLAX = False
+
+PARSER_BACKENDS: tuple[str, ...] = ("lxml", "selectolax", "html.parser")
+PARSER_ENV_VAR: str = "SCRAPER_HTML_PARSER"
+
+
+def available_backends() -> list[str]:
+    available = {"lxml": HAS_LXML, "selectolax": HAS_SELECTOLAX, "html.parser": True}
+    return [name for name in PARSER_BACKENDS if available[name]]
+
+
+def default_backend() -> str:
+    backend = os.environ.get(PARSER_ENV_VAR)
+    if backend:
+        return backend
+    return "lxml" if HAS_LXML else "html.parser"
+
+
+def _attr_selector(name: str, value: Any) -> str:
+    if value is True:
+        return f"[{name}]"
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    if name == "class" and " " not in str(value):
+        # BeautifulSoup matches a single class against any of the element's classes
+        return f'[class~="{escaped}"]'
+    return f'[{name}="{escaped}"]'
+
+
+def _to_css(name: str | None, attrs: dict | None, kwargs: dict) -> str:
+    selector = name or "*"
+    for key, value in {**(attrs or {}), **kwargs}.items():
+        if key == "class_":
+            key = "class"
+        selector += _attr_selector(key, value)
+    return selector
+
+
+class SelectolaxNode:
+    """A selectolax node exposing the BeautifulSoup calls used by the extractors"""
+
+    __slots__ = ("_node",)
+
+    def __init__(self, node):
+        self._node = node
+
+    def select(self, selector: str) -> list["SelectolaxNode"]:
+        return [SelectolaxNode(node) for node in self._node.css(selector)]
+
+    def select_one(self, selector: str) -> "SelectolaxNode | None":
+        node = self._node.css_first(selector)
+        return SelectolaxNode(node) if node is not None else None
+
+    def find_all(self, name: str | None = None, attrs: dict | None = None, **kwargs) -> list["SelectolaxNode"]:
+        return self.select(_to_css(name, attrs, kwargs))
+
+    def find(self, name: str | None = None, attrs: dict | None = None, **kwargs) -> "SelectolaxNode | None":
+        return self.select_one(_to_css(name, attrs, kwargs))
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        return self._node.text(deep=True, separator=separator, strip=strip)
+
+    @property
+    def text(self) -> str:
+        return self._node.text(deep=True)
+
+    @property
+    def name(self) -> str:
+        return self._node.tag
+
+    @property
+    def attrs(self) -> dict[str, str | None]:
+        return dict(self._node.attributes)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._node.attributes.get(key, default)
+        if key == "class" and isinstance(value, str):
+            # BeautifulSoup returns class as a list of names
+            return value.split()
+        return value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None and key not in self._node.attributes:
+            raise KeyError(key)
+        return value
+
+
+Node = Union[Tag, SelectolaxNode]
+
+
+def is_element(node: Any) -> bool:
+    return isinstance(node, (Tag, SelectolaxNode))
+
+
+def parse_html(markup: str, backend: str | None = None) -> Node:
+    """Parse a page with the requested (or default) backend"""
+    backend = backend or default_backend()
+    with METRICS.timer("parse", backend=backend):
+        if backend == "selectolax":
+            if not HAS_SELECTOLAX:
+                raise ImportError("selectolax backend requested but selectolax is not installed")
+            tree = _SelectolaxParser(markup)
+            return SelectolaxNode(tree.root if tree.root is not None else tree.body)
+        if backend == "lxml" and not HAS_LXML:
+            raise ImportError("lxml backend requested but lxml is not installed")
+        if backend not in PARSER_BACKENDS:
+            raise ValueError(f"Unknown parser backend {backend!r}, choose from {PARSER_BACKENDS}")
+        return BeautifulSoup(markup, backend)
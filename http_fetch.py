@@ -0,0 +1,152 @@
+"""
+HTTP-first Fetcher
+------------------
+
+Fetches pages with a pooled keep-alive HTTP session and only falls back to
+the browser when the response is not usable: a non-200 status, a captcha /
+robot check, or a page missing any of the required selectors.
+
+Which path served each URL is recorded in ``served_by`` so a run can report
+how many browser navigations were saved.
+
+Example usage:
+    fetcher = HybridFetcher(required_selectors=AMAZON_PRODUCT_SELECTORS)
+    result = fetcher.fetch("https://www.amazon.nl/dp/B0BXWZMQJ3", scraper)
+    result.served_by   # "http" or "browser"
+    result.soup.select_one("#productTitle")
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from html_parser import Node, parse_html
+from information_types import Scraper
+from metrics import METRICS, domain_of
+from rate_limiter import RateLimiter, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+# a selector group separated by commas is satisfied by any one of its parts
+AMAZON_PRODUCT_SELECTORS: tuple[str, ...] = (
+    "#productTitle",
+    "span.a-price-whole, #availability, #outOfStock",
+)
+CAPTCHA_MARKERS: tuple[str, ...] = (
+    "captcha",
+    "/errors/validatecaptcha",
+    "api-services-support@amazon.com",
+)
+DEFAULT_HEADERS: dict[str, str] = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-GB,en;q=0.9",
+}
+
+
+@dataclass
+class FetchResult:
+    url: str
+    html: str
+    soup: Node
+    served_by: str  # "http" or "browser"
+    status: int | None = None
+
+
+def looks_like_captcha(html: str) -> bool:
+    lowered = html.lower()
+    return any(marker in lowered for marker in CAPTCHA_MARKERS)
+
+
+def missing_selectors(soup: Node, selectors: tuple[str, ...]) -> list[str]:
+    return [selector for selector in selectors if soup.select_one(selector) is None]
+
+
+class HybridFetcher:
+    def __init__(
+        self,
+        required_selectors: tuple[str, ...] = AMAZON_PRODUCT_SELECTORS,
+        timeout: float = 10.0,
+        pool_size: int = 16,
+        headers: dict[str, str] | None = None,
+        session: requests.Session | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        self.required_selectors = required_selectors
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(headers or DEFAULT_HEADERS)
+        self.session = session
+        # None: no pacing, e.g. a local test server
+        self.rate_limiter = rate_limiter
+        self.served_by: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, url: str, path: str):
+        with self._lock:
+            self.served_by[url] = path
+
+    def _fetch_http(self, url: str, parser: str | None) -> FetchResult | None:
+        domain = domain_of(url)
+        if self.rate_limiter is not None:
+            self.rate_limiter.wait(domain)
+        try:
+            with METRICS.timer("http_fetch", domain=domain):
+                response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.debug(f"HTTP fetch failed for {url}: {e}")
+            return None
+        if response.status_code != 200:
+            logger.debug(f"HTTP fetch of {url} returned {response.status_code}")
+            if response.status_code in (429, 503) and self.rate_limiter is not None:
+                self.rate_limiter.report_blocked(domain, retry_after_seconds(response.headers.get("Retry-After")))
+            return None
+        html = response.text
+        if looks_like_captcha(html):
+            logger.debug(f"Captcha in HTTP response for {url}")
+            METRICS.inc("captchas", domain=domain, path="http")
+            if self.rate_limiter is not None:
+                self.rate_limiter.report_blocked(domain)
+            return None
+        if self.rate_limiter is not None:
+            self.rate_limiter.report_success(domain)
+        soup = parse_html(html, parser)
+        missing = missing_selectors(soup, self.required_selectors)
+        if missing:
+            logger.debug(f"HTTP response for {url} is missing {missing}")
+            return None
+        return FetchResult(url=url, html=html, soup=soup, served_by="http", status=response.status_code)
+
+    def fetch(self, url: str, scraper: Scraper) -> FetchResult:
+        """Fetch over HTTP, escalating to the scraper's browser when needed"""
+        if not scraper.replay:
+            result = self._fetch_http(url, scraper.parser)
+            if result is not None:
+                if scraper.page_store is not None:
+                    scraper.page_store.put(url, result.html)
+                self._record(url, "http")
+                return result
+            METRICS.inc("browser_fallbacks", domain=domain_of(url))
+
+        scraper.get(url, ready=self.required_selectors)
+        html = scraper.read_page()
+        self._record(url, "browser")
+        return FetchResult(url=url, html=html, soup=parse_html(html, scraper.parser), served_by="browser")
+
+    def summary(self) -> dict[str, int]:
+        with self._lock:
+            paths = list(self.served_by.values())
+        return {path: paths.count(path) for path in ("http", "browser")}
+
+    def close(self):
+        self.session.close()
@@ -1,10 +1,17 @@
 from dataclasses import dataclass
+from typing import Any
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 import pandas as pd
+from page_store import PageStore, ReplayDriver
+from metrics import METRICS, domain_of
+from rate_limiter import RateLimiter
+from resource_blocking import BlockingProfile, ResourceBlocker
+from readiness import install_network_tracker, navigate
+from browser_extract import Spec, extract
 
 
-@dataclass
+@dataclass(slots=True)
 class Product:
     title: str
     price: float | str
@@ -35,7 +42,29 @@ class Scraper:
     def __init__(self, headless = True,
         load_images = False, # for faster scraping we can turn off image loading
         options = Options(), # options for the web surfer
-        window_size = (700,900)):
+        window_size = (700,900),
+        page_store: PageStore | None = None, # archive every page we read
+        replay: bool = False, # serve pages from page_store instead of chrome
+        parser: str | None = None, # html parser backend, see html_parser.py
+        rate_limiter: RateLimiter | None = None, # per-domain pacing shared between scrapers
+        block_profile: str | BlockingProfile | None = None, # see resource_blocking.py
+        page_load_strategy: str = "eager", # "normal" waits for every third-party script
+        page_load_timeout: float = 30, # hard limit per navigation, seconds
+        ready_timeout: float = 10): # how long get() waits for its ready selectors
+
+        self.page_store = page_store
+        self.replay = replay
+        self.parser = parser
+        self.rate_limiter = rate_limiter
+        self.blocker = ResourceBlocker(block_profile, load_images) if block_profile and not replay else None
+        self.ready_timeout = ready_timeout
+        self._requested_url = ""
+        self._domain = ""
+        if replay:
+            if page_store is None:
+                raise ValueError("replay mode needs a page_store")
+            self.driver = ReplayDriver(page_store)
+            return
 
         if headless:
             # if headless is True, we can run the scraper 
@@ -50,6 +79,51 @@ class Scraper:
         # adding some more options to the web surfer
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
+        if self.blocker is not None:
+            # the blocker reads requests loaded and blocked from the performance log
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        # return at DOMContentLoaded (eager) or straight away (none): get() waits for selectors instead
+        options.page_load_strategy = page_load_strategy
         # creating the websurfer using chrome
-        self.driver = webdriver.Chrome(options=options)
+        with METRICS.timer("driver_startup", browser="chrome"):
+            self.driver = webdriver.Chrome(options=options)
         self.driver.set_window_size(*window_size)
+        self.driver.set_page_load_timeout(page_load_timeout)
+        # before the first navigation, so network idle sees the initial load's requests
+        install_network_tracker(self.driver)
+        if self.blocker is not None:
+            self.blocker.apply(self.driver)
+
+    def get(self, url: str, ready: str | tuple[str, ...] | None = None) -> bool:
+        """Navigate to a url (or load its snapshot in replay mode).
+
+        Returns once every `ready` selector matches, False if they did not
+        within ready_timeout.
+        """
+        self._requested_url = url
+        self._domain = domain_of(url)
+        if self.rate_limiter is not None and not self.replay:
+            self.rate_limiter.wait(self._domain)
+        with METRICS.timer("navigate", domain=self._domain):
+            return navigate(self.driver, url, ready, self.ready_timeout)
+
+    def read_page(self) -> str:
+        """Return the current page source, archiving it when recording"""
+        with METRICS.timer("page_source", domain=self._domain):
+            html = self.driver.page_source
+        if self.blocker is not None:
+            self.blocker.record(self.driver, self._requested_url or self.driver.current_url)
+        if self.page_store is not None and not self.replay:
+            self.page_store.put(self._requested_url or self.driver.current_url, html)
+        return html
+
+    def extract(self, spec: Spec) -> dict[str, Any]:
+        """Extract `spec` from the current page inside the browser, see browser_extract.py.
+
+        Replaying and recording need the page source anyway, so those read
+        it through read_page() and evaluate the spec in Python.
+        """
+        in_browser = not self.replay and self.page_store is None
+        if in_browser and self.blocker is not None:
+            self.blocker.record(self.driver, self._requested_url or self.driver.current_url)
+        return extract(self.driver, spec, self.parser, self.read_page, in_browser, domain=self._domain)
@@ -0,0 +1,244 @@
+"""
+Run Metrics
+-----------
+
+Timings per stage (navigation, page_source, parsing, extraction, sleeps,
+scrolling, driver startup, ...) and per domain as histograms, plus counters
+for retries, captchas and proxy failures.
+
+Cheap enough to leave on: a timing is two ``perf_counter`` calls, a bisect
+over fixed buckets and a lock. Histograms keep bucket counts only, never
+the individual samples. Set ``SCRAPER_METRICS=0`` to turn every hook into a
+no-op.
+
+Export as Prometheus text (for a node exporter textfile collector or a
+push gateway) or as JSON lines, and print a summary table at the end of a
+run.
+
+Example usage:
+    with timer("navigate", domain="amazon.nl"):
+        driver.get(url)
+    inc("captchas", domain="amazon.nl")
+
+    @timed("extract")
+    def extract_title(soup): ...
+
+    print(METRICS.summary())
+    METRICS.write_prometheus("metrics.prom")
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterator, TypeVar
+from urllib.parse import urlsplit
+
+F = TypeVar("F", bound=Callable)
+
+# seconds: 1ms .. ~2min, roughly x2 apart
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def domain_of(url: str) -> str:
+    """'https://www.amazon.nl/dp/X' -> 'amazon.nl'"""
+    host = urlsplit(url if "//" in url else f"//{url}").netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimate from the buckets, interpolating linearly inside one"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                low = self.buckets[i - 1] if i > 0 else 0.0
+                high = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(low + (high - low) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+
+class Metrics:
+    def __init__(self, enabled: bool | None = None):
+        if enabled is None:
+            enabled = os.environ.get("SCRAPER_METRICS", "1") not in ("0", "false", "off")
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+        self.counters: dict[tuple[str, Labels], float] = {}
+
+    @staticmethod
+    def _labels(labels: dict[str, str | None]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+    def observe(self, stage: str, seconds: float, **labels: str | None):
+        if not self.enabled:
+            return
+        key = (stage, self._labels(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels: str | None):
+        if not self.enabled:
+            return
+        key = (name, self._labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, stage: str, **labels: str | None) -> Iterator[None]:
+        """Time the with-block into the stage histogram, also when it raises"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def timed(self, stage: str, **labels: str | None) -> Callable[[F], F]:
+        """Decorator: time every call, labelled with the function name"""
+        def decorator(fn: F) -> F:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(stage, time.perf_counter() - start, function=fn.__name__, **labels)
+            return wrapper
+        return decorator
+
+    def sleep(self, seconds: float, **labels: str | None):
+        """time.sleep that shows up as the "sleep" stage"""
+        with self.timer("sleep", **labels):
+            time.sleep(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def to_prometheus(self, prefix: str = "scraper") -> str:
+        def label_text(labels: Labels, extra: tuple[tuple[str, str], ...] = ()) -> str:
+            pairs = [*labels, *extra]
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per scraping stage",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        with self._lock:
+            for (stage, labels), histogram in sorted(self.histograms.items()):
+                labels = (("stage", stage), *labels)
+                cumulative = 0
+                for bound, bucket_count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                    cumulative += bucket_count
+                    le = bound if bound == "+Inf" else f"{bound:g}"
+                    lines.append(f"{prefix}_stage_seconds_bucket{label_text(labels, (('le', le),))} {cumulative}")
+                lines.append(f"{prefix}_stage_seconds_sum{label_text(labels)} {histogram.sum:.6f}")
+                lines.append(f"{prefix}_stage_seconds_count{label_text(labels)} {histogram.count}")
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                for (counter, labels), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f"{prefix}_{name}_total{label_text(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, prefix: str = "scraper"):
+        """Write atomically, so a textfile collector never reads half a file"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus(prefix))
+        os.replace(tmp_path, path)
+
+    def write_jsonl(self, path: str, run_id: str | None = None):
+        """Append one line per histogram and counter, stamped with the time of export"""
+        now = time.time()
+        with self._lock:
+            records = [
+                {"time": now, "run": run_id, "type": "histogram", "stage": stage, "labels": dict(labels),
+                 "count": h.count, "sum": h.sum, "max": h.max, "buckets": list(h.buckets), "counts": h.counts}
+                for (stage, labels), h in self.histograms.items()
+            ] + [
+                {"time": now, "run": run_id, "type": "counter", "name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self.counters.items()
+            ]
+        with open(path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    def summary(self, by: tuple[str, ...] = ("domain",)) -> str:
+        """Table of stages (split by the `by` labels) and counters, slowest total first"""
+        rows: dict[tuple, Histogram] = {}
+        with self._lock:
+            for (stage, labels), histogram in self.histograms.items():
+                kept = dict(labels)
+                name = stage + (f"[{kept['function']}]" if "function" in kept else "")
+                key = (name, *(kept.get(label, "") for label in by))
+                merged = rows.setdefault(key, Histogram(histogram.buckets))
+                merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+                merged.count += histogram.count
+                merged.sum += histogram.sum
+                merged.max = max(merged.max, histogram.max)
+            counters = sorted(self.counters.items())
+
+        header = f"{'stage':<34}" + "".join(f" {label:<16}" for label in by)
+        lines = [header + f" {'count':>7} {'total s':>9} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}"]
+        for key, h in sorted(rows.items(), key=lambda item: -item[1].sum):
+            lines.append(
+                f"{key[0]:<34}" + "".join(f" {value:<16}" for value in key[1:])
+                + f" {h.count:>7} {h.sum:>9.2f} {h.sum / h.count * 1000:>9.1f}"
+                f" {h.quantile(0.5) * 1000:>8.1f} {h.quantile(0.95) * 1000:>8.1f} {h.max * 1000:>8.1f}"
+            )
+        if counters:
+            lines.append("")
+            lines.append(f"{'counter':<34} {'labels':<34} {'value':>7}")
+            for (name, labels), value in counters:
+                label_text = ",".join(f"{k}={v}" for k, v in labels)
+                lines.append(f"{name:<34} {label_text:<34} {value:>7g}")
+        return "\n".join(lines)
+
+
+# process-wide registry the scrapers report into
+METRICS = Metrics()
+timer = METRICS.timer
+timed = METRICS.timed
+inc = METRICS.inc
+observe = METRICS.observe
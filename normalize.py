@@ -0,0 +1,227 @@
+"""
+Price and Rating Normalisation
+------------------------------
+
+Turns scraped price, rating and quantity text into numbers, for one value
+inside a scraper or for a whole column in a single vectorised pandas pass.
+
+Separators are resolved the same way everywhere: the last ``.`` or ``,``
+followed by one or two digits is the decimal mark, every other separator
+groups thousands. So "€1.234,56", "$1,234.56" and "1 234,56 EUR" are all
+1234.56, and "1.234" is 1234. Ranges such as "€12,50 - €15,00" or
+"US $1.20-3.50" give a low and a high price, and Alibaba quantity tiers
+like "2 - 99 pieces" or ">= 100 pieces" give minimum and maximum quantities.
+
+Example usage:
+    parse_price("€1.234,56")                  # 1234.56
+    df[["currency", "price", "price_max"]] = parse_prices(df["price"])
+    df["rating"] = parse_ratings(df["rating"])
+    tiers = parse_quantity_tiers(pd.Series(["2 - 99 pieces", ">= 100 pieces"]))
+"""
+
+import re
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+CURRENCIES: dict[str, str] = {
+    "€": "EUR", "EUR": "EUR",
+    "$": "USD", "US$": "USD", "US $": "USD", "USD": "USD",
+    "£": "GBP", "GBP": "GBP",
+    "¥": "CNY", "CNY": "CNY",
+    "₹": "INR", "INR": "INR",
+}
+
+_CURRENCY = r"US\s?\$|[€$£¥₹]|EUR|USD|GBP|CNY|INR"
+_AMOUNT = r"\d(?:[\d.,'\s ]*\d)?"
+_PRICE_PATTERN = (
+    rf"(?P<currency>{_CURRENCY})?\s*(?P<low>{_AMOUNT})"
+    rf"(?:\s*(?:-|–|~|to)\s*(?:{_CURRENCY})?\s*(?P<high>{_AMOUNT}))?"
+    rf"\s*(?P<currency_after>{_CURRENCY})?"
+)
+# lazy integer part: the decimal group gets the last separator if it can
+_NUMBER_PATTERN = r"^(?P<int>.*?)(?:[.,](?P<frac>\d{1,2}))?$"
+_RATING_PATTERN = r"(\d+(?:[.,]\d+)?)"
+_RANGE_PATTERN = r"(?P<low>\d[\d,.]*)\s*(?:-|–|~|to)\s*(?P<high>\d[\d,.]*)"
+_SINGLE_PATTERN = r"(?P<open>>=?|≥|over|above)?\s*(?P<low>\d[\d,.]*)"
+
+_PRICE_RE = re.compile(_PRICE_PATTERN)
+_NUMBER_RE = re.compile(_NUMBER_PATTERN)
+_RATING_RE = re.compile(_RATING_PATTERN)
+_RANGE_RE = re.compile(_RANGE_PATTERN)
+_SINGLE_RE = re.compile(_SINGLE_PATTERN, re.IGNORECASE)
+_SPACES_RE = re.compile(r"[\s ']")
+
+
+# --- single values, for use while scraping ---------------------------------
+
+def parse_number(text: str) -> float | None:
+    """'1.234,56' -> 1234.56, '1,234' -> 1234.0, '4,5' -> 4.5"""
+    match = _NUMBER_RE.match(_SPACES_RE.sub("", text))
+    integer = re.sub(r"[.,]", "", match.group("int"))
+    if match.group("frac") is not None:
+        integer = f"{integer}.{match.group('frac')}"
+    try:
+        return float(integer)
+    except ValueError:
+        return None
+
+
+def parse_price(value: Any) -> float | None:
+    """The (low) price in scraped text like '€1.234,56', '$12.99 - $15' or 4.5"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _PRICE_RE.search(str(value or ""))
+    return parse_number(match.group("low")) if match else None
+
+
+def parse_rating(value: Any) -> float | None:
+    """'4,5 out of 5 stars' -> 4.5"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _RATING_RE.search(str(value or ""))
+    return float(match.group(1).replace(",", ".")) if match else None
+
+
+def price_from_parts(whole: str, fraction: str) -> float | None:
+    """Amazon splits prices into whole and fraction spans, whatever the locale"""
+    digits = re.sub(r"\D", "", whole)
+    fraction = re.sub(r"\D", "", fraction)
+    if not digits:
+        return None
+    return float(f"{digits}.{fraction}" if fraction else digits)
+
+
+def quantity_bounds(text: str) -> tuple[int | None, int | None]:
+    """'2 - 99 pieces' -> (2, 99), '>= 100 pieces' -> (100, None), '5 pieces' -> (5, 5)"""
+    if match := _RANGE_RE.search(text):
+        return int(re.sub(r"\D", "", match.group("low"))), int(re.sub(r"\D", "", match.group("high")))
+    if match := _SINGLE_RE.search(text):
+        low = int(re.sub(r"\D", "", match.group("low")))
+        return (low, None) if match.group("open") else (low, low)
+    return None, None
+
+
+# --- whole columns, for analysis -------------------------------------------
+#
+# Scraped columns repeat the same few thousand strings over and over, so
+# each distinct value is parsed once and the results are broadcast back.
+# With pyarrow installed the regexes run in its RE2 kernels instead of
+# pandas' per-row Python loop.
+
+def _factorize(values: Iterable[Any]) -> tuple[pd.Index, np.ndarray, pd.Series]:
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype="object")
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    return series.index, codes, pd.Series(uniques, dtype="object").astype("string")
+
+
+def _broadcast(column: pd.Series, codes: np.ndarray, index: pd.Index) -> pd.Series:
+    """Values parsed per distinct input back onto the original rows"""
+    # missing inputs have code -1, which takes the appended missing value
+    padded = pd.concat([column.reset_index(drop=True), pd.Series([None], dtype=column.dtype)], ignore_index=True)
+    result = padded.take(codes)
+    result.index = index
+    return result
+
+
+def _arrow_groups(text: pd.Series, pattern: str) -> dict[str, "pa.Array"]:
+    """Named regex groups of every value, null where the group did not match"""
+    matches = pc.extract_regex(pa.array(text, pa.string(), from_pandas=True), pattern)
+    groups = {}
+    for position, field in enumerate(matches.type):
+        group = pc.struct_field(matches, [position])
+        groups[field.name] = pc.if_else(pc.equal(group, ""), pa.scalar(None, pa.string()), group)
+    return groups
+
+
+def _arrow_numbers(text: "pa.Array") -> pd.Series:
+    parts = _arrow_groups(pc.replace_substring_regex(text, _SPACES_RE.pattern, ""), _NUMBER_PATTERN)
+    integer = pc.replace_substring_regex(parts["int"], "[.,]", "")
+    number = pc.if_else(pc.is_null(parts["frac"]), integer, pc.binary_join_element_wise(integer, parts["frac"], "."))
+    return pd.Series(pc.cast(number, pa.float64()).to_numpy(zero_copy_only=False), dtype="float64")
+
+
+def parse_numbers(text: pd.Series) -> pd.Series:
+    """Vectorised parse_number over a string column"""
+    if HAS_PYARROW:
+        result = _arrow_numbers(pa.array(text, pa.string(), from_pandas=True))
+        result.index = text.index
+        return result
+    parts = text.str.replace(_SPACES_RE.pattern, "", regex=True).str.extract(_NUMBER_PATTERN)
+    integer = parts["int"].str.replace(r"[.,]", "", regex=True)
+    number = integer.where(parts["frac"].isna(), integer + "." + parts["frac"])
+    return pd.to_numeric(number, errors="coerce").astype("float64")
+
+
+def parse_prices(values: Iterable[Any]) -> pd.DataFrame:
+    """currency (ISO code), price and price_max (ranges only) for a column of price text"""
+    if isinstance(values, pd.Series) and pd.api.types.is_numeric_dtype(values):
+        return pd.DataFrame({
+            "currency": pd.Series(pd.NA, index=values.index, dtype="string"),
+            "price": values.astype("float64"),
+            "price_max": pd.Series(float("nan"), index=values.index),
+        })
+    index, codes, text = _factorize(values)
+    if HAS_PYARROW:
+        groups = _arrow_groups(text, _PRICE_PATTERN)
+        parts = pd.DataFrame({
+            name: pd.Series(group.to_pandas(), dtype="string") for name, group in groups.items()
+        })
+    else:
+        parts = text.str.extract(_PRICE_PATTERN)
+    currency = parts["currency"].fillna(parts["currency_after"])
+    currency = currency.str.replace(r"\s+", " ", regex=True).str.upper().map(CURRENCIES, na_action="ignore")
+    return pd.DataFrame({
+        "currency": _broadcast(currency.astype("string"), codes, index),
+        "price": _broadcast(parse_numbers(parts["low"]), codes, index),
+        "price_max": _broadcast(parse_numbers(parts["high"]), codes, index),
+    }, index=index)
+
+
+def parse_ratings(values: Iterable[Any]) -> pd.Series:
+    if isinstance(values, pd.Series) and pd.api.types.is_numeric_dtype(values):
+        return values.astype("float64")
+    index, codes, text = _factorize(values)
+    rating = text.str.extract(_RATING_PATTERN, expand=False).str.replace(",", ".", regex=False)
+    return _broadcast(pd.to_numeric(rating, errors="coerce").astype("float64"), codes, index)
+
+
+def parse_quantity_tiers(values: Iterable[Any]) -> pd.DataFrame:
+    """min_quantity and max_quantity (nullable ints) for Alibaba tier labels"""
+    index, codes, text = _factorize(values)
+    ranged = text.str.extract(_RANGE_PATTERN)
+    single = text.str.extract(f"(?i){_SINGLE_PATTERN}")
+
+    def integers(column: pd.Series) -> pd.Series:
+        return pd.to_numeric(column.str.replace(r"\D", "", regex=True), errors="coerce").astype("Int64")
+
+    low = integers(ranged["low"]).fillna(integers(single["low"]))
+    high = integers(ranged["high"])
+    # a bare "5 pieces" is exactly five, ">= 100 pieces" has no upper bound
+    exact = ranged["high"].isna() & single["open"].isna()
+    high = high.mask(exact, low)
+    return pd.DataFrame({
+        "min_quantity": _broadcast(low, codes, index),
+        "max_quantity": _broadcast(high, codes, index),
+    }, index=index)
+
+
+def parse_price_tiers(tiers: Iterable[dict[str, str]]) -> pd.DataFrame:
+    """One row per tier for a column of Alibaba {quantity: price} dicts"""
+    rows = [
+        (position, quantity, price_text)
+        for position, product_tiers in enumerate(tiers)
+        for quantity, price_text in (product_tiers or {}).items()
+    ]
+    frame = pd.DataFrame(rows, columns=["product", "quantity", "price_text"])
+    prices = parse_prices(frame["price_text"])
+    bounds = parse_quantity_tiers(frame["quantity"])
+    return pd.concat([frame, bounds, prices], axis=1)
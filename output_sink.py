@@ -0,0 +1,156 @@
+"""
+Streaming Output Sink
+---------------------
+
+Appends every scraped ``Product`` / ``AlibabaProduct`` to a JSON lines file
+the moment it is finished, fsync'd, so a crash loses at most the product
+that was being scraped. Restarting with the same job id resumes the run:
+products already in the file are skipped and the URL frontier saved at the
+start of the job is reused, so the search does not have to run again.
+
+Layout on disk:
+    <directory>/<job_id>/products.jsonl    one {"url", "scraped_at", "product"} record per line
+    <directory>/<job_id>/checkpoint.json   the frontier, written once when the search is done
+
+Progress is never written separately: the products file is the record of
+what is done, and it is replayed on resume. A product write is one fsync'd
+append, whatever the size of the job.
+
+Example usage:
+    with StreamingSink("laptops") as sink:
+        urls = sink.load_frontier() or sink.save_frontier(get_product_urls_az(scraper, "laptop"))
+        for url in sink.pending(urls):
+            sink.write(url, get_product_data_az(scraper, url))
+        products = sink.load_products(Product)
+"""
+
+import dataclasses
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Iterator, TypeVar
+
+import attr
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def product_to_dict(product: Any) -> dict[str, Any]:
+    """Plain dict of a Product (dataclass) or AlibabaProduct (attrs class)"""
+    if attr.has(type(product)):
+        return attr.asdict(product)
+    if dataclasses.is_dataclass(product):
+        return dataclasses.asdict(product)
+    return dict(product)
+
+
+def _fsync_write(path: str, data: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class StreamingSink:
+    def __init__(self, job_id: str, directory: str = "runs"):
+        self.job_id = job_id
+        self.job_dir = os.path.join(directory, job_id)
+        self.products_path = os.path.join(self.job_dir, "products.jsonl")
+        self.checkpoint_path = os.path.join(self.job_dir, "checkpoint.json")
+        os.makedirs(self.job_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.done: set[str] = set()
+        self._frontier: list[str] | None = None
+        self._recover()
+        self._file = open(self.products_path, "a", encoding="utf-8")
+
+    def _recover(self):
+        """Load finished urls and cut off a line left half written by a crash"""
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                self._frontier = json.load(f).get("frontier")
+        if not os.path.exists(self.products_path):
+            return
+        valid_bytes = 0
+        with open(self.products_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    self.done.add(json.loads(line)["url"])
+                except (ValueError, KeyError):
+                    break
+                valid_bytes += len(line)
+        if valid_bytes != os.path.getsize(self.products_path):
+            logger.warning(f"Truncating partial record at the end of {self.products_path}")
+            with open(self.products_path, "r+b") as f:
+                f.truncate(valid_bytes)
+        if self.done:
+            logger.info(f"Resuming job {self.job_id}: {len(self.done)} products already done")
+
+    def _write_checkpoint(self):
+        _fsync_write(self.checkpoint_path, json.dumps({
+            "job_id": self.job_id,
+            "frontier": self._frontier,
+            "created_at": time.time(),
+        }))
+
+    def save_frontier(self, urls: list[str]) -> list[str]:
+        """Remember the full url list of this job so a resume can skip the search"""
+        with self._lock:
+            self._frontier = list(urls)
+            self._write_checkpoint()
+        return self._frontier
+
+    def load_frontier(self) -> list[str] | None:
+        return self._frontier
+
+    def pending(self, urls: list[str]) -> list[str]:
+        return [url for url in urls if url not in self.done]
+
+    def progress(self) -> dict[str, int]:
+        with self._lock:
+            done = len(self.done)
+        total = len(self._frontier) if self._frontier is not None else done
+        return {"done": done, "total": total, "pending": max(total - done, 0)}
+
+    def write(self, url: str, product: Any):
+        """Append one finished product and make it durable before returning"""
+        record = json.dumps(
+            {"url": url, "scraped_at": time.time(), "product": product_to_dict(product)}, ensure_ascii=False
+        )
+        with self._lock:
+            self._file.write(record + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.done.add(url)
+
+    def records(self) -> Iterator[dict[str, Any]]:
+        with self._lock:
+            self._file.flush()
+        with open(self.products_path, "r", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def load_products(self, cls: type[T]) -> list[T]:
+        return [cls(**record["product"]) for record in self.records()]
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self) -> "StreamingSink":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.done)
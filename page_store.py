@@ -0,0 +1,199 @@
+"""
+Page Snapshot Store
+-------------------
+
+Content-addressed, gzip-compressed archive of fetched pages. Every page the
+scrapers read is written once under the sha256 of its HTML, and an
+append-only index records which canonical URL was fetched at which time.
+
+A ``ReplayDriver`` serves the archived snapshots through the small part of
+the WebDriver API the scrapers use, so extraction can be re-run over an
+archive without starting a browser.
+
+Layout on disk:
+    <root>/objects/ab/abcdef....html.gz   one file per distinct page body
+    <root>/index.jsonl                    one line per fetch
+
+Example usage:
+    store = PageStore("snapshots")
+    scraper = Scraper(page_store=store)                # record while scraping
+    replay = Scraper(page_store=store, replay=True)    # re-run without Chrome
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# query parameters that only track how we got to a page, not what the page is
+TRACKING_PARAMS: frozenset[str] = frozenset({
+    "ref", "ref_", "pf_rd_p", "pf_rd_r", "pd_rd_r", "pd_rd_w", "pd_rd_wg",
+    "qid", "crid", "dib", "dib_tag", "sprefix", "sr", "sp_csd", "psc",
+    "content-id", "__mk_nl_NL", "spm", "scm", "algo_pvid", "algo_exp_id",
+    "pdp_npi", "pdp_ext_f", "utparam", "aem_p4p_click", "gatewayAdapt",
+})
+
+
+def canonical_url(url: str) -> str:
+    """Normalise a URL so different fetches of the same page share a key"""
+    if url.startswith("//"):
+        url = "https:" + url
+    parts = urlsplit(url)
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((
+        "https" if parts.scheme in ("http", "https", "") else parts.scheme,
+        parts.netloc.lower(),
+        path,
+        urlencode(query),
+        "",
+    ))
+
+
+@dataclass
+class Snapshot:
+    url: str
+    canonical_url: str
+    fetched_at: float
+    digest: str
+    size: int
+
+
+class PageStore:
+    def __init__(self, root: str = "snapshots"):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_path = os.path.join(root, "index.jsonl")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # canonical url -> snapshots in fetch order
+        self._index: dict[str, list[Snapshot]] = {}
+        self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    snapshot = Snapshot(**json.loads(line))
+                except (ValueError, TypeError):
+                    # a crash can leave a half written last line behind
+                    continue
+                self._index.setdefault(snapshot.canonical_url, []).append(snapshot)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.html.gz")
+
+    def put(self, url: str, html: str, fetched_at: float | None = None) -> Snapshot:
+        """Archive a page body and record the fetch in the index"""
+        body = html.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()
+        snapshot = Snapshot(
+            url=url,
+            canonical_url=canonical_url(url),
+            fetched_at=fetched_at if fetched_at is not None else time.time(),
+            digest=digest,
+            size=len(body),
+        )
+        path = self._object_path(digest)
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(snapshot.__dict__) + "\n")
+            self._index.setdefault(snapshot.canonical_url, []).append(snapshot)
+        return snapshot
+
+    def read(self, snapshot: Snapshot) -> str:
+        with gzip.open(self._object_path(snapshot.digest), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def latest(self, url: str) -> Snapshot | None:
+        snapshots = self._index.get(canonical_url(url))
+        return snapshots[-1] if snapshots else None
+
+    def history(self, url: str) -> list[Snapshot]:
+        return list(self._index.get(canonical_url(url), []))
+
+    def get(self, url: str) -> str | None:
+        """Return the most recent archived HTML for a URL, if any"""
+        snapshot = self.latest(url)
+        return self.read(snapshot) if snapshot else None
+
+    def urls(self) -> list[str]:
+        return list(self._index)
+
+    def __contains__(self, url: str) -> bool:
+        return canonical_url(url) in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+class ReplayError(Exception):
+    """Raised when replay is asked for something a snapshot can't provide"""
+
+
+class ReplayDriver:
+    """Serves archived snapshots in place of a live WebDriver.
+
+    Only navigation and ``page_source`` are real; browser interaction raises
+    ``ReplayError`` so callers fall through to their existing error handling
+    instead of waiting on elements that will never appear.
+    """
+
+    def __init__(self, store: PageStore):
+        self.store = store
+        self.current_url = ""
+        self.page_source = ""
+        self.title = ""
+
+    def get(self, url: str):
+        html = self.store.get(url)
+        if html is None:
+            raise ReplayError(f"No snapshot for {url}")
+        self.current_url = url
+        self.page_source = html
+
+    def find_element(self, *args, **kwargs):
+        raise ReplayError("Element lookup is not available in replay mode")
+
+    def find_elements(self, *args, **kwargs) -> list:
+        return []
+
+    def wait_for_element(self, *args, **kwargs):
+        raise ReplayError("Waiting is not available in replay mode")
+
+    def execute_script(self, *args, **kwargs):
+        return None
+
+    def execute_async_script(self, *args, **kwargs):
+        return None
+
+    def set_script_timeout(self, *args, **kwargs):
+        pass
+
+    def save_screenshot(self, *args, **kwargs) -> bool:
+        return False
+
+    def set_window_size(self, *args, **kwargs):
+        pass
+
+    def maximize_window(self):
+        pass
+
+    def quit(self):
+        pass
@@ -1,5 +1,7 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import ssl
 import time
+from dataclasses import dataclass
 from bs4 import BeautifulSoup
 from seleniumbase import Driver
 from selenium.webdriver.support.ui import WebDriverWait
@@ -71,44 +73,87 @@ def get_proxy_list(max_proxies=50):
 
 
 
-def test_proxy(proxy):
+@dataclass
+class ProxyCheck:
+    proxy: str
+    ok: bool
+    connect_latency: float = 0.0  # TCP connect to the proxy
+    ttfb: float = 0.0  # CONNECT sent -> first byte of the proxy's answer
+    tls_handshake: float = 0.0  # TLS with the target through the tunnel
+    error: str = ""
+
+    @property
+    def response_time(self) -> float:
+        return self.connect_latency + self.ttfb + self.tls_handshake
+
+
+async def check_proxy(proxy, target_host="example.com", target_port=443, tls=True, timeout=5.0):
+    """Check a proxy with a raw TCP connect and an HTTP CONNECT tunnel to the target,
+    optionally finishing a TLS handshake with the target through the tunnel."""
+    host, _, port = proxy.rpartition(":")
+    writer = None
     try:
-        driver = Driver(uc=True, proxy=proxy)
-        # Set page load timeout
-        driver.set_page_load_timeout(10)
-        
-        start_time = time.time()
-        driver.get("http://example.com")  # Lighter test URL
-        
-        # Check if page loaded successfully
-        if driver.page_source and len(driver.page_source) > 0:
-            driver.quit()
-            return True, proxy, time.time() - start_time
-            
-    except Exception as e:
-        print(f"Error testing proxy {proxy}: {str(e)}")
+        start = time.perf_counter()
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, int(port)), timeout)
+        connect_latency = time.perf_counter() - start
+
+        start = time.perf_counter()
+        writer.write(
+            f"CONNECT {target_host}:{target_port} HTTP/1.1\r\n"
+            f"Host: {target_host}:{target_port}\r\n\r\n".encode()
+        )
+        await writer.drain()
+        first_byte = await asyncio.wait_for(reader.read(1), timeout)
+        ttfb = time.perf_counter() - start
+        if not first_byte:
+            return ProxyCheck(proxy, False, connect_latency, ttfb, error="connection closed")
+        status_line = first_byte + await asyncio.wait_for(reader.readuntil(b"\r\n"), timeout)
+        if b" 200" not in status_line:
+            return ProxyCheck(proxy, False, connect_latency, ttfb, error=status_line.decode(errors="replace").strip())
+        # skip the remaining response headers up to the blank line
+        while (await asyncio.wait_for(reader.readuntil(b"\r\n"), timeout)) != b"\r\n":
+            pass
+
+        tls_handshake = 0.0
+        if tls:
+            start = time.perf_counter()
+            await asyncio.wait_for(
+                writer.start_tls(ssl.create_default_context(), server_hostname=target_host), timeout
+            )
+            tls_handshake = time.perf_counter() - start
+        return ProxyCheck(proxy, True, connect_latency, ttfb, tls_handshake)
+    except (
+        OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ssl.SSLError
+    ) as e:
+        # a bad proxy is a failed check, never an exception that aborts validate_proxies
+        return ProxyCheck(proxy, False, error=str(e) or type(e).__name__)
     finally:
-        try:
-            driver.quit()
-        except Exception as e:
-            print("Error quitting driver" + str(e))
-    return False, proxy, 0
+        if writer is not None:
+            writer.close()
+
+
+async def validate_proxies(proxies, concurrency=1000, **check_kwargs):
+    """Check many proxies at once, at most `concurrency` sockets open at a time"""
+    limit = asyncio.Semaphore(concurrency)
+
+    async def bounded_check(proxy):
+        async with limit:
+            return await check_proxy(proxy, **check_kwargs)
 
+    return await asyncio.gather(*(bounded_check(proxy) for proxy in proxies))
 
 
-def get_working_proxies(max_workers=5):
-    proxies = get_proxy_list()
+def get_working_proxies(max_workers=500, proxies=None, **check_kwargs):
+    if proxies is None:
+        proxies = get_proxy_list()
     working_proxies = []
-    
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_proxy = {executor.submit(test_proxy, proxy): proxy for proxy in proxies}
-        
-        for future in as_completed(future_to_proxy):
-            success, proxy, response_time = future.result()
-            if success:
-                print(f"Working proxy found: {proxy} (Response time: {response_time:.2f}s)")
-                working_proxies.append((proxy, response_time))
-    
+
+    for check in asyncio.run(validate_proxies(proxies, concurrency=max_workers, **check_kwargs)):
+        if check.ok:
+            print(f"Working proxy found: {check.proxy} (connect {check.connect_latency:.2f}s, "
+                  f"first byte {check.ttfb:.2f}s, tls {check.tls_handshake:.2f}s)")
+            working_proxies.append((check.proxy, check.response_time))
+
     # Sort by response time
     return sorted(working_proxies, key=lambda x: x[1])
 
@@ -123,7 +168,7 @@ def save_proxies_to_file(proxies, filename='working_proxies.csv'):
 if __name__ == '__main__':
     try:
         print("Starting proxy collection...")
-        working_proxies = get_working_proxies(max_workers=10)  # Reduced workers
+        working_proxies = get_working_proxies(max_workers=500)
         
         if working_proxies:
             print(f"\nFound {len(working_proxies)} working proxies")
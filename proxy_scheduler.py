@@ -0,0 +1,168 @@
+"""
+Proxy Scheduler
+---------------
+
+Picks proxies by how well they have actually performed instead of blind
+round-robin.
+
+Per proxy it keeps an exponential moving average of latency and success
+rate. Proxies are drawn at random, weighted towards fast and reliable ones.
+A proxy that fails ``failure_threshold`` times in a row trips a circuit
+breaker. It is quarantined for a cooldown that doubles on every trip, then
+gets a single half-open trial: a success puts it back in rotation, a failure
+quarantines it again.
+
+State is saved to a JSON file, so the next run starts out already knowing
+which proxies are good.
+
+Example usage:
+    scheduler = ProxyScheduler.shared()          # seeded from working_proxies.csv
+    proxy = scheduler.choose()
+    scheduler.report_success(proxy, latency=1.8)  # or scheduler.report_failure(proxy)
+    scheduler.save()
+"""
+
+import csv
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROXY_CSV: str = "working_proxies.csv"
+DEFAULT_STATE_PATH: str = "proxy_state.json"
+
+
+@dataclass
+class ProxyStats:
+    proxy: str
+    latency: float = 5.0  # moving average, seconds
+    success_rate: float = 0.5  # moving average, 0..1
+    failures: int = 0  # consecutive failures
+    trips: int = 0  # consecutive circuit breaker trips
+    open_until: float = 0.0  # quarantined until this timestamp
+    uses: int = 0
+
+    def available(self, now: float) -> bool:
+        return now >= self.open_until
+
+
+class ProxyScheduler:
+    _shared: dict[str, "ProxyScheduler"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        proxies: list[str] | dict[str, float] = (),
+        state_path: str | None = DEFAULT_STATE_PATH,
+        alpha: float = 0.3,
+        failure_threshold: int = 3,
+        base_cooldown: float = 60.0,
+        max_cooldown: float = 3600.0,
+        rng: random.Random | None = None,
+    ):
+        self.state_path = state_path
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self.stats: dict[str, ProxyStats] = {}
+        self._load_state()
+        # proxies we have no history for start from their measured response time
+        seeds = proxies if isinstance(proxies, dict) else dict.fromkeys(proxies, None)
+        for proxy, response_time in seeds.items():
+            if proxy not in self.stats:
+                self.stats[proxy] = ProxyStats(proxy)
+                if response_time is not None:
+                    self.stats[proxy].latency = response_time
+
+    @classmethod
+    def from_csv(cls, path: str = DEFAULT_PROXY_CSV, **kwargs) -> "ProxyScheduler":
+        """Seed from the working_proxies.csv written by proxy_list_get"""
+        proxies: dict[str, float] = {}
+        try:
+            with open(path, "r") as f:
+                for row in csv.DictReader(f):
+                    try:
+                        proxies[row["Proxy"]] = float(row.get("Response Time (s)") or 5.0)
+                    except ValueError:
+                        proxies[row["Proxy"]] = 5.0
+        except OSError as e:
+            logger.error(f"Failed to load proxies: {e}")
+        return cls(proxies, **kwargs)
+
+    @classmethod
+    def shared(cls, csv_path: str = DEFAULT_PROXY_CSV, state_path: str = DEFAULT_STATE_PATH) -> "ProxyScheduler":
+        """One scheduler per state file, shared by every scraper in the process"""
+        with cls._shared_lock:
+            if state_path not in cls._shared:
+                cls._shared[state_path] = cls.from_csv(csv_path, state_path=state_path)
+            return cls._shared[state_path]
+
+    def _load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "r") as f:
+                for entry in json.load(f):
+                    self.stats[entry["proxy"]] = ProxyStats(**entry)
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable proxy state {self.state_path}: {e}")
+
+    def save(self):
+        if not self.state_path:
+            return
+        with self._lock:
+            data = [asdict(stats) for stats in self.stats.values()]
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, self.state_path)
+
+    def weight(self, stats: ProxyStats) -> float:
+        # reliability counts twice: a fast proxy that fails is still a slow proxy
+        return stats.success_rate ** 2 / max(stats.latency, 0.05) + 1e-6
+
+    def choose(self, exclude: set[str] = frozenset()) -> str | None:
+        """Draw an available proxy, weighted towards fast, reliable ones"""
+        now = time.time()
+        with self._lock:
+            candidates = [
+                stats for proxy, stats in self.stats.items()
+                if proxy not in exclude and stats.available(now)
+            ]
+            if not candidates:
+                return None
+            chosen = self.rng.choices(candidates, weights=[self.weight(s) for s in candidates])[0]
+            chosen.uses += 1
+            return chosen.proxy
+
+    def report_success(self, proxy: str, latency: float):
+        with self._lock:
+            stats = self.stats.setdefault(proxy, ProxyStats(proxy))
+            stats.latency += self.alpha * (latency - stats.latency)
+            stats.success_rate += self.alpha * (1.0 - stats.success_rate)
+            stats.failures = 0
+            stats.trips = 0
+            stats.open_until = 0.0
+
+    def report_failure(self, proxy: str):
+        with self._lock:
+            stats = self.stats.setdefault(proxy, ProxyStats(proxy))
+            stats.success_rate += self.alpha * (0.0 - stats.success_rate)
+            stats.failures += 1
+            half_open = stats.trips > 0
+            if half_open or stats.failures >= self.failure_threshold:
+                cooldown = min(self.base_cooldown * 2 ** stats.trips, self.max_cooldown)
+                stats.trips += 1
+                stats.open_until = time.time() + cooldown
+                logger.debug(f"Quarantining proxy {proxy} for {cooldown:.0f}s")
+
+    def __len__(self) -> int:
+        return len(self.stats)
@@ -0,0 +1,218 @@
+"""
+Per-domain Rate Limiter
+-----------------------
+
+One token bucket per domain, shared by every scraper and thread in the
+process, instead of random sleeps sprinkled through the scraping code.
+
+Each request takes a token. Tokens refill at the domain's current rate, up
+to ``burst``, and every wait is stretched by a random jitter so requests do
+not land on a fixed cadence. The rate adapts in AIMD fashion, like TCP
+congestion control:
+
+    success             rate += increase        (up to max_rate)
+    captcha / 429 / 503 rate *= backoff          (down to min_rate), and the
+                        bucket goes into debt for ``penalty`` seconds (or
+                        the server's Retry-After), pausing every worker
+
+Concurrent blocks within one penalty window count as one slowdown, so eight
+workers hitting the same captcha do not divide the rate by 256. Throughput
+settles just below the rate at which a site starts pushing back. The learned
+rates are saved to a JSON file, so the next run starts where this one ended.
+
+Example usage:
+    limiter = RateLimiter.shared()
+    limiter.wait("https://www.alibaba.com/product-detail/...")   # blocks until allowed
+    limiter.report_success("alibaba.com")                       # or report_blocked(...)
+    limiter.save()
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from metrics import METRICS, domain_of
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH: str = "rate_state.json"
+
+
+@dataclass(frozen=True)
+class DomainPolicy:
+    rate: float = 0.5  # requests per second to start from
+    max_rate: float = 2.0  # never probe faster than this
+    min_rate: float = 0.02  # never back off slower than this
+    burst: float = 2.0  # requests allowed back to back after an idle spell
+    jitter: float = 0.3  # waits are stretched by up to this fraction
+    increase: float = 0.02  # requests per second added per success
+    backoff: float = 0.5  # rate multiplier on a block
+    penalty: float = 30.0  # seconds every worker pauses after a block
+
+
+# matched on the domain and its parents: "m.alibaba.com" uses "alibaba.com"
+DEFAULT_POLICIES: dict[str, DomainPolicy] = {
+    # the old flow slept 1-3s per product and 0.5-2s per review page
+    "alibaba.com": DomainPolicy(rate=0.5, max_rate=1.5),
+    "amazon.nl": DomainPolicy(rate=1.0, max_rate=3.0),
+    "aliexpress.com": DomainPolicy(rate=0.5, max_rate=2.0),
+}
+
+
+@dataclass
+class DomainState:
+    rate: float
+    tokens: float
+    updated: float = field(default_factory=time.monotonic)
+    last_backoff: float = float("-inf")
+    requests: int = 0
+    blocks: int = 0
+    waited: float = 0.0
+
+
+class RateLimiter:
+    _shared: dict[str, "RateLimiter"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        policies: dict[str, DomainPolicy] | None = None,
+        default_policy: DomainPolicy = DomainPolicy(),
+        state_path: str | None = DEFAULT_STATE_PATH,
+        rng: random.Random | None = None,
+        sleep: Callable[[float, str], None] | None = None,
+    ):
+        self.policies = DEFAULT_POLICIES if policies is None else policies
+        self.default_policy = default_policy
+        self.state_path = state_path
+        self.rng = rng or random.Random()
+        # injectable for tests and benchmarks; by default recorded as the "sleep" stage
+        self._sleep = sleep or (lambda seconds, domain: METRICS.sleep(seconds, domain=domain))
+        self._lock = threading.Lock()
+        self.states: dict[str, DomainState] = {}
+        self._saved_rates: dict[str, float] = self._load_state()
+
+    @classmethod
+    def shared(cls, state_path: str = DEFAULT_STATE_PATH) -> "RateLimiter":
+        """One limiter per state file, shared by every scraper in the process"""
+        with cls._shared_lock:
+            if state_path not in cls._shared:
+                cls._shared[state_path] = cls(state_path=state_path)
+            return cls._shared[state_path]
+
+    def _load_state(self) -> dict[str, float]:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, "r") as f:
+                return {domain: float(rate) for domain, rate in json.load(f).items()}
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable rate state {self.state_path}: {e}")
+            return {}
+
+    def save(self):
+        if not self.state_path:
+            return
+        with self._lock:
+            data = {**self._saved_rates, **{domain: state.rate for domain, state in self.states.items()}}
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, self.state_path)
+
+    def policy(self, domain: str) -> DomainPolicy:
+        parts = domain.split(".")
+        for i in range(len(parts) - 1):
+            policy = self.policies.get(".".join(parts[i:]))
+            if policy is not None:
+                return policy
+        return self.default_policy
+
+    def _state(self, domain: str) -> DomainState:
+        # callers hold the lock
+        state = self.states.get(domain)
+        if state is None:
+            policy = self.policy(domain)
+            rate = self._saved_rates.get(domain, policy.rate)
+            rate = min(max(rate, policy.min_rate), policy.max_rate)
+            state = self.states[domain] = DomainState(rate=rate, tokens=1.0)
+        return state
+
+    def reserve(self, url_or_domain: str) -> float:
+        """Take a token and return how long to wait before using it"""
+        domain = domain_of(url_or_domain)
+        policy = self.policy(domain)
+        with self._lock:
+            state = self._state(domain)
+            now = time.monotonic()
+            state.tokens = min(policy.burst, state.tokens + (now - state.updated) * state.rate)
+            state.updated = now
+            state.tokens -= 1
+            state.requests += 1
+            if state.tokens >= 0:
+                return 0.0
+            # tokens below zero are reservations already handed to other workers
+            delay = -state.tokens / state.rate * (1 + self.rng.uniform(0, policy.jitter))
+            state.waited += delay
+            return delay
+
+    def wait(self, url_or_domain: str) -> float:
+        """Block until the domain allows another request, returns the seconds waited"""
+        delay = self.reserve(url_or_domain)
+        if delay > 0:
+            self._sleep(delay, domain_of(url_or_domain))
+        return delay
+
+    def report_success(self, url_or_domain: str):
+        domain = domain_of(url_or_domain)
+        policy = self.policy(domain)
+        with self._lock:
+            state = self._state(domain)
+            state.rate = min(policy.max_rate, state.rate + policy.increase)
+
+    def report_blocked(self, url_or_domain: str, retry_after: float | None = None):
+        """A captcha, 429 or 503: slow the domain down and pause every worker on it"""
+        domain = domain_of(url_or_domain)
+        policy = self.policy(domain)
+        with self._lock:
+            state = self._state(domain)
+            state.blocks += 1
+            now = time.monotonic()
+            if now - state.last_backoff < policy.penalty:
+                # same episode, already slowed down for it
+                return
+            state.last_backoff = now
+            state.rate = max(policy.min_rate, state.rate * policy.backoff)
+            pause = max(policy.penalty, retry_after or 0.0)
+            state.tokens = min(state.tokens, 0.0) - pause * state.rate
+            logger.info(f"Slowing {domain} down to {state.rate:.3f} req/s, pausing {pause:.0f}s")
+        METRICS.inc("slowdowns", domain=domain)
+
+    def rate(self, url_or_domain: str) -> float:
+        with self._lock:
+            return self._state(domain_of(url_or_domain)).rate
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {
+                domain: {
+                    "rate": round(state.rate, 3),
+                    "requests": state.requests,
+                    "blocks": state.blocks,
+                    "waited_s": round(state.waited, 1),
+                }
+                for domain, state in self.states.items()
+            }
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    """Parse a Retry-After header given in seconds (HTTP dates are ignored)"""
+    try:
+        return max(float(value), 0.0) if value else None
+    except ValueError:
+        return None
@@ -0,0 +1,250 @@
+"""
+Readiness Waits
+---------------
+
+Event-driven replacements for fixed ``time.sleep`` calls. Each wait runs as a
+single asynchronous script in the browser and returns as soon as its
+conditions hold, or ``False`` once its timeout is reached:
+
+    selector present     document.querySelector(selector) matches
+    DOM quiet            a MutationObserver saw no change for quiet_ms
+    network idle         no fetch/XHR in flight and no resource finished for idle_ms
+
+``scroll_until_stable`` replaces step-and-sleep lazy-load loops with one
+in-browser routine that returns when the page height stops growing.
+
+Network idle is judged by fetch/XHR counters that ``install_network_tracker``
+registers over DevTools before the driver's first navigation, so requests
+the page starts while it is still loading are counted too. Without
+DevTools the counters are installed by the first wait, and only see what
+starts after it.
+
+In replay mode the driver cannot run scripts, so every wait returns ``True``
+straight away: an archived page is as loaded as it will ever be.
+
+``navigate`` pairs a navigation with the selectors an extractor needs, for
+drivers using the "eager" or "none" page-load strategy, and then lets the
+page's own requests settle.
+
+Example usage:
+    install_network_tracker(driver)   # once, right after the driver starts
+    scraper.get(url)
+    wait_until_ready(scraper.driver, selector="#productTitle", quiet_ms=300)
+    navigate(driver, url, ready=("#productTitle", "span.a-price-whole"))
+"""
+
+import logging
+
+from selenium.common.exceptions import TimeoutException
+
+from metrics import METRICS, domain_of
+
+logger = logging.getLogger(__name__)
+
+# installs fetch/XHR counters once per document so network idle can be judged;
+# registered to run before the page's own scripts by install_network_tracker
+_NETWORK_TRACKER_JS: str = """
+if (!window.__scraperNet) {
+    const net = window.__scraperNet = {inflight: 0, last: performance.now()};
+    const touch = () => { net.last = performance.now(); };
+    const origFetch = window.fetch;
+    if (origFetch) {
+        window.fetch = function () {
+            net.inflight++; touch();
+            return origFetch.apply(this, arguments).finally(() => { net.inflight--; touch(); });
+        };
+    }
+    const origSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        net.inflight++; touch();
+        this.addEventListener('loadend', () => { net.inflight--; touch(); });
+        return origSend.apply(this, arguments);
+    };
+    try {
+        new PerformanceObserver(touch).observe({type: 'resource', buffered: false});
+    } catch (e) {}
+}
+"""
+
+WAIT_UNTIL_READY_JS: str = _NETWORK_TRACKER_JS + """
+const [selectors, quietMs, idleMs, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const net = window.__scraperNet;
+const start = performance.now();
+let lastMutation = start;
+const observer = new MutationObserver(() => { lastMutation = performance.now(); });
+observer.observe(document.documentElement, {
+    childList: true, subtree: true, attributes: true, characterData: true,
+});
+const finish = (ok) => { observer.disconnect(); done(ok); };
+const check = () => {
+    const now = performance.now();
+    const selectorOk = !selectors || selectors.every((s) => document.querySelector(s) !== null);
+    const quietOk = quietMs === null || now - lastMutation >= quietMs;
+    const networkOk = idleMs === null || (net.inflight <= 0 && now - net.last >= idleMs);
+    if (selectorOk && quietOk && networkOk) return finish(true);
+    if (now - start >= timeoutMs) return finish(false);
+    setTimeout(check, 50);
+};
+check();
+"""
+
+SCROLL_UNTIL_STABLE_JS: str = """
+const [step, pauseMs, stableRounds, timeoutMs, container] = arguments;
+const done = arguments[arguments.length - 1];
+const scroller = container || document.scrollingElement || document.body;
+const start = performance.now();
+let lastHeight = scroller.scrollHeight;
+let stable = 0;
+let position = scroller.scrollTop;
+const tick = () => {
+    const height = scroller.scrollHeight;
+    position = Math.min(position + step, height);
+    scroller.scrollTop = position;
+    if (position + scroller.clientHeight >= height) {
+        // at the bottom: count rounds in which lazy loading added nothing
+        stable = height === lastHeight ? stable + 1 : 0;
+        lastHeight = height;
+    }
+    if (stable >= stableRounds || performance.now() - start >= timeoutMs) {
+        return done(scroller.scrollHeight);
+    }
+    setTimeout(tick, pauseMs);
+};
+tick();
+"""
+
+
+def install_network_tracker(driver) -> bool:
+    """Run the fetch/XHR counters in every document before its own scripts.
+
+    Returns False when the driver has no DevTools (replay); the waits then
+    install the counters themselves.
+    """
+    if not hasattr(driver, "execute_cdp_cmd"):
+        return False
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": _NETWORK_TRACKER_JS})
+    except Exception as e:
+        logger.warning(f"Failed to install the network tracker: {e}")
+        return False
+    return True
+
+
+def _script_timeout(driver) -> float | None:
+    try:
+        return driver.timeouts.script
+    except Exception:
+        return None
+
+
+def _run_async(driver, script: str, timeout: float, *args):
+    previous = _script_timeout(driver)
+    try:
+        driver.set_script_timeout(timeout + 5)
+        return driver.execute_async_script(script, *args)
+    except Exception as e:
+        logger.warning(f"Readiness script failed: {e}")
+        return False
+    finally:
+        # other callers' async scripts keep their own timeout
+        if previous is not None:
+            try:
+                driver.set_script_timeout(previous)
+            except Exception as e:
+                logger.debug(f"Could not restore the script timeout: {e}")
+
+
+def wait_until_ready(
+    driver,
+    selector: str | tuple[str, ...] | None = None,
+    quiet_ms: int | None = None,
+    idle_ms: int | None = None,
+    timeout: float = 10,
+) -> bool:
+    """Wait until every requested condition holds at the same time.
+
+    A tuple of selectors waits until each of them matches.
+    """
+    selectors = [selector] if isinstance(selector, str) else list(selector) if selector else None
+    with METRICS.timer("wait"):
+        ready = _run_async(
+            driver, WAIT_UNTIL_READY_JS, timeout, selectors, quiet_ms, idle_ms, int(timeout * 1000)
+        )
+    if ready is None:
+        # replay driver: nothing is loading
+        return True
+    if not ready:
+        logger.debug(f"Page not ready after {timeout}s (selector={selector})")
+    return bool(ready)
+
+
+def wait_for_selector(driver, selector: str | tuple[str, ...], timeout: float = 10) -> bool:
+    return wait_until_ready(driver, selector=selector, timeout=timeout)
+
+
+def wait_for_dom_quiet(driver, quiet_ms: int = 500, timeout: float = 10) -> bool:
+    return wait_until_ready(driver, quiet_ms=quiet_ms, timeout=timeout)
+
+
+def wait_for_network_idle(driver, idle_ms: int = 500, timeout: float = 10) -> bool:
+    return wait_until_ready(driver, idle_ms=idle_ms, timeout=timeout)
+
+
+def scroll_until_stable(
+    driver,
+    container=None,
+    step: int = 800,
+    pause_ms: int = 150,
+    stable_rounds: int = 3,
+    timeout: float = 30,
+) -> int | None:
+    """Scroll the page (or a container element) until its height stops growing.
+
+    Returns the final scroll height, or None in replay mode.
+    """
+    with METRICS.timer("scroll"):
+        return _run_async(
+            driver, SCROLL_UNTIL_STABLE_JS, timeout,
+            step, pause_ms, stable_rounds, int(timeout * 1000), container,
+        )
+
+
+def stop_loading(driver):
+    """Abort whatever the page is still fetching, keeping the DOM built so far"""
+    try:
+        driver.execute_script("window.stop();")
+    except Exception as e:
+        logger.debug(f"window.stop() failed: {e}")
+
+
+def navigate(
+    driver,
+    url: str,
+    ready: str | tuple[str, ...] | None = None,
+    ready_timeout: float = 10,
+    idle_ms: int | None = 250,
+    idle_timeout: float = 2,
+) -> bool:
+    """driver.get that survives the page-load timeout, waits for `ready`, then for network idle.
+
+    With an "eager" or "none" page-load strategy ``driver.get`` returns
+    before third-party scripts finish; the extractor's selectors decide when
+    the page is usable. A navigation that hits the driver's page-load
+    timeout is stopped and gets the same selector check, so a hung page
+    costs at most page_load_timeout + ready_timeout. Once the selectors
+    match, the page gets up to idle_timeout for its fetch/XHR requests to
+    settle (idle_ms=None skips that). The network wait does not decide the
+    result: a page that keeps polling is still usable. Returns whether the
+    selectors matched (always True without selectors).
+    """
+    try:
+        driver.get(url)
+    except TimeoutException:
+        logger.warning(f"Page load timed out, stopping it: {url}")
+        METRICS.inc("page_load_timeouts", domain=domain_of(url))
+        stop_loading(driver)
+    is_ready = wait_until_ready(driver, selector=ready, timeout=ready_timeout) if ready else True
+    if is_ready and idle_ms is not None and not wait_for_network_idle(driver, idle_ms, idle_timeout):
+        METRICS.inc("network_busy", domain=domain_of(url))
+    return is_ready
@@ -0,0 +1,181 @@
+"""
+Re-crawl Cache
+--------------
+
+Remembers what was scraped for each product (keyed by the canonical product
+id from ``url_frontier``) and when each class of field was last refreshed,
+so a re-crawl only pays for what may have changed:
+
+    price    6 hours    price, price tiers, lead times
+    rating   1 day      star rating
+    details  7 days     title, specs, key attributes
+    reviews  7 days     reviews (scrolling / pagination, the expensive part)
+
+If every field of a product is still fresh the page is not loaded at all.
+Otherwise the page is loaded and its cheap fields are hashed into a
+fingerprint. When the fingerprint matches the cached one and the reviews
+are within their TTL, the cached reviews are reused and review scrolling
+or pagination is skipped.
+
+The cache is bounded: the least recently used products are evicted beyond
+``max_entries``. It is saved to a JSON file between runs.
+
+Products done in earlier runs only reach the scraper again through
+``URLFrontier.filter(urls, recrawl=cache.due)``.
+
+Example usage:
+    with RecrawlCache("recrawl_cache.json") as cache:
+        product = get_product_page_data_AE(scraper, url, cache=cache)
+        print(cache.summary())
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from output_sink import product_to_dict
+from url_frontier import product_key
+
+logger = logging.getLogger(__name__)
+
+HOUR: float = 3600.0
+DAY: float = 24 * HOUR
+
+DEFAULT_TTLS: dict[str, float] = {
+    "price": 6 * HOUR,
+    "rating": DAY,
+    "details": 7 * DAY,
+    "reviews": 7 * DAY,
+}
+
+# product field -> field class whose TTL applies, anything else is "details"
+FIELD_CLASSES: dict[str, str] = {
+    "price": "price",
+    "lead_time": "price",
+    "rating": "rating",
+    "reviews": "reviews",
+}
+
+
+def page_fingerprint(*values: Any) -> str:
+    """Hash of cheap-to-extract page values, e.g. title, rating, specs.
+
+    Leave out values that change without the reviews changing (price), or
+    every price update would trigger a full review re-scrape.
+    """
+    data = json.dumps(values, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+class RecrawlCache:
+    def __init__(
+        self,
+        path: str | None = "recrawl_cache.json",
+        ttls: dict[str, float] | None = None,
+        max_entries: int = 50_000,
+    ):
+        self.path = path
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # product key -> {"product", "fingerprint", "refreshed": {field class: timestamp}}
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self.stats = {"skipped_page": 0, "reused_reviews": 0, "misses": 0}
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._entries = OrderedDict(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable re-crawl cache {self.path}: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps(self._entries, ensure_ascii=False)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def _entry(self, url: str) -> dict[str, Any] | None:
+        key = product_key(url)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _is_fresh(self, entry: dict[str, Any], field_class: str, now: float) -> bool:
+        refreshed = entry["refreshed"].get(field_class)
+        return refreshed is not None and now - refreshed < self.ttls[field_class]
+
+    def due(self, url: str) -> bool:
+        """Whether a product should be crawled again: unknown, or some field class past its TTL.
+
+        Meant as URLFrontier.filter's recrawl hook, so products done in
+        earlier runs come back once something about them may have changed.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(product_key(url))
+            return entry is None or not all(self._is_fresh(entry, c, now) for c in self.ttls)
+
+    def fresh(self, url: str) -> dict[str, Any] | None:
+        """The cached product if every field class is within its TTL, else None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entry(url)
+            if entry is not None and all(self._is_fresh(entry, c, now) for c in self.ttls):
+                self.stats["skipped_page"] += 1
+                return entry["product"]
+            self.stats["misses"] += 1
+            return None
+
+    def reuse(self, url: str, fingerprint: str, field: str = "reviews") -> Any | None:
+        """Cached value of `field` if the page fingerprint is unchanged and it is within TTL"""
+        now = time.time()
+        with self._lock:
+            entry = self._entry(url)
+            field_class = FIELD_CLASSES.get(field, "details")
+            if entry is None or entry["fingerprint"] != fingerprint or not self._is_fresh(entry, field_class, now):
+                return None
+            if field == "reviews":
+                self.stats["reused_reviews"] += 1
+            return entry["product"].get(field)
+
+    def put(self, url: str, product: Any, fingerprint: str, reused: tuple[str, ...] = ()):
+        """Store a scraped product, renewing every field class except those reused from the cache"""
+        now = time.time()
+        data = product_to_dict(product)
+        with self._lock:
+            key = product_key(url)
+            old = self._entries.get(key)
+            refreshed = dict(old["refreshed"]) if old else {}
+            for field_class in self.ttls:
+                if field_class not in {FIELD_CLASSES.get(field, "details") for field in reused}:
+                    refreshed[field_class] = now
+            self._entries[key] = {"product": data, "fingerprint": fingerprint, "refreshed": refreshed}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def summary(self) -> dict[str, int]:
+        return {**self.stats, "entries": len(self._entries)}
+
+    def __enter__(self) -> "RecrawlCache":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
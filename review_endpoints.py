@@ -0,0 +1,301 @@
+"""
+Review Endpoints
+----------------
+
+Fetches review pages straight from the JSON endpoints the product pages
+call themselves, instead of clicking through pagination buttons or
+scrolling a modal one batch at a time.
+
+The endpoint is discovered from the page's Resource Timing entries: the
+first fetch/XHR the page made whose URL matches the site's pattern. Its
+page parameter (``page``, ``pageNo``, ...) is found in the query string and
+rewritten for every other page. The pages are then fetched concurrently by
+a script running in the browser, so the requests carry the session's
+cookies and pass the site's CORS rules exactly like the page's own calls.
+
+Responses are mapped to the shapes the scrapers already return: AliExpress
+review dicts ``{"content", "rating"}`` and Alibaba ``Review`` dicts. When no
+endpoint was seen, or its first page holds no reviews the parser can read,
+``fetch_reviews`` returns None and the caller falls back to its click /
+scroll path.
+
+When recording, every fetched page is archived in the ``PageStore`` under
+its endpoint URL, together with a manifest under the product URL
+(``manifest_url``); ``replay_reviews`` rebuilds the reviews from them.
+
+Example usage:
+    reviews = fetch_reviews(scraper.driver, "aliexpress", max_pages=5, max_reviews=50)
+    if reviews is None:
+        reviews = collect_reviews_AE(scraper)
+"""
+
+import json
+import logging
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Callable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from embedded_json import decode_at, first
+from metrics import METRICS, domain_of
+from page_store import PageStore
+from rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+PAGE_PARAMS: tuple[str, ...] = ("page", "pageNo", "currentPage", "pageIndex", "pageNum")
+
+_RESOURCE_URLS_JS: str = """
+return performance.getEntriesByType('resource')
+    .filter((e) => e.initiatorType === 'fetch' || e.initiatorType === 'xmlhttprequest')
+    .map((e) => e.name);
+"""
+
+# fetches every url with at most `concurrency` requests in flight, in page order
+FETCH_PAGES_JS: str = """
+const [urls, concurrency, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const results = new Array(urls.length);
+let next = 0;
+const worker = async () => {
+    while (next < urls.length) {
+        const i = next++;
+        const controller = new AbortController();
+        const timer = setTimeout(() => controller.abort(), timeoutMs);
+        try {
+            const response = await fetch(urls[i], {credentials: 'include', signal: controller.signal});
+            results[i] = {status: response.status, body: await response.text()};
+        } catch (e) {
+            results[i] = {status: 0, body: String(e)};
+        } finally {
+            clearTimeout(timer);
+        }
+    }
+};
+Promise.all(Array.from({length: Math.min(concurrency, urls.length)}, worker)).then(() => done(results));
+"""
+
+
+def _clean(text: str) -> str:
+    # same cleaning as the DOM extractors: no emojis, no newlines
+    return text.encode("ascii", "ignore").decode("ascii").replace("\n", " ").strip()
+
+
+def _to_float(value: Any) -> float | None:
+    """80, "80", "4.5" or "4,5" as a float; 0.0 when missing, None when it is not a number"""
+    if value in (None, ""):
+        return 0.0
+    try:
+        number = float(str(value).replace(",", "."))
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+# (reviews, total pages if the response says), None when the response does not parse
+ParsedPage = tuple[list[dict[str, Any]], int | None]
+
+
+def parse_aliexpress(data: Any) -> ParsedPage | None:
+    """searchEvaluation.do: buyerEval is a percentage, 100 = five stars"""
+    items = first(data, ("data.evaViewList", "evaViewList")) or []
+    reviews = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        if (rating := _to_float(item.get("buyerEval"))) is None:
+            return None
+        reviews.append({"content": _clean(str(item.get("buyerFeedback") or "")), "rating": int(rating) // 20})
+    if (total := _to_float(first(data, ("data.totalPage", "totalPage")))) is None:
+        return None
+    return reviews, int(total) or None
+
+
+def parse_alibaba(data: Any) -> ParsedPage | None:
+    items = first(data, ("data.reviewList", "data.list", "result.data", "data.data", "reviewList", "list")) or []
+    reviews = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        text = _clean(str(first(item, ("reviewContent", "content", "comment")) or ""))
+        if not text:
+            continue
+        if (rating := _to_float(first(item, ("reviewScore", "score", "star", "rating")))) is None:
+            return None
+        reply = first(item, ("replyContent", "sellerReply", "reply.content"))
+        reviews.append({
+            "rating": rating,
+            "text": text,
+            "translated_text": bool(first(item, ("isTranslated", "translated"))),
+            "response_text": str(reply).strip() if reply else None,
+        })
+    total = _to_float(first(data, ("data.totalPage", "data.pageCount", "totalPage", "pageCount")))
+    if total is None:
+        return None
+    return reviews, int(total) or None
+
+
+@dataclass(frozen=True)
+class ReviewEndpoint:
+    name: str
+    pattern: re.Pattern
+    parse: Callable[[Any], ParsedPage | None]
+
+
+ENDPOINTS: dict[str, ReviewEndpoint] = {
+    "aliexpress": ReviewEndpoint(
+        "aliexpress", re.compile(r"feedback\.aliexpress\.com/pc/searchEvaluation\.do"), parse_aliexpress
+    ),
+    # the review list request only (productReviewList, review-list, ...), not every url mentioning reviews
+    "alibaba": ReviewEndpoint(
+        "alibaba", re.compile(r"alibaba\.com/[^?]*review[-_]?list", re.IGNORECASE),
+        parse_alibaba,
+    ),
+}
+
+
+def page_param(url: str) -> str | None:
+    params = dict(parse_qsl(urlsplit(url).query))
+    return next((name for name in PAGE_PARAMS if name in params), None)
+
+
+def page_url(url: str, param: str, page: int) -> str:
+    parts = urlsplit(url)
+    query = [(key, str(page) if key == param else value) for key, value in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def manifest_url(product_url: str) -> str:
+    """PageStore key listing the review pages fetched for a product"""
+    parts = urlsplit(product_url if not product_url.startswith("//") else "https:" + product_url)
+    query = [*parse_qsl(parts.query, keep_blank_values=True), ("review_endpoint", "pages")]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def archive_pages(page_store: PageStore, product_url: str, site: str, pages: list[tuple[str, Any]]):
+    """Archive fetched review pages (url, decoded JSON) and the manifest that lists them"""
+    try:
+        for url, data in pages:
+            page_store.put(url, json.dumps(data, ensure_ascii=False))
+        page_store.put(manifest_url(product_url), json.dumps({"site": site, "urls": [url for url, _ in pages]}))
+    except OSError as e:
+        logger.warning(f"Failed to archive review pages of {product_url}: {e}")
+
+
+def replay_reviews(
+    page_store: PageStore, product_url: str, max_reviews: int | None = None
+) -> list[dict[str, Any]] | None:
+    """Reviews from the archived endpoint pages of a product, None if none were recorded"""
+    manifest = page_store.get(manifest_url(product_url))
+    if manifest is None:
+        return None
+    manifest = json.loads(manifest)
+    endpoint = ENDPOINTS[manifest["site"]]
+    reviews = []
+    for url in manifest["urls"]:
+        if (body := page_store.get(url)) is not None and (parsed := endpoint.parse(json.loads(body))) is not None:
+            reviews.extend(parsed[0])
+    return reviews[:max_reviews] if max_reviews is not None else reviews
+
+
+def discover_endpoint(driver, endpoint: ReviewEndpoint) -> str | None:
+    """URL of the first review request the page made itself, if it made one"""
+    try:
+        urls = driver.execute_script(_RESOURCE_URLS_JS) or []
+    except Exception as e:
+        logger.debug(f"Could not read resource timings: {e}")
+        return None
+    return next((url for url in urls if endpoint.pattern.search(url) and page_param(url)), None)
+
+
+def fetch_pages(driver, urls: list[str], concurrency: int = 4, timeout: float = 15) -> list[Any]:
+    """Fetch `urls` in the page's context and decode each body, None for failures"""
+    try:
+        driver.set_script_timeout(timeout * len(urls) / max(concurrency, 1) + 5)
+        responses = driver.execute_async_script(FETCH_PAGES_JS, urls, concurrency, int(timeout * 1000)) or []
+    except Exception as e:
+        logger.warning(f"Review fetch script failed: {e}")
+        return [None] * len(urls)
+    decoded = []
+    for url, response in zip(urls, responses):
+        body = (response or {}).get("body", "")
+        start = body.find("{")  # also unwraps JSONP callbacks
+        if (response or {}).get("status") != 200 or start < 0:
+            logger.debug(f"Review page {url} returned {(response or {}).get('status')}")
+            decoded.append(None)
+            continue
+        try:
+            decoded.append(decode_at(body, start))
+        except ValueError:
+            decoded.append(None)
+    return decoded
+
+
+def fetch_reviews(
+    driver,
+    site: str,
+    max_pages: int = 10,
+    max_reviews: int | None = None,
+    concurrency: int = 4,
+    rate_limiter: RateLimiter | None = None,
+    seed_url: str | None = None,
+    page_store: PageStore | None = None,
+    product_url: str | None = None,
+) -> list[dict[str, Any]] | None:
+    """Every review of the product, up to max_pages pages / max_reviews reviews.
+
+    Returns None when the page never called a review endpoint, or page 1
+    could not be fetched or held no reviews the parser could read, so the
+    caller can fall back to the DOM. With a page_store (recording) the
+    fetched pages are archived for product_url.
+    """
+    endpoint = ENDPOINTS[site]
+    seed = seed_url or discover_endpoint(driver, endpoint)
+    if seed is None:
+        METRICS.inc("review_endpoint_misses", site=site)
+        return None
+    param = page_param(seed)
+    domain = domain_of(seed)
+    with METRICS.timer("review_fetch", domain=domain):
+        if rate_limiter is not None:
+            rate_limiter.wait(domain)
+        first_url = page_url(seed, param, 1)
+        (data,) = fetch_pages(driver, [first_url])
+        if data is None:
+            return None
+        parsed_first = endpoint.parse(data)
+        if parsed_first is None or not parsed_first[0]:
+            # an unexpected payload (or not the review list after all): the DOM path still works
+            logger.debug(f"No readable reviews on {site} review page {first_url}")
+            METRICS.inc("review_endpoint_misses", site=site)
+            return None
+        fetched = [(first_url, data)]
+        reviews, total_pages = parsed_first
+        last_page = min(max_pages, total_pages) if total_pages else max_pages
+        page = 2
+        # with a known page count everything is fetched in batches; otherwise until a page comes back empty
+        while page <= last_page and (max_reviews is None or len(reviews) < max_reviews):
+            batch = list(range(page, min(page + concurrency, last_page + 1)))
+            if rate_limiter is not None:
+                # one budget token per request, paid before the batch goes out
+                for _ in batch:
+                    rate_limiter.wait(domain)
+            urls = [page_url(seed, param, n) for n in batch]
+            results = fetch_pages(driver, urls, concurrency)
+            parsed = []
+            for url, result in zip(urls, results):
+                page_data = endpoint.parse(result) if result is not None else None
+                if page_data is not None:
+                    fetched.append((url, result))
+                parsed.append(page_data[0] if page_data is not None else [])
+            for page_reviews in parsed:
+                reviews.extend(page_reviews)
+            if not total_pages and not all(parsed):
+                break
+            page += len(batch)
+        METRICS.inc("review_pages", page - 1, domain=domain)
+    if page_store is not None and product_url is not None:
+        archive_pages(page_store, product_url, site, fetched)
+    logger.debug(f"Fetched {len(reviews)} reviews from {page - 1} {site} review pages")
+    return reviews[:max_reviews] if max_reviews is not None else reviews
@@ -0,0 +1,219 @@
+"""
+Compact Review Store
+--------------------
+
+Keeps the reviews of a batch of products in a handful of flat arrays instead
+of one dict (plus a float and several strings) per review:
+
+    ratings     array of float32, NaN where a review had no rating
+    flags       one byte per review: translated_text and which keys it had
+    strings     title / text / response text as spans of one UTF-8 buffer;
+                short repeated strings ("Title not found", canned seller
+                responses) are stored once
+
+Reviews are read back as the same dicts that went in, so code that iterates
+``product.reviews`` or converts a product with ``dict()`` / ``asdict`` keeps
+working. ``ProductBatch`` moves the reviews of every product added to it
+into one shared store and leaves a two-integer ``ReviewList`` view in their
+place.
+
+Example usage:
+    batch = ProductBatch()
+    for product in products:
+        batch.add(product)          # product.reviews is now a ReviewList
+    batch.reviews.mean_rating(0)
+    batch.reviews.ratings_array()   # numpy view of every rating in the batch
+"""
+
+import math
+from array import array
+from typing import Any, Iterable, Iterator, Sequence
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# keys a review dict can have, in the order they are written back
+REVIEW_KEYS: tuple[str, ...] = ("title", "text", "content", "rating", "translated_text", "response_text")
+
+_HAS_TITLE = 1 << 0
+_HAS_TEXT = 1 << 1
+_HAS_CONTENT = 1 << 2  # AliExpress calls the text "content"
+_HAS_RATING = 1 << 3
+_HAS_TRANSLATED = 1 << 4
+_HAS_RESPONSE = 1 << 5
+_TRANSLATED = 1 << 6
+
+_KEY_FLAGS: dict[str, int] = {
+    "title": _HAS_TITLE,
+    "text": _HAS_TEXT,
+    "content": _HAS_CONTENT,
+    "rating": _HAS_RATING,
+    "translated_text": _HAS_TRANSLATED,
+    "response_text": _HAS_RESPONSE,
+}
+
+INTERN_MAX_LENGTH: int = 32
+
+
+class ReviewStore:
+    def __init__(self):
+        self.ratings = array("f")
+        self.flags = array("B")
+        # per review, per string key: span id into the buffer, -1 for None
+        self._strings = array("i")
+        # span id -> byte offset and length in the buffer
+        self._span_starts = array("Q")
+        self._span_lengths = array("I")
+        self._buffer = bytearray()
+        self._interned: dict[str, int] = {}
+        # product index -> first review; the product's reviews run to the next start
+        self._product_starts = array("Q", [0])
+
+    def _span(self, value: str | None) -> int:
+        if value is None:
+            return -1
+        short = len(value) <= INTERN_MAX_LENGTH
+        if short and value in self._interned:
+            return self._interned[value]
+        data = value.encode("utf-8")
+        span = len(self._span_starts)
+        self._span_starts.append(len(self._buffer))
+        self._span_lengths.append(len(data))
+        self._buffer += data
+        if short:
+            self._interned[value] = span
+        return span
+
+    def _string(self, span: int) -> str | None:
+        if span < 0:
+            return None
+        start = self._span_starts[span]
+        return self._buffer[start:start + self._span_lengths[span]].decode("utf-8")
+
+    def _append(self, review: dict[str, Any]):
+        unknown = review.keys() - _KEY_FLAGS.keys()
+        if unknown:
+            raise ValueError(f"ReviewStore cannot hold review keys {sorted(unknown)}")
+        flags = 0
+        for key in review:
+            flags |= _KEY_FLAGS[key]
+        if review.get("translated_text"):
+            flags |= _TRANSLATED
+        rating = review.get("rating")
+        self.ratings.append(math.nan if rating is None else float(rating))
+        self.flags.append(flags)
+        self._strings.append(self._span(review.get("title")))
+        self._strings.append(self._span(review.get("text", review.get("content"))))
+        self._strings.append(self._span(review.get("response_text")))
+
+    def add(self, reviews: Iterable[dict[str, Any]]) -> int:
+        """Store one product's reviews, returns the product's index in this store"""
+        for review in reviews:
+            self._append(review)
+        self._product_starts.append(len(self.flags))
+        return len(self._product_starts) - 2
+
+    def review(self, index: int) -> dict[str, Any]:
+        flags = self.flags[index]
+        title, text, response = (self._string(span) for span in self._strings[index * 3:index * 3 + 3])
+        values = {
+            "title": title,
+            "text": text,
+            "content": text,
+            # float32 storage: round away the noise so 4.7 reads back as 4.7
+            "rating": None if math.isnan(self.ratings[index]) else round(self.ratings[index], 4),
+            "translated_text": bool(flags & _TRANSLATED),
+            "response_text": response,
+        }
+        return {key: values[key] for key in REVIEW_KEYS if flags & _KEY_FLAGS[key]}
+
+    def span(self, product: int) -> range:
+        return range(self._product_starts[product], self._product_starts[product + 1])
+
+    def reviews(self, product: int) -> "ReviewList":
+        return ReviewList(self, product)
+
+    def mean_rating(self, product: int) -> float | None:
+        ratings = [self.ratings[i] for i in self.span(product) if not math.isnan(self.ratings[i])]
+        return round(sum(ratings) / len(ratings), 4) if ratings else None
+
+    def ratings_array(self):
+        """Every rating in the store as a float32 numpy array, without copying"""
+        if not HAS_NUMPY:
+            raise ImportError("ratings_array needs numpy: pip install numpy")
+        return np.frombuffer(self.ratings, dtype=np.float32)
+
+    def nbytes(self) -> int:
+        """Bytes held by the arrays and text buffer (the intern table not included)"""
+        arrays = (self.ratings, self.flags, self._strings, self._span_starts, self._span_lengths, self._product_starts)
+        return sum(a.itemsize * len(a) for a in arrays) + len(self._buffer)
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        return (self.review(i) for i in range(len(self)))
+
+
+class ReviewList(Sequence):
+    """Read-only list view of one product's reviews in a ReviewStore"""
+
+    __slots__ = ("store", "product")
+
+    def __init__(self, store: ReviewStore, product: int):
+        self.store = store
+        self.product = product
+
+    def __len__(self) -> int:
+        return len(self.store.span(self.product))
+
+    def __getitem__(self, index):
+        span = self.store.span(self.product)
+        if isinstance(index, slice):
+            return [self.store.review(i) for i in span[index]]
+        return self.store.review(span[index])
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Sequence) and list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def __deepcopy__(self, memo) -> list[dict[str, Any]]:
+        # dataclasses.asdict / attr.asdict deep copy unknown values: hand them plain dicts
+        return list(self)
+
+
+def compact_reviews(product: Any, store: ReviewStore) -> Any:
+    """The same product with its reviews moved into `store`"""
+    product.reviews = store.reviews(store.add(product.reviews))
+    return product
+
+
+class ProductBatch:
+    """Products sharing one ReviewStore"""
+
+    def __init__(self, store: ReviewStore | None = None):
+        self.reviews = store if store is not None else ReviewStore()
+        self.products: list[Any] = []
+
+    def add(self, product: Any) -> Any:
+        product = compact_reviews(product, self.reviews)
+        self.products.append(product)
+        return product
+
+    def extend(self, products: Iterable[Any]):
+        for product in products:
+            self.add(product)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.products)
+
+    def __getitem__(self, index: int) -> Any:
+        return self.products[index]
@@ -0,0 +1,196 @@
+"""
+Rotating Local Proxy
+--------------------
+
+A small forwarding proxy on localhost that Chrome is started against once.
+Which upstream proxy (if any) traffic leaves through can then be switched
+per request or per domain with ``set_upstream``. Rotating a proxy costs
+milliseconds instead of a browser restart, and the browser keeps its cache
+and cookies.
+
+Supports HTTPS through CONNECT tunnels and plain HTTP requests. Upstreams
+are ordinary HTTP proxies given as "host:port" (the format used in
+working_proxies.csv).
+
+Example usage:
+    forwarder = RotatingProxy().start()
+    driver = Driver(proxy=forwarder.address)           # launched once
+    forwarder.set_upstream("157.15.45.15:8181", drop_connections=True)
+    forwarder.set_upstream("62.69.252.36:8080", domain="alibaba.com")
+    forwarder.set_upstream(None)                       # go direct again
+    forwarder.stop()
+"""
+
+import asyncio
+import logging
+import threading
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT: float = 10.0
+_HOP_BY_HOP = (b"proxy-connection:", b"connection:", b"keep-alive:")
+
+
+def _split_host_port(value: str, default_port: int) -> tuple[str, int]:
+    host, sep, port = value.rpartition(":")
+    if not sep or not port.isdigit():
+        return value, default_port
+    return host.strip("[]"), int(port)
+
+
+class RotatingProxy:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.default_upstream: str | None = None
+        self.domain_upstreams: dict[str, str | None] = {}
+        self.upstream_errors: dict[str, int] = {}
+        self._clients: set[asyncio.StreamWriter] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._server: asyncio.base_events.Server | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def start(self) -> "RotatingProxy":
+        """Start serving on a background thread, returns once the port is bound"""
+        ready = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle_client, self.host, self.port)
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, name="rotating-proxy", daemon=True)
+        self._thread.start()
+        ready.wait()
+        logger.debug(f"Rotating proxy listening on {self.address}")
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+
+        async def shutdown():
+            self._server.close()
+            for writer in list(self._clients):
+                writer.close()
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+
+    def set_upstream(self, proxy: str | None, domain: str | None = None, drop_connections: bool = False):
+        """Route new connections (for one domain, or all) through `proxy`, None for direct.
+
+        Open tunnels keep their old route; drop_connections closes them so the
+        browser reconnects through the new upstream straight away.
+        """
+        if domain is None:
+            self.default_upstream = proxy
+        else:
+            self.domain_upstreams[domain.lower()] = proxy
+        logger.debug(f"Upstream for {domain or 'all domains'} set to {proxy or 'direct'}")
+        if drop_connections and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._drop_connections)
+
+    def _drop_connections(self):
+        for writer in list(self._clients):
+            writer.close()
+
+    def upstream_for(self, host: str) -> str | None:
+        host = host.lower()
+        for domain, proxy in self.domain_upstreams.items():
+            if host == domain or host.endswith("." + domain):
+                return proxy
+        return self.default_upstream
+
+    async def _open(self, host: str, port: int, upstream: str | None, tunnel: bool):
+        """Connect to the target directly or through the upstream proxy"""
+        if upstream is None:
+            return await asyncio.wait_for(asyncio.open_connection(host, port), CONNECT_TIMEOUT)
+        upstream_host, upstream_port = _split_host_port(upstream, 8080)
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(upstream_host, upstream_port), CONNECT_TIMEOUT
+        )
+        if tunnel:
+            writer.write(f"CONNECT {host}:{port} HTTP/1.1\r\nHost: {host}:{port}\r\n\r\n".encode())
+            await writer.drain()
+            status = await asyncio.wait_for(reader.readuntil(b"\r\n"), CONNECT_TIMEOUT)
+            while (await asyncio.wait_for(reader.readuntil(b"\r\n"), CONNECT_TIMEOUT)) != b"\r\n":
+                pass
+            if b" 200" not in status:
+                writer.close()
+                raise ConnectionError(f"upstream refused tunnel: {status.decode(errors='replace').strip()}")
+        return reader, writer
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while data := await reader.read(65536):
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_client(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter):
+        self._clients.add(client_writer)
+        upstream = None
+        try:
+            head = await client_reader.readuntil(b"\r\n\r\n")
+            request_line, *header_lines = head.split(b"\r\n")
+            method, target, version = request_line.decode("latin-1").split(" ", 2)
+
+            if method.upper() == "CONNECT":
+                host, port = _split_host_port(target, 443)
+                upstream = self.upstream_for(host)
+                remote_reader, remote_writer = await self._open(host, port, upstream, tunnel=True)
+                client_writer.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+                await client_writer.drain()
+            else:
+                # plain http: one request per connection keeps routing simple
+                authority = urlsplit(target).netloc
+                host, port = _split_host_port(authority, 80)
+                upstream = self.upstream_for(host)
+                headers = [
+                    line for line in header_lines
+                    if line and not line.lower().startswith(_HOP_BY_HOP)
+                ]
+                if upstream is None:
+                    # origin servers expect a path, not the absolute url proxies get
+                    parts = urlsplit(target)
+                    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+                    request_line = f"{method} {path} {version}".encode("latin-1")
+                remote_reader, remote_writer = await self._open(host, port, upstream, tunnel=False)
+                remote_writer.write(b"\r\n".join([request_line, *headers, b"Connection: close", b"", b""]))
+                await remote_writer.drain()
+
+            await asyncio.gather(
+                self._pipe(client_reader, remote_writer),
+                self._pipe(remote_reader, client_writer),
+            )
+        except (
+            OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError
+        ) as e:
+            if upstream is not None:
+                self.upstream_errors[upstream] = self.upstream_errors.get(upstream, 0) + 1
+            logger.debug(f"Proxy connection failed via {upstream or 'direct'}: {e}")
+            try:
+                client_writer.write(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\n\r\n")
+                await client_writer.drain()
+            except (OSError, RuntimeError):
+                pass
+        finally:
+            self._clients.discard(client_writer)
+            client_writer.close()
@@ -0,0 +1,339 @@
+"""
+SQLite Product Store
+--------------------
+
+A queryable home for scraped products that grows run after run instead of
+a new pile of CSVs each time. ``Product``, ``AlibabaProduct`` and plain
+``Review`` dicts are split over normalised, indexed tables:
+
+    products       one row per product, latest title / price / rating
+    price_history  one row per price change, stamped with the scrape time
+    reviews        deduplicated per product by content, re-scrapes do not double count
+    specs          about_product bullets and Alibaba key attributes
+    price_tiers    Alibaba quantity tiers with parsed bounds
+    lead_times     Alibaba lead time per quantity
+
+Rows are keyed by the canonical product id from ``url_frontier`` (ASIN,
+AliExpress item id, Alibaba product id), so the same product reached
+through different links is one row.
+Writes are buffered and flushed in one transaction per batch using
+``INSERT ... ON CONFLICT DO UPDATE``, so writing thousands of products
+costs a handful of commits.
+
+Example usage:
+    with ProductStore("products.db") as store:
+        store.upsert(product, url=url, source="amazon")
+        best = store.top_rated(10, source="amazon", min_reviews=3)
+        history = store.price_history(url)
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Iterable
+from urllib.parse import urljoin
+
+from columnar_export import product_row
+from output_sink import StreamingSink
+from url_frontier import product_key
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    product_id TEXT PRIMARY KEY,
+    source TEXT,
+    url TEXT,
+    title TEXT,
+    price REAL,
+    price_text TEXT,
+    rating REAL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_source_rating ON products (source, rating);
+
+CREATE TABLE IF NOT EXISTS price_history (
+    product_id TEXT NOT NULL REFERENCES products (product_id),
+    observed_at REAL NOT NULL,
+    price REAL,
+    price_text TEXT,
+    PRIMARY KEY (product_id, observed_at)
+);
+
+CREATE TABLE IF NOT EXISTS reviews (
+    product_id TEXT NOT NULL REFERENCES products (product_id),
+    review_id TEXT NOT NULL,
+    title TEXT,
+    text TEXT,
+    rating REAL,
+    translated_text INTEGER,
+    response_text TEXT,
+    first_seen REAL NOT NULL,
+    PRIMARY KEY (product_id, review_id)
+);
+CREATE INDEX IF NOT EXISTS reviews_rating ON reviews (product_id, rating);
+
+CREATE TABLE IF NOT EXISTS specs (
+    product_id TEXT NOT NULL REFERENCES products (product_id),
+    position INTEGER NOT NULL,
+    name TEXT,
+    value TEXT,
+    PRIMARY KEY (product_id, position)
+);
+CREATE INDEX IF NOT EXISTS specs_name ON specs (name, value);
+
+CREATE TABLE IF NOT EXISTS price_tiers (
+    product_id TEXT NOT NULL REFERENCES products (product_id),
+    quantity TEXT NOT NULL,
+    min_quantity INTEGER,
+    max_quantity INTEGER,
+    price REAL,
+    price_text TEXT,
+    PRIMARY KEY (product_id, quantity)
+);
+
+CREATE TABLE IF NOT EXISTS lead_times (
+    product_id TEXT NOT NULL REFERENCES products (product_id),
+    quantity TEXT NOT NULL,
+    lead_time TEXT,
+    PRIMARY KEY (product_id, quantity)
+);
+"""
+
+
+def product_id(url: str) -> str:
+    """'amazon:<ASIN>' style id where the URL has one, else the canonical URL"""
+    return product_key(url)
+
+
+# what the scrapers store when a review has no title / text
+REVIEW_PLACEHOLDERS: frozenset[str] = frozenset({"Title not found", "Review text not found"})
+
+
+def _review_content(review: dict[str, Any]) -> tuple[str, str, Any]:
+    title, text = (
+        "" if value in REVIEW_PLACEHOLDERS else value.strip()
+        for value in (review.get("title") or "", review.get("text") or "")
+    )
+    return title, text, review.get("rating")
+
+
+def review_id(pid: str, review: dict[str, Any], occurrence: int = 0) -> str:
+    """Stable id for a review of a product: its title, text and rating.
+
+    `occurrence` tells identical reviews of one scrape apart ("Great!",
+    five stars, twice), and unlike the position in the list it does not
+    change when new reviews push the old ones down.
+    """
+    title, text, rating = _review_content(review)
+    key = "\x1f".join((pid, title, text, str(rating), str(occurrence)))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _split_spec(line: str) -> tuple[str | None, str]:
+    """'Brand: Lenovo' -> ('Brand', 'Lenovo'), plain bullets keep no name"""
+    name, sep, value = line.partition(":")
+    if sep and 0 < len(name) <= 60:
+        return name.strip(), value.strip()
+    return None, line.strip()
+
+
+class ProductStore:
+    def __init__(self, path: str = "products.db", batch_size: int = 500):
+        self.path = path
+        self.batch_size = batch_size
+        # scraper pool threads share one connection, writes go through the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._pending: list[tuple[dict[str, Any], float]] = []
+
+    def upsert(self, product: Any, url: str, source: str | None = None, observed_at: float | None = None):
+        """Queue a product for the next batch, flushing when the batch is full"""
+        row = product_row(product, url=url, source=source)
+        with self._lock:
+            self._pending.append((row, observed_at if observed_at is not None else time.time()))
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def upsert_many(self, products: Iterable[tuple[str, Any]], source: str | None = None):
+        for url, product in products:
+            self.upsert(product, url=url, source=source)
+        self.flush()
+
+    def import_sink(self, sink: StreamingSink, source: str | None = None, base_url: str = ""):
+        """Upsert every record of a StreamingSink job, resolving relative urls against base_url.
+
+        Records carry their scrape time, so importing a resumed job again
+        writes the same rows instead of new history under the import time.
+        """
+        for record in sink.records():
+            # records written before scraped_at existed fall back to the import time
+            self.upsert(
+                record["product"], url=urljoin(base_url, record["url"]), source=source,
+                observed_at=record.get("scraped_at"),
+            )
+        self.flush()
+
+    def flush(self):
+        """Write all queued products in a single transaction"""
+        with self._lock:
+            rows, self._pending = self._pending, []
+            if not rows:
+                return
+            with self._conn:
+                for row, observed_at in rows:
+                    self._write(row, observed_at)
+        logger.debug(f"Upserted {len(rows)} products into {self.path}")
+
+    def _write(self, row: dict[str, Any], observed_at: float):
+        pid = product_id(row["url"])
+        tiers = row.get("price_tiers")
+        if tiers is not None:
+            # Alibaba: the headline price is the cheapest tier
+            priced = [tier for tier in tiers if tier["price"] is not None]
+            cheapest = min(priced, key=lambda tier: tier["price"], default=None)
+            price = cheapest["price"] if cheapest else None
+            price_text = cheapest["price_text"] if cheapest else None
+            specs = [(name, value) for name, value in row["key_attributes"]]
+        else:
+            price, price_text = row["price"], row["price_text"]
+            specs = [_split_spec(line) for line in row["about_product"]]
+
+        self._conn.execute(
+            """
+            INSERT INTO products (product_id, source, url, title, price, price_text, rating, first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (product_id) DO UPDATE SET
+                source = COALESCE(excluded.source, source),
+                url = excluded.url,
+                title = excluded.title,
+                price = excluded.price,
+                price_text = excluded.price_text,
+                rating = excluded.rating,
+                last_seen = excluded.last_seen
+            WHERE excluded.last_seen >= last_seen  -- an older observation never overwrites a newer one
+            """,
+            (pid, row["source"], row["url"], row["title"], price, price_text,
+             row.get("rating"), observed_at, observed_at),
+        )
+        previous = self._conn.execute(
+            "SELECT price FROM price_history WHERE product_id = ? AND observed_at < ? ORDER BY observed_at DESC LIMIT 1",
+            (pid, observed_at),
+        ).fetchone()
+        # an unchanged price is already on record (products.last_seen says it is still current)
+        if price is not None and (previous is None or previous["price"] != price):
+            self._conn.execute(
+                "INSERT OR REPLACE INTO price_history VALUES (?, ?, ?, ?)",
+                (pid, observed_at, price, price_text),
+            )
+        self._conn.executemany(
+            """
+            INSERT INTO reviews VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (product_id, review_id) DO UPDATE SET
+                translated_text = excluded.translated_text,
+                response_text = excluded.response_text
+            """,
+            self._review_rows(pid, row["reviews"], observed_at),
+        )
+        # specs and tiers describe the current listing, replace them wholesale
+        self._conn.execute("DELETE FROM specs WHERE product_id = ?", (pid,))
+        self._conn.executemany(
+            "INSERT INTO specs VALUES (?, ?, ?, ?)",
+            [(pid, position, name, value) for position, (name, value) in enumerate(specs)],
+        )
+        if tiers is not None:
+            self._conn.execute("DELETE FROM price_tiers WHERE product_id = ?", (pid,))
+            self._conn.executemany(
+                "INSERT INTO price_tiers VALUES (?, ?, ?, ?, ?, ?)",
+                [(pid, tier["quantity"], tier["min_quantity"], tier["max_quantity"],
+                  tier["price"], tier["price_text"]) for tier in tiers],
+            )
+            self._conn.execute("DELETE FROM lead_times WHERE product_id = ?", (pid,))
+            self._conn.executemany(
+                "INSERT INTO lead_times VALUES (?, ?, ?)",
+                [(pid, entry["quantity"], entry["lead_time"]) for entry in row["lead_time"]],
+            )
+
+    @staticmethod
+    def _review_rows(pid: str, reviews: list[dict[str, Any]], observed_at: float) -> list[tuple]:
+        rows = []
+        seen: Counter[tuple[str, str, Any]] = Counter()
+        skipped = 0
+        for review in reviews:
+            content = _review_content(review)
+            # without text, nothing tells one review from another: they would collapse into one row
+            if not content[1]:
+                skipped += 1
+                continue
+            rows.append((
+                pid, review_id(pid, review, seen[content]), review["title"], review["text"], review["rating"],
+                review["translated_text"], review["response_text"], observed_at,
+            ))
+            seen[content] += 1
+        if skipped:
+            logger.debug(f"Skipped {skipped} reviews without text for {pid}")
+        return rows
+
+    def query(self, sql: str, params: tuple = ()) -> list[dict[str, Any]]:
+        self.flush()
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def get(self, url: str) -> dict[str, Any] | None:
+        rows = self.query("SELECT * FROM products WHERE product_id = ?", (product_id(url),))
+        return rows[0] if rows else None
+
+    def top_rated(self, n: int = 10, source: str | None = None, min_reviews: int = 0) -> list[dict[str, Any]]:
+        """Best rated products, ties broken by how many reviews back the rating"""
+        return self.query(
+            """
+            SELECT p.*, COUNT(r.review_id) AS review_count
+            FROM products p LEFT JOIN reviews r ON r.product_id = p.product_id
+            WHERE p.rating IS NOT NULL AND (? IS NULL OR p.source = ?)
+            GROUP BY p.product_id
+            HAVING review_count >= ?
+            ORDER BY p.rating DESC, review_count DESC
+            LIMIT ?
+            """,
+            (source, source, min_reviews, n),
+        )
+
+    def price_history(self, url: str) -> list[dict[str, Any]]:
+        return self.query(
+            "SELECT observed_at, price, price_text FROM price_history WHERE product_id = ? ORDER BY observed_at",
+            (product_id(url),),
+        )
+
+    def reviews(self, url: str, min_rating: float | None = None) -> list[dict[str, Any]]:
+        return self.query(
+            "SELECT * FROM reviews WHERE product_id = ? AND (? IS NULL OR rating >= ?) ORDER BY first_seen",
+            (product_id(url), min_rating, min_rating),
+        )
+
+    def specs(self, url: str) -> list[dict[str, Any]]:
+        return self.query(
+            "SELECT name, value FROM specs WHERE product_id = ? ORDER BY position", (product_id(url),)
+        )
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "ProductStore":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.query("SELECT COUNT(*) AS n FROM products")[0]["n"]
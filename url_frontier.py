@@ -0,0 +1,252 @@
+"""
+URL Frontier
+------------
+
+Reduces product links to canonical product ids and hands every product out
+once, within a run and across runs.
+
+    amazon:B0BXWZMQJ3          from /Slug/dp/B0BXWZMQJ3/ref=..., /gp/product/...
+                               and /sspa/click?...&url=%2F...%2Fdp%2F... ad links
+    aliexpress:1005006123456   from //nl.aliexpress.com/item/1005006123456.html?...
+    alibaba:1600912345678      from //www.alibaba.com/product-detail/Slug_1600912345678.html
+
+Within a run an exact set of ids removes duplicates. Across runs, products
+that were actually scraped (``mark_done``) are remembered in a Bloom filter
+stored next to the run outputs. A 1 in 10,000 false positive rate takes
+about 2.4 bytes and 13 hashes per product: sized for a million products, the
+file is 2.4 MB.
+
+The filter itself is written by ``save`` (and on exit). In between, every
+``mark_done`` is appended to a small journal next to it, which is replayed
+on load, so a crash loses no finished product and a mark never rewrites the
+whole filter.
+
+Example usage:
+    frontier = URLFrontier("amazon")
+    for url in frontier.filter(iter_product_urls_az(scraper, "laptop"), recrawl=cache.due):
+        product = get_product_data_az(scraper, url)
+        frontier.mark_done(url)
+    frontier.save()
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import struct
+import threading
+from typing import Callable, Iterable, Iterator
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from page_store import canonical_url
+
+logger = logging.getLogger(__name__)
+
+_ASIN = re.compile(r"/(?:dp|gp/product|gp/aw/d|product-reviews)/([A-Z0-9]{10})(?:[/?]|$)")
+_ALIEXPRESS_ITEM = re.compile(r"/item/(\d+)\.html")
+_ALIBABA_PRODUCT = re.compile(r"/product-detail/(?:[^/]*_)?(\d{6,})\.html")
+
+
+def _absolute(url: str) -> str:
+    return "https:" + url if url.startswith("//") else url
+
+
+def canonical_product_id(url: str) -> str | None:
+    """'amazon:<ASIN>', 'aliexpress:<item id>' or 'alibaba:<product id>', None if unknown"""
+    parts = urlsplit(_absolute(url))
+    path = unquote(parts.path)
+    if "/sspa/click" in path:
+        # sponsored results wrap the real product path in the url parameter
+        target = parse_qs(parts.query).get("url")
+        return canonical_product_id(unquote(target[0])) if target else None
+    host = parts.netloc.lower()
+    if "aliexpress." in host:
+        match = _ALIEXPRESS_ITEM.search(path)
+        return f"aliexpress:{match.group(1)}" if match else None
+    if "alibaba." in host:
+        match = _ALIBABA_PRODUCT.search(path)
+        return f"alibaba:{match.group(1)}" if match else None
+    # amazon links are often relative, so anything else with an ASIN counts
+    match = _ASIN.search(path)
+    return f"amazon:{match.group(1)}" if match else None
+
+
+def canonical_product_url(url: str, amazon_host: str = "www.amazon.nl") -> str:
+    """Shortest stable URL for a product, falling back to canonical_url"""
+    product_id = canonical_product_id(url)
+    if product_id is None:
+        return canonical_url(_absolute(url))
+    site, key = product_id.split(":", 1)
+    if site == "amazon":
+        # search results link relative to the shop the search ran on
+        host = urlsplit(_absolute(url)).netloc.lower() or amazon_host
+        return f"https://{host}/dp/{key}"
+    if site == "aliexpress":
+        # country subdomains (nl., de., ...) serve the same item
+        return f"https://www.aliexpress.com/item/{key}.html"
+    return canonical_url(_absolute(url))
+
+
+def product_key(url: str) -> str:
+    """Dedupe key: the product id when one can be parsed, else the canonical URL"""
+    return canonical_product_id(url) or canonical_url(_absolute(url))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter that can be saved to and loaded from a file"""
+
+    _HEADER = struct.Struct("<4sQI")
+    _MAGIC = b"BLM1"
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 1e-4):
+        size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.num_bits = max(size, 8)
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str) -> Iterator[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        # double hashing: k positions from two independent 64 bit hashes
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self._HEADER.pack(self._MAGIC, self.num_bits, self.num_hashes))
+            f.write(self.bits)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BloomFilter":
+        with open(path, "rb") as f:
+            magic, num_bits, num_hashes = cls._HEADER.unpack(f.read(cls._HEADER.size))
+            if magic != cls._MAGIC:
+                raise ValueError(f"{path} is not a Bloom filter file")
+            bloom = cls.__new__(cls)
+            bloom.num_bits, bloom.num_hashes = num_bits, num_hashes
+            bloom.bits = bytearray(f.read())
+        if len(bloom.bits) != (num_bits + 7) // 8:
+            raise ValueError(f"{path} is truncated")
+        return bloom
+
+
+class URLFrontier:
+    def __init__(
+        self,
+        name: str,
+        directory: str = "runs",
+        capacity: int = 1_000_000,
+        error_rate: float = 1e-4,
+        amazon_host: str = "www.amazon.nl",
+    ):
+        self.path = os.path.join(directory, f"{name}.bloom")
+        self.journal_path = f"{self.path}.log"
+        self.amazon_host = amazon_host
+        self._lock = threading.Lock()
+        self._seen: set[str] = set()
+        self.skipped_duplicates = 0
+        self.skipped_done = 0
+        self.recrawled = 0
+        self.done = BloomFilter(capacity, error_rate)
+        if os.path.exists(self.path):
+            try:
+                self.done = BloomFilter.load(self.path)
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning(f"Ignoring unreadable frontier {self.path}: {e}")
+        self._replay_journal()
+        self._journal = None
+
+    def _replay_journal(self):
+        """Add the products marked done after the last save (e.g. before a crash)"""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.endswith("\n"):  # a half written last line is dropped
+                    self.done.add(line[:-1])
+
+    def add(self, url: str, recrawl: Callable[[str], bool] | None = None) -> str | None:
+        """Canonical URL if this product has not been handed out or scraped before, else None.
+
+        A product scraped in an earlier run is handed out again when
+        recrawl(url) says so, e.g. RecrawlCache.due once a TTL expired.
+        """
+        key = product_key(url)
+        with self._lock:
+            if key in self._seen:
+                self.skipped_duplicates += 1
+                return None
+            self._seen.add(key)
+            done = key in self.done
+        if done:
+            if recrawl is None or not recrawl(url):
+                with self._lock:
+                    self.skipped_done += 1
+                return None
+            with self._lock:
+                self.recrawled += 1
+        return canonical_product_url(url, self.amazon_host)
+
+    def filter(self, urls: Iterable[str], recrawl: Callable[[str], bool] | None = None) -> Iterator[str]:
+        """Yield each new (or due for a re-crawl) product once, as canonical URLs, keeping the input order"""
+        for url in urls:
+            if (product_url := self.add(url, recrawl)) is not None:
+                yield product_url
+
+    def mark_done(self, url: str):
+        """Remember a scraped product so later runs do not hand it out again"""
+        key = product_key(url)
+        with self._lock:
+            self.done.add(key)
+            if self._journal is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._journal = open(self.journal_path, "a", encoding="utf-8")
+            self._journal.write(key + "\n")
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+
+    def is_done(self, url: str) -> bool:
+        return product_key(url) in self.done
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            self.done.save(self.path)
+            # everything journaled is in the saved filter now; a crash before this line only replays it twice
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+        logger.debug(
+            f"Frontier {self.path} saved, skipped {self.skipped_duplicates} duplicates "
+            f"and {self.skipped_done} products done in earlier runs, re-crawling {self.recrawled}"
+        )
+
+    def __enter__(self) -> "URLFrontier":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.save()
+
+
+def unique_product_urls(urls: Iterable[str], amazon_host: str = "www.amazon.nl") -> Iterator[str]:
+    """Within-run dedupe only: canonical URLs, each product once, in order"""
+    seen: set[str] = set()
+    for url in urls:
+        key = product_key(url)
+        if key not in seen:
+            seen.add(key)
+            yield canonical_product_url(url, amazon_host)